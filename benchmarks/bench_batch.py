@@ -0,0 +1,108 @@
+"""Batch-building benchmark for hosts with many filesystems or listening services.
+
+Compares ``build_batch`` (plain dicts from trusted parser output) with
+``build_batch(..., validate=True)`` (every pydantic model built, validated and
+dumped), both followed by the JSON encoding the ingest client does. The two
+payloads are checked for equality first, so the fast path can never change
+what is sent.
+
+Usage::
+
+    python benchmarks/bench_batch.py [--mounts 10 1000 10000] [--services 100 1000] [--repeat 5]
+
+Each ``--services`` count is measured on a host with 10 mounts; every service
+adds one entity and one relation to the batch.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ssh_linux.batch import build_batch  # noqa: E402
+from ssh_linux.collectors import HostFacts  # noqa: E402
+from ssh_linux.models import Target  # noqa: E402
+
+_RUN_ID = "11111111-1111-1111-1111-111111111111"
+_TASK_ID = "22222222-2222-2222-2222-222222222222"
+
+
+def synthetic_facts(mounts: int, services: int = 0) -> HostFacts:
+    return HostFacts(
+        hostname="bench-host",
+        fqdn="bench-host.example.internal",
+        machine_id="0123456789abcdef0123456789abcdef",
+        ipv4=["10.0.0.5", "10.0.1.5"],
+        os_pretty="Ubuntu 22.04.4 LTS",
+        os_id="ubuntu",
+        os_version_id="22.04",
+        kernel_release="6.8.0-45-generic",
+        cpu_cores=8,
+        mem_total_kb=16384256,
+        uptime_sec=123456,
+        filesystems=[
+            {
+                "filesystem": "overlay",
+                "size_kb": 30493204,
+                "used_kb": 12124260,
+                "avail_kb": 16924612,
+                "mountpoint": f"/var/lib/docker/overlay2/{index:064x}/merged",
+            }
+            for index in range(mounts)
+        ],
+        services=[
+            ("tcp6" if index % 2 else "tcp", "::" if index % 2 else "0.0.0.0", 10_000 + index, "envoy")
+            for index in range(services)
+        ],
+    )
+
+
+def _encode(payload: dict) -> bytes:
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mounts", type=int, nargs="+", default=[10, 1_000, 10_000])
+    parser.add_argument("--services", type=int, nargs="+", default=[100, 1_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    target = Target.model_validate(
+        {"type": "host", "address": "10.0.0.5", "user": "bench", "auth": {"method": "password", "password": "x"}}
+    )
+    print(f"{'mounts':>8s} {'services':>8s} {'body':>10s} {'fast':>11s} {'validated':>11s} {'speedup':>8s}")
+    cases = [(mounts, 0) for mounts in options.mounts] + [(10, services) for services in options.services]
+    for mounts, services in cases:
+        facts = synthetic_facts(mounts, services)
+
+        def fast() -> bytes:
+            return _encode(build_batch(_RUN_ID, _TASK_ID, target, facts))
+
+        def validated() -> bytes:
+            return _encode(build_batch(_RUN_ID, _TASK_ID, target, facts, validate=True))
+
+        # collected_at has one-second resolution; compare everything else.
+        fast_payload = build_batch(_RUN_ID, _TASK_ID, target, facts)
+        validated_payload = build_batch(_RUN_ID, _TASK_ID, target, facts, validate=True)
+        validated_payload["collected_at"] = fast_payload["collected_at"]
+        if fast_payload != validated_payload:
+            print(f"mounts={mounts} services={services}: fast payload differs from the validated one", file=sys.stderr)
+            return 1
+
+        fast_sec = min(timeit.repeat(fast, number=1, repeat=options.repeat))
+        validated_sec = min(timeit.repeat(validated, number=1, repeat=options.repeat))
+        print(
+            f"{mounts:>8d} {services:>8d} {len(fast()) / 1024:>7.1f}KiB {fast_sec * 1e6:>9.0f}us "
+            f"{validated_sec * 1e6:>9.0f}us {validated_sec / fast_sec:>7.1f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,208 @@
+"""Microbenchmarks for ssh_linux.parsers on large synthetic outputs.
+
+Inputs model the hosts where parsing shows up in profiles: 10k overlay mounts
+in ``df -P``, 10k addresses in ``ip -j addr`` (k8s nodes, IPVS), 20k
+installed packages (build servers) and 20k listening sockets in ``ss -tlnp``
+(proxies with one ``SO_REUSEPORT`` socket per worker). Each
+parser is checked against the straightforward regex/list implementation it
+replaced, so a fast path can never change results, and both are timed.
+
+Usage::
+
+    python benchmarks/bench_parsers.py [--mounts 10000] [--addresses 10000] [--packages 20000]
+        [--sockets 20000] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ssh_linux.parsers import (  # noqa: E402
+    parse_df_p,
+    parse_ipv4_from_ip_addr,
+    parse_listening_sockets,
+    parse_meminfo,
+    parse_packages,
+)
+
+
+def reference_df_p(raw: str) -> list[dict[str, Any]]:
+    rows: list[dict[str, Any]] = []
+    lines = [line.strip() for line in raw.splitlines() if line.strip()]
+    if not lines:
+        return rows
+    if lines[0].lower().startswith("filesystem"):
+        lines = lines[1:]
+    for line in lines:
+        parts = re.split(r"\s+", line, maxsplit=5)
+        if len(parts) != 6:
+            continue
+        filesystem, size_kb, used_kb, avail_kb, _capacity, mountpoint = parts
+        try:
+            rows.append(
+                {
+                    "filesystem": filesystem,
+                    "size_kb": int(size_kb),
+                    "used_kb": int(used_kb),
+                    "avail_kb": int(avail_kb),
+                    "mountpoint": mountpoint,
+                }
+            )
+        except ValueError:
+            continue
+    return rows
+
+
+def reference_meminfo(raw: str) -> int | None:
+    match = re.search(r"^MemTotal:\s+(\d+)\s+kB$", raw, re.MULTILINE)
+    return int(match.group(1)) if match else None
+
+
+def reference_ipv4(raw: str) -> list[str]:
+    try:
+        payload = json.loads(raw)
+    except json.JSONDecodeError:
+        return []
+    ipv4: list[str] = []
+    for iface in payload:
+        if iface.get("ifname") == "lo":
+            continue
+        for addr in iface.get("addr_info", []):
+            if addr.get("family") != "inet":
+                continue
+            value = str(addr.get("local", "")).strip()
+            if value and value not in ipv4:
+                ipv4.append(value)
+    return ipv4
+
+
+def reference_packages(raw: str) -> dict[str, Any] | None:
+    # Buffer everything, then digest the sorted rows: what a non-streaming collector would do.
+    lines = [line for line in raw.splitlines() if line.strip()]
+    if not lines or lines[0].strip() not in ("dpkg", "rpm"):
+        return None
+    rows = sorted(
+        line.split("\t", 1)[1] for line in lines[1:] if line[1:2] == "i" and len(line.split("\t")) == 4
+    )
+    digest = sum(int.from_bytes(hashlib.sha256(row.encode()).digest(), "big") for row in rows) % (1 << 256)
+    items = sorted(tuple(row.split("\t")) for row in rows)
+    return {"manager": lines[0].strip(), "count": len(items), "digest": f"{digest:064x}", "items": items}
+
+
+def reference_listening_sockets(raw: str) -> list[tuple[str, str, int, str | None]]:
+    # Regex per line and a list membership test per socket to deduplicate.
+    sockets: list[tuple[str, str, int, str | None]] = []
+    for line in raw.splitlines()[1:]:
+        match = re.match(r"LISTEN\s+\d+\s+\d+\s+\[?([^\s\]%]+)(?:%\S+)?\]?:(\d+)\s", line)
+        if not match:
+            continue
+        process = re.search(r'users:\(\("([^"]+)"', line)
+        address = match.group(1)
+        socket = ("tcp6" if ":" in address else "tcp", address, int(match.group(2)), process and process.group(1))
+        if socket not in sockets:
+            sockets.append(socket)
+    return sorted(sockets, key=lambda item: (item[2], item[0], item[1], item[3] or ""))
+
+
+def synthetic_df(mounts: int) -> str:
+    lines = ["Filesystem     1024-blocks     Used Available Capacity Mounted on"]
+    for index in range(mounts):
+        lines.append(
+            f"overlay        30493204 12124260  16924612      42% "
+            f"/var/lib/docker/overlay2/{index:064x}/merged"
+        )
+    lines.append("//nas/share with spaces 100 40 60 40% /mnt/share with spaces")
+    return "\n".join(lines)
+
+
+def synthetic_ip_addr(addresses: int) -> str:
+    interfaces = [{"ifname": "lo", "addr_info": [{"family": "inet", "local": "127.0.0.1"}]}]
+    per_iface = 100
+    for start in range(0, addresses, per_iface):
+        addr_info = []
+        for index in range(start, min(start + per_iface, addresses)):
+            addr_info.append({"family": "inet", "local": f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"})
+            addr_info.append({"family": "inet6", "local": f"fd00::{index:x}"})
+        interfaces.append({"ifname": f"kube-ipvs{start // per_iface}", "addr_info": addr_info})
+    # IPVS attaches every service address to each node again.
+    interfaces.append({"ifname": "dup0", "addr_info": interfaces[1]["addr_info"]})
+    return json.dumps(interfaces)
+
+
+def synthetic_packages(packages: int) -> str:
+    lines = ["dpkg"]
+    lines += [
+        f"ii \tlib-{index:05d}-dev\t{index % 7}.{index % 13}.{index}-1ubuntu1\tamd64" for index in range(packages)
+    ]
+    lines.append("rc \tremoved-package\t1.0\tall")
+    return "\n".join(lines)
+
+
+def synthetic_sockets(sockets: int) -> str:
+    lines = ["ss", "State  Recv-Q Send-Q Local Address:Port  Peer Address:Port Process"]
+    workers = 4
+    for index in range(sockets // workers):
+        port = 10_000 + index
+        for worker in range(workers):
+            local = f"[::]:{port}" if index % 2 else f"0.0.0.0:{port}"
+            pid = 1000 + worker
+            lines.append(f'LISTEN 0 511 {local} *:* users:(("envoy",pid={pid},fd={index + 20}))')
+    return "\n".join(lines)
+
+
+def synthetic_meminfo() -> str:
+    fields = ["MemTotal:       16384256 kB"] + [f"Field{index}:  {index} kB" for index in range(60)]
+    return "\n".join(fields)
+
+
+def _time(func: Callable[[str], object], raw: str, repeat: int) -> float:
+    return min(timeit.repeat(lambda: func(raw), number=1, repeat=repeat))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mounts", type=int, default=10_000)
+    parser.add_argument("--addresses", type=int, default=10_000)
+    parser.add_argument("--packages", type=int, default=20_000)
+    parser.add_argument("--sockets", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    cases = [
+        ("parse_df_p", parse_df_p, reference_df_p, synthetic_df(options.mounts)),
+        ("parse_ipv4_from_ip_addr", parse_ipv4_from_ip_addr, reference_ipv4, synthetic_ip_addr(options.addresses)),
+        ("parse_meminfo", parse_meminfo, reference_meminfo, synthetic_meminfo()),
+        ("parse_packages", parse_packages, reference_packages, synthetic_packages(options.packages)),
+        (
+            "parse_listening_sockets",
+            parse_listening_sockets,
+            reference_listening_sockets,
+            synthetic_sockets(options.sockets),
+        ),
+    ]
+
+    print(f"{'parser':26s} {'input':>10s} {'current':>11s} {'reference':>11s} {'speedup':>8s}")
+    for name, current, reference, raw in cases:
+        if current(raw) != reference(raw):
+            print(f"{name}: result differs from the reference implementation", file=sys.stderr)
+            return 1
+        current_sec = _time(current, raw, options.repeat)
+        reference_sec = _time(reference, raw, options.repeat)
+        print(
+            f"{name:26s} {len(raw) / 1024:>7.1f}KiB {current_sec * 1e6:>9.0f}us "
+            f"{reference_sec * 1e6:>9.0f}us {reference_sec / current_sec:>7.1f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
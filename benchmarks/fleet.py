@@ -0,0 +1,154 @@
+"""End-to-end collection benchmark against a local fake SSH fleet.
+
+Runs the full single-target pipeline (SSH connect, collection, batch build,
+ingest POST) for ``--hosts`` targets on ``--workers`` threads. Every target
+points at one in-process ``FakeSSHServer`` under its own user name, so each
+one gets its own SSH connection and task id. Reports:
+
+* per-host latency percentiles (p50/p90/p99/max),
+* fleet throughput in hosts per second,
+* peak RSS of the process,
+* SSH connections/commands and ingest batches/bytes seen by the stubs.
+
+Usage::
+
+    python benchmarks/fleet.py [--hosts 200] [--workers 32] [--latency-ms 20]
+        [--command-latency df=200] [--df-lines 2000] [--collect-mode batched] [--ssh-profile fast]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from uuid import UUID, uuid5
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from harness import FakeSSHServer, IngestStub, synthetic_outputs  # noqa: E402
+
+from ssh_linux.errors import ExitCode  # noqa: E402
+from ssh_linux.ingest_client import IngestClientCache  # noqa: E402
+from ssh_linux.models import Target  # noqa: E402
+from ssh_linux.pipeline import TaskSpec, run_task  # noqa: E402
+from ssh_linux.ssh_profiles import SSH_PROFILES  # noqa: E402
+
+_RUN_ID = "11111111-1111-1111-1111-111111111111"
+_TASK_ID = "22222222-2222-2222-2222-222222222222"
+
+
+def _latency_override(value: str) -> tuple[str, float]:
+    name, _, ms = value.partition("=")
+    try:
+        return name, float(ms) / 1000
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"expected SECTION=MS, got {value!r}") from exc
+
+
+def _spec(index: int, port: int, ingest_url: str, collect_mode: str, ssh_profile: str) -> TaskSpec:
+    target = Target.model_validate(
+        {
+            "type": "host",
+            "address": "127.0.0.1",
+            "port": port,
+            "user": f"bench-{index}",
+            "auth": {"method": "password", "password": "bench"},
+        }
+    )
+    return TaskSpec(
+        run_id=_RUN_ID,
+        task_id=str(uuid5(UUID(_TASK_ID), str(index))),
+        target=target,
+        ingest_url=ingest_url,
+        ingest_token="bench-token",
+        timeout_sec=30,
+        collect_mode=collect_mode,
+        ssh_profile=ssh_profile,
+    )
+
+
+def _percentile(sorted_samples: list[float], fraction: float) -> float:
+    index = min(len(sorted_samples) - 1, max(0, round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def _peak_rss_mib() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--collect-mode", choices=["exec", "batched"], default="exec")
+    parser.add_argument("--ssh-profile", choices=sorted(SSH_PROFILES), default="default")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Latency of every remote command")
+    parser.add_argument(
+        "--command-latency",
+        type=_latency_override,
+        action="append",
+        default=[],
+        metavar="SECTION=MS",
+        help="Per-section latency override, e.g. df=200 (repeatable)",
+    )
+    parser.add_argument("--df-lines", type=int, default=20, help="Mounts reported by df -P")
+    parser.add_argument("--packages", type=int, default=600, help="Installed packages reported per host")
+    parser.add_argument("--sockets", type=int, default=20, help="Listening sockets (services) reported per host")
+    parser.add_argument("--ingest-latency-ms", type=float, default=5)
+    options = parser.parse_args()
+
+    fake_ssh = FakeSSHServer(
+        outputs=synthetic_outputs(df_lines=options.df_lines, packages=options.packages, sockets=options.sockets),
+        latency_sec=options.latency_ms / 1000,
+        command_latency_sec=dict(options.command_latency),
+    )
+    with fake_ssh, IngestStub(latency_sec=options.ingest_latency_ms / 1000) as ingest:
+        specs = [
+            _spec(index, fake_ssh.port, ingest.url, options.collect_mode, options.ssh_profile)
+            for index in range(options.hosts)
+        ]
+        clients = IngestClientCache(pool_size=options.workers)
+
+        def timed(spec: TaskSpec) -> tuple[float, int]:
+            started = time.perf_counter()
+            result = run_task(spec, ingest_clients=clients)
+            return time.perf_counter() - started, result.exit_code
+
+        # The connector logs one JSON line per event to stderr; keep the report readable.
+        with contextlib.redirect_stderr(io.StringIO()):
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options.workers) as pool:
+                outcomes = list(pool.map(timed, specs))
+            wall = time.perf_counter() - started
+        clients.close()
+
+    latencies = sorted(latency * 1000 for latency, _code in outcomes)
+    failed = sum(1 for _latency, code in outcomes if code != ExitCode.SUCCESS)
+    print(
+        f"hosts={options.hosts} workers={options.workers} mode={options.collect_mode} "
+        f"profile={options.ssh_profile} failed={failed}"
+    )
+    print(
+        "per-host latency: "
+        f"p50={_percentile(latencies, 0.50):.1f}ms p90={_percentile(latencies, 0.90):.1f}ms "
+        f"p99={_percentile(latencies, 0.99):.1f}ms max={latencies[-1]:.1f}ms "
+        f"mean={statistics.fmean(latencies):.1f}ms"
+    )
+    print(f"throughput: {options.hosts / wall:.1f} hosts/s over {wall:.2f}s")
+    print(f"peak RSS: {_peak_rss_mib():.1f} MiB")
+    print(f"ssh: connections={fake_ssh.stats.connections} commands={fake_ssh.stats.commands}")
+    print(f"ingest: batches={ingest.batches} entities={ingest.entities} bytes={ingest.bytes_received}")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,275 @@
+"""In-process stand-ins for an SSH fleet and the ingest API.
+
+``FakeSSHServer`` is a paramiko ``ServerInterface`` that answers every command
+``collect_host_facts`` runs (in exec and batched mode) with canned or
+synthetic output after a configurable per-command latency. ``IngestStub``
+accepts ``POST /v1/ingest/batches`` and counts what it receives. Both bind to
+127.0.0.1 on an ephemeral port and are meant for the benchmark scripts only.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import re
+import shlex
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import paramiko
+
+from ssh_linux.collectors import _COMMANDS
+
+# Closing a channel before paramiko has acknowledged the exec request makes
+# the client's exec_command fail, so no command completes faster than this.
+_MIN_LATENCY_SEC = 0.005
+
+_SECTION_RE = re.compile(r"'(@@ssh_linux:[0-9a-f]+) BEGIN (\S+)'")
+_COMPOSITE_COMMAND_RE = re.compile(r"_out=\$\(\{ (.*?)\n\}")
+# A guarded block of sections; the test may span lines (an expected fingerprint).
+_GUARD_RE = re.compile(r"^if (.*?); then\n(.*?)\nfi$", re.MULTILINE | re.DOTALL)
+
+
+def synthetic_outputs(
+    df_lines: int = 20, ipv4_count: int = 2, packages: int = 600, sockets: int = 20
+) -> dict[str, bytes]:
+    """Plausible output for every section, keyed by remote command."""
+    interfaces = [{"ifname": "lo", "addr_info": [{"family": "inet", "local": "127.0.0.1"}]}]
+    interfaces += [
+        {"ifname": f"eth{index}", "addr_info": [{"family": "inet", "local": f"10.0.{index}.5"}]}
+        for index in range(ipv4_count)
+    ]
+    df = ["Filesystem     1024-blocks     Used Available Capacity Mounted on", "/dev/sda1 30493204 12124260 16924612 42% /"]
+    df += [
+        f"overlay 30493204 12124260 16924612 42% /var/lib/docker/overlay2/{uuid.UUID(int=index).hex}/merged"
+        for index in range(max(0, df_lines - 1))
+    ]
+    by_section = {
+        "hostname": "bench-host",
+        "fqdn": "bench-host.example.internal",
+        "machine_id": "0123456789abcdef0123456789abcdef",
+        "ip_addr": json.dumps(interfaces),
+        "hostname_i": " ".join(f"10.0.{index}.5" for index in range(ipv4_count)),
+        "os_release": 'PRETTY_NAME="Ubuntu 22.04.4 LTS"\nID=ubuntu\nVERSION_ID="22.04"',
+        "kernel_release": "6.8.0-45-generic",
+        "nproc": "8",
+        "meminfo": "MemTotal:       16384256 kB\nMemFree:         1234567 kB",
+        "uptime": "123456.78 987654.32",
+        "df": "\n".join(df),
+        "packages": "\n".join(["dpkg"] + [f"ii \tpkg-{index:05d}\t1.{index}-1\tamd64" for index in range(packages)]),
+        "boot_fingerprint": "0123456789abcdef0123456789abcdef\nb3d1c5a0-6a47-4c1e-9f1b-1f0e5d1e2a3b\n1700000000",
+        "sockets": "\n".join(
+            ["ss"]
+            + [f'LISTEN 0 511 0.0.0.0:{8000 + index} 0.0.0.0:* users:(("app",pid=1,fd=3))' for index in range(sockets)]
+        ),
+    }
+    return {_COMMANDS[name]: (text + "\n").encode() for name, text in by_section.items()}
+
+
+@dataclass
+class FakeSSHStats:
+    connections: int = 0
+    commands: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def count(self, attribute: str) -> None:
+        with self.lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+
+class FakeSSHServer:
+    """Password-auth SSH server on 127.0.0.1 serving canned command output.
+
+    ``latency_sec`` applies to every command unless ``command_latency_sec``
+    names a section (``df``, ``meminfo``, ...) with its own value. The
+    composite script of batched mode is answered section by section and
+    takes the sum of its sections' latencies, as it would on a real host.
+    Sections behind a fact-cache guard are skipped when the guard fails.
+    A composite section the server has no output for is an error; it is
+    raised when the server is closed, so a benchmark cannot pass on empty
+    hosts.
+    """
+
+    def __init__(
+        self,
+        outputs: dict[str, bytes] | None = None,
+        latency_sec: float = 0.0,
+        command_latency_sec: dict[str, float] | None = None,
+    ) -> None:
+        self.outputs = outputs or synthetic_outputs()
+        self.stats = FakeSSHStats()
+        self._latency_by_command = {
+            command: (command_latency_sec or {}).get(name, latency_sec) for name, command in _COMMANDS.items()
+        }
+        self._default_latency = latency_sec
+        self._host_key = paramiko.RSAKey.generate(2048)
+        self._listener = socket.create_server(("127.0.0.1", 0), backlog=256)
+        self.port = self._listener.getsockname()[1]
+        self._transports: list[paramiko.Transport] = []
+        self._closed = threading.Event()
+        self._errors: list[Exception] = []
+
+    def __enter__(self) -> "FakeSSHServer":
+        threading.Thread(target=self._accept_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self._closed.set()
+        self._listener.close()
+        for transport in list(self._transports):
+            transport.close()
+        if self._errors:
+            raise RuntimeError(f"commands the fake server could not answer: {len(self._errors)}") from self._errors[0]
+
+    def respond(self, command: str) -> tuple[float, bytes, bytes, int]:
+        """(latency, stdout, stderr, exit code) for one exec request."""
+        if command in self.outputs:
+            return self._latency_by_command.get(command, self._default_latency), self.outputs[command], b"", 0
+        if command.startswith("sh -c "):
+            return self._respond_composite(command)
+        return self._default_latency, b"", f"sh: 1: {command}: not found\n".encode(), 127
+
+    def _respond_composite(self, command: str) -> tuple[float, bytes, bytes, int]:
+        # The client sends `sh -c <quoted script>`; match against the script itself.
+        script = shlex.split(command)[2]
+        # [unguarded, test, guarded, unguarded, test, guarded, ..., unguarded]
+        pieces = _GUARD_RE.split(script)
+        variables: dict[str, str] = {}
+        latency = 0.0
+        chunks: list[bytes] = []
+        for index in range(0, len(pieces), 3):
+            blocks = [pieces[index]]
+            if index + 2 < len(pieces) and _guard_passes(pieces[index + 1], variables):
+                blocks.append(pieces[index + 2])
+            for block in blocks:
+                sections = _SECTION_RE.findall(block)
+                commands = _COMPOSITE_COMMAND_RE.findall(block)
+                if len(sections) != len(commands):
+                    raise ValueError(f"found {len(sections)} sections and {len(commands)} commands in a script block")
+                for (marker, name), section_command in zip(sections, commands):
+                    if section_command not in self.outputs:
+                        raise ValueError(f"no output for section {name}: {section_command!r}")
+                    section_latency, stdout, stderr, exit_code = self.respond(section_command)
+                    if name == "boot_fingerprint":
+                        variables = {"$_fp": stdout.decode().rstrip("\n"), "$_fprc": str(exit_code)}
+                    latency += section_latency
+                    chunks.append(f"\n{marker} BEGIN {name}\n".encode() + stdout.rstrip(b"\n") + b"\n")
+                    chunks.append(f"{marker} STDERR {name}\n".encode() + stderr[:4096])
+                    chunks.append(f"\n{marker} END {name} {exit_code}\n".encode())
+        if not chunks:
+            raise ValueError("found no sections in the composite script")
+        return latency, b"".join(chunks), b"", 0
+
+    def _accept_forever(self) -> None:
+        while not self._closed.is_set():
+            try:
+                conn, _addr = self._listener.accept()
+            except OSError:
+                return
+            self.stats.count("connections")
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn: socket.socket) -> None:
+        transport = paramiko.Transport(conn)
+        transport.add_server_key(self._host_key)
+        self._transports.append(transport)
+        try:
+            transport.start_server(server=_ServerInterface(self))
+        except (paramiko.SSHException, EOFError, OSError):
+            transport.close()
+
+    def _execute(self, channel: paramiko.Channel, command: str) -> None:
+        self.stats.count("commands")
+        try:
+            latency, stdout, stderr, exit_code = self.respond(command)
+        except ValueError as exc:
+            self._errors.append(exc)
+            latency, stdout, stderr, exit_code = 0.0, b"", f"{exc}\n".encode(), 1
+        time.sleep(max(latency, _MIN_LATENCY_SEC))
+        try:
+            channel.sendall(stdout)
+            channel.sendall_stderr(stderr)
+            channel.send_exit_status(exit_code)
+        except (OSError, EOFError, paramiko.SSHException):
+            pass
+        finally:
+            channel.close()
+
+
+def _guard_passes(test: str, variables: dict[str, str]) -> bool:
+    """Evaluate a `[ "$var" != 'value' ]` guard of the composite script."""
+    words = shlex.split(test)
+    if len(words) != 5 or words[0] != "[" or words[2] != "!=" or words[4] != "]":
+        raise ValueError(f"unsupported guard in the composite script: {test!r}")
+    return variables.get(words[1], "") != words[3]
+
+
+class _ServerInterface(paramiko.ServerInterface):
+    def __init__(self, server: FakeSSHServer) -> None:
+        self._server = server
+
+    def get_allowed_auths(self, username: str) -> str:
+        return "password"
+
+    def check_auth_password(self, username: str, password: str) -> int:
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind: str, chanid: int) -> int:
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel: paramiko.Channel, command: bytes) -> bool:
+        threading.Thread(target=self._server._execute, args=(channel, command.decode()), daemon=True).start()
+        return True
+
+
+class IngestStub:
+    """``POST /v1/ingest/batches`` that accepts everything after ``latency_sec``."""
+
+    def __init__(self, latency_sec: float = 0.0) -> None:
+        self.batches = 0
+        self.entities = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:  # noqa: N802
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                size = len(body)
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                entities = len(json.loads(body).get("entities", []))
+                time.sleep(latency_sec)
+                with stub._lock:
+                    stub.batches += 1
+                    stub.entities += entities
+                    stub.bytes_received += size
+                reply = json.dumps({"batch_id": str(uuid.uuid4())}).encode()
+                self.send_response(201)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            def log_message(self, *_args: object) -> None:
+                return None
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def __enter__(self) -> "IngestStub":
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,152 @@
+"""Cold-start benchmark for the ssh_linux connector.
+
+Measures, over fresh interpreters:
+
+* time-to-exit for a validation error (bad ``--run-id``, bad ``--target-json``),
+* time-to-first-SSH-byte: from process spawn until the connector's SSH banner
+  reaches a local listening socket,
+* which heavy modules each path imports, from ``python -X importtime``.
+
+Usage::
+
+    python benchmarks/startup.py [--repeat 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("pydantic", "paramiko", "cryptography", "requests")
+
+_RUN_ID = "11111111-1111-1111-1111-111111111111"
+_TASK_ID = "22222222-2222-2222-2222-222222222222"
+
+
+def _base_args(run_id: str, target: dict | str) -> list[str]:
+    target_json = target if isinstance(target, str) else json.dumps(target)
+    return [
+        "--run-id",
+        run_id,
+        "--task-id",
+        _TASK_ID,
+        "--target-json",
+        target_json,
+        "--ingest-url",
+        "http://127.0.0.1:9",
+        "--ingest-token",
+        "bench-token",
+        "--schema-version",
+        "1.0",
+        "--timeout-sec",
+        "5",
+    ]
+
+
+def _target(port: int) -> dict:
+    return {
+        "type": "host",
+        "address": "127.0.0.1",
+        "port": port,
+        "user": "bench",
+        "auth": {"method": "password", "password": "bench"},
+    }
+
+
+def _command(args: list[str], importtime: bool = False) -> list[str]:
+    interpreter = [sys.executable]
+    if importtime:
+        interpreter += ["-X", "importtime"]
+    return interpreter + ["-m", "ssh_linux", *args]
+
+
+def _env() -> dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def time_to_exit(args: list[str]) -> float:
+    started = time.perf_counter()
+    subprocess.run(_command(args), env=_env(), capture_output=True, check=False)
+    return time.perf_counter() - started
+
+
+def time_to_first_ssh_byte() -> float:
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(1)
+        listener.settimeout(30)
+        port = listener.getsockname()[1]
+
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            _command(_base_args(_RUN_ID, _target(port))),
+            env=_env(),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            conn, _ = listener.accept()
+            with conn:
+                conn.recv(1)
+                elapsed = time.perf_counter() - started
+        finally:
+            proc.kill()
+            proc.wait()
+    return elapsed
+
+
+def imported_heavy_modules(args: list[str]) -> dict[str, float]:
+    """Top-level heavy modules imported by a run, with cumulative import time in ms."""
+    proc = subprocess.run(_command(args, importtime=True), env=_env(), capture_output=True, text=True, check=False)
+    found: dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = [part.strip() for part in line[len("import time:") :].split("|")]
+        if len(parts) != 3 or not parts[1].isdigit():
+            continue
+        name = parts[2]
+        if name in HEAVY_MODULES:
+            found[name] = int(parts[1]) / 1000
+    return found
+
+
+def _summary(samples: list[float]) -> str:
+    ms = sorted(sample * 1000 for sample in samples)
+    return f"median={statistics.median(ms):7.1f}ms  min={ms[0]:7.1f}ms  max={ms[-1]:7.1f}ms"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    options = parser.parse_args()
+
+    scenarios = {
+        "validation: bad run-id": _base_args("not-a-uuid", _target(22)),
+        "validation: bad target-json": _base_args(_RUN_ID, '{"type":"host"}'),
+    }
+
+    for name, args in scenarios.items():
+        samples = [time_to_exit(args) for _ in range(options.repeat)]
+        heavy = imported_heavy_modules(args)
+        imports = ", ".join(f"{module}={ms:.1f}ms" for module, ms in heavy.items()) or "none"
+        print(f"{name:32s} {_summary(samples)}  heavy imports: {imports}")
+
+    samples = [time_to_first_ssh_byte() for _ in range(options.repeat)]
+    print(f"{'time-to-first-SSH-byte':32s} {_summary(samples)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
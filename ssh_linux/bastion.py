@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from .errors import SSHConnectorError
+from .ssh_client import SSHClient, _format_exception_reason
+from .ssh_pool import PoolKey, pool_key
+
+if TYPE_CHECKING:
+    import paramiko
+
+    from .models import JumpHost
+
+
+class Tunnel:
+    """One ``direct-tcpip`` channel through a bastion, used as the inner SSH socket.
+
+    ``close`` is idempotent and gives the channel slot back to the bastion.
+    """
+
+    def __init__(self, channel: paramiko.Channel, bastion: _Bastion) -> None:
+        self.channel = channel
+        self._bastion = bastion
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            self.channel.close()
+        finally:
+            self._bastion.release()
+
+
+@dataclass
+class _Bastion:
+    jump: JumpHost
+    slots: threading.BoundedSemaphore
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    client: SSHClient | None = None
+    tunnels: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+    def release(self) -> None:
+        with self.lock:
+            self.tunnels -= 1
+            self.last_used = time.monotonic()
+        self.slots.release()
+
+
+class BastionPool:
+    """One shared SSH transport per jump host, multiplexing many inner connections.
+
+    Every target behind the same bastion (address, port, user, auth) is
+    reached over a ``direct-tcpip`` channel of a single outer connection,
+    so the bastion handshake is paid once per process rather than once per
+    target. At most ``JumpHost.max_channels`` tunnels are open per bastion;
+    further connects wait for a free slot within their own timeout. A dead
+    outer transport is reconnected by the next caller, and a bastion without
+    tunnels is closed after ``max_idle_sec``.
+    """
+
+    def __init__(self, max_idle_sec: float = 300.0) -> None:
+        self._max_idle_sec = max_idle_sec
+        self._lock = threading.Lock()
+        self._bastions: dict[PoolKey, _Bastion] = {}
+
+    def open_tunnel(self, jump: JumpHost, address: str, port: int, timeout_sec: float) -> Tunnel:
+        import paramiko
+
+        self._close_idle()
+        bastion = self._bastion(jump)
+        started = time.monotonic()
+        if not bastion.slots.acquire(timeout=timeout_sec):
+            raise SSHConnectorError(
+                f"SSH jump host channel limit reached: jump={_describe(jump)} "
+                f"max_channels={jump.max_channels} timeout_sec={timeout_sec}"
+            )
+        try:
+            with bastion.lock:
+                transport = _active_transport(bastion.client)
+                if transport is None:
+                    if bastion.client is not None:
+                        bastion.client.close()
+                    bastion.client = _connect(jump, timeout_sec - (time.monotonic() - started))
+                    transport = _active_transport(bastion.client)
+                bastion.tunnels += 1
+            remaining = max(0.0, timeout_sec - (time.monotonic() - started))
+            try:
+                channel = transport.open_channel(
+                    "direct-tcpip", (address, port), ("127.0.0.1", 0), timeout=remaining
+                )
+            except (paramiko.SSHException, OSError, EOFError) as exc:
+                with bastion.lock:
+                    bastion.tunnels -= 1
+                raise SSHConnectorError(
+                    f"SSH jump host could not reach target: jump={_describe(jump)} "
+                    f"destination={address}:{port} cause={_format_exception_reason(exc)}"
+                ) from exc
+        except BaseException:
+            bastion.slots.release()
+            raise
+        return Tunnel(channel, bastion)
+
+    def close(self) -> None:
+        with self._lock:
+            bastions = list(self._bastions.values())
+            self._bastions.clear()
+        for bastion in bastions:
+            if bastion.client is not None:
+                bastion.client.close()
+
+    def _bastion(self, jump: JumpHost) -> _Bastion:
+        key = pool_key(jump)
+        with self._lock:
+            bastion = self._bastions.get(key)
+            if bastion is None:
+                bastion = _Bastion(jump=jump, slots=threading.BoundedSemaphore(jump.max_channels))
+                self._bastions[key] = bastion
+            # Keeps _close_idle from closing it before this caller's tunnel is counted.
+            bastion.last_used = time.monotonic()
+            return bastion
+
+    def _close_idle(self) -> None:
+        now = time.monotonic()
+        idle: list[_Bastion] = []
+        with self._lock:
+            for key, bastion in list(self._bastions.items()):
+                if bastion.tunnels == 0 and now - bastion.last_used >= self._max_idle_sec:
+                    idle.append(self._bastions.pop(key))
+        for bastion in idle:
+            if bastion.client is not None:
+                bastion.client.close()
+
+
+BASTIONS = BastionPool()
+
+
+def _connect(jump: JumpHost, timeout_sec: float) -> SSHClient:
+    from .models import Target
+
+    target = Target(type="host", address=jump.address, port=jump.port, user=jump.user, auth=jump.auth)
+    client = SSHClient(target, timeout_sec=max(timeout_sec, 0.001))
+    try:
+        client.connect()
+    except SSHConnectorError as exc:
+        raise SSHConnectorError(f"SSH jump host connect failed: {exc}") from exc
+    return client
+
+
+def _active_transport(client: SSHClient | None) -> paramiko.Transport | None:
+    raw = client._client if client is not None else None
+    transport = raw.get_transport() if raw is not None else None
+    return transport if transport is not None and transport.is_active() else None
+
+
+def _describe(jump: JumpHost) -> str:
+    return f"{jump.user}@{jump.address}:{jump.port}"
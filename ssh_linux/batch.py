@@ -1,10 +1,24 @@
 from __future__ import annotations
 
+import json
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from typing import Sequence
+from uuid import UUID, uuid5
 
 from . import __version__
 from .collectors import HostFacts
-from .models import BatchV1, Entity, FileSystemFact, HostAttributes, HostKeys, Target
+from .models import (
+    BatchV1,
+    Entity,
+    FileSystemFact,
+    HostAttributes,
+    HostKeys,
+    PackageInventory,
+    Relation,
+    ServiceEntity,
+    Target,
+)
 
 
 def build_batch(
@@ -13,7 +27,212 @@ def build_batch(
     target: Target,
     facts: HostFacts,
     schema_version: str = "1.0",
+    validate: bool = False,
 ) -> dict:
+    """BatchV1 payload for one host.
+
+    ``facts`` come from the connector's own parsers, whose types already match
+    the schema, so by default the payload is assembled as plain dicts. With
+    ``validate`` every model is built and checked by pydantic instead; the
+    result is identical, which makes it a debugging aid rather than a mode.
+    A partial collection lists its collector units in ``meta.collectors``.
+    The host entity comes first, followed by its services.
+    """
+    host = build_entity(target, facts, validate=validate)
+    services, relations = build_services(host["external_id"], facts, validate=validate)
+    payload = {
+        "schema_version": schema_version,
+        "source": "ssh_linux",
+        "run_id": run_id,
+        "job_id": task_id,
+        "collected_at": _utc_now_rfc3339(),
+        "entities": [host, *services],
+        "relations": relations,
+        "meta": {
+            "target_address": target.address,
+            "connector_version": __version__,
+        },
+    }
+    if facts.collectors is not None:
+        payload["meta"]["collectors"] = list(facts.collectors)
+    if validate:
+        return BatchV1.model_validate(payload).model_dump(exclude_none=True)
+    return payload
+
+
+def build_entity(target: Target, facts: HostFacts, validate: bool = False) -> dict:
+    """Host entity as it appears in ``BatchV1.entities``; see ``build_batch`` for ``validate``."""
+    if validate:
+        return _entity_model(target, facts).model_dump(exclude_none=True)
+    return _entity_dict(target, facts)
+
+
+def build_services(host_external_id: str, facts: HostFacts, validate: bool = False) -> tuple[list[dict], list[dict]]:
+    """Service entities for the host's listening sockets and one ``hosts`` relation to each.
+
+    Entities are plain dicts built straight from the parsed tuples, like
+    ``build_entity``; ``validate`` runs them through the pydantic models.
+    """
+    entities: list[dict] = []
+    relations: list[dict] = []
+    for proto, address, port, process in facts.services:
+        external_id = _service_external_id(host_external_id, proto, address, port, process)
+        entities.append(
+            {
+                "entity_type": "service",
+                "external_id": external_id,
+                "keys": {"host": host_external_id, "proto": proto, "address": address, "port": port},
+                "attributes": {"process": process} if process is not None else {},
+            }
+        )
+        relations.append(
+            {"relation_type": "hosts", "from_external_id": host_external_id, "to_external_id": external_id}
+        )
+    if validate:
+        entities = [ServiceEntity.model_validate(item).model_dump(exclude_none=True) for item in entities]
+        relations = [Relation.model_validate(item).model_dump() for item in relations]
+    return entities, relations
+
+
+@dataclass(frozen=True)
+class BatchChunk:
+    idempotency_key: str
+    payload: dict
+    members: list[str]
+
+
+class BatchAggregator:
+    """Packs many hosts' entities into as few BatchV1 payloads as the limits allow.
+
+    Entities are ordered by external_id before chunking, so the same set of
+    hosts always yields the same chunks and the same idempotency keys, no
+    matter in which order their collections finished. ``members`` maps each
+    chunk back to the caller-supplied member ids (for example per-host task
+    ids) of the hosts it contains. A host's services and relations always
+    land in the same chunk as the host, and count towards its limits.
+    """
+
+    def __init__(
+        self,
+        run_id: str,
+        task_id: str,
+        schema_version: str = "1.0",
+        max_entities: int = 500,
+        max_bytes: int = 4 * 1024 * 1024,
+        collectors: Sequence[str] | None = None,
+    ) -> None:
+        self._run_id = run_id
+        self._collectors = collectors
+        self._task_id = task_id
+        self._schema_version = schema_version
+        self._max_entities = max_entities
+        self._max_bytes = max_bytes
+        self._entries: list[_Entry] = []
+        self._unchanged: set[str] = set()
+
+    def add(self, member: str, target: Target, facts: HostFacts) -> None:
+        entity = build_entity(target, facts)
+        services, relations = build_services(entity["external_id"], facts)
+        self.add_entity(member, target.address, entity, related=services, relations=relations)
+
+    def add_entity(
+        self,
+        member: str,
+        address: str,
+        entity: dict,
+        unchanged: bool = False,
+        related: Sequence[dict] = (),
+        relations: Sequence[dict] = (),
+    ) -> None:
+        """Add an already-built entity; ``unchanged`` marks a delta-ingest marker.
+
+        ``related`` are further entities of the same host (its services) and
+        ``relations`` the relations between them.
+        """
+        self._entries.append(_Entry(entity["external_id"], member, entity, address, list(related), list(relations)))
+        if unchanged:
+            self._unchanged.add(member)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def chunks(self) -> list[BatchChunk]:
+        collected_at = _utc_now_rfc3339()
+        envelope_bytes = _json_size(self._payload([], [], collected_at))
+
+        chunks: list[BatchChunk] = []
+        current: list[_Entry] = []
+        current_entities = 0
+        current_bytes = envelope_bytes
+        for entry in sorted(self._entries, key=lambda item: (item.external_id, item.member)):
+            # Each entity and relation JSON plus a separating comma, and the address in meta.
+            entry_bytes = sum(_json_size(item) + 1 for item in (entry.entity, *entry.related, *entry.relations))
+            entry_bytes += _json_size(entry.address) + 1
+            entry_entities = 1 + len(entry.related)
+            full = (
+                current_entities + entry_entities > self._max_entities
+                or current_bytes + entry_bytes > self._max_bytes
+            )
+            if current and full:
+                chunks.append(self._chunk(current, collected_at))
+                current, current_entities, current_bytes = [], 0, envelope_bytes
+            current.append(entry)
+            current_entities += entry_entities
+            current_bytes += entry_bytes
+        if current:
+            chunks.append(self._chunk(current, collected_at))
+        return chunks
+
+    def _chunk(self, entries: list[_Entry], collected_at: str) -> BatchChunk:
+        payload = self._payload(
+            [entity for entry in entries for entity in (entry.entity, *entry.related)],
+            [entry.address for entry in entries],
+            collected_at,
+            [relation for entry in entries for relation in entry.relations],
+        )
+        unchanged = [entry.external_id for entry in entries if entry.member in self._unchanged]
+        if unchanged:
+            payload["meta"]["delta"] = {"unchanged_external_ids": unchanged}
+        members = [entry.member for entry in entries]
+        key_material = "\n".join(f"{entry.external_id}|{entry.member}" for entry in entries)
+        return BatchChunk(
+            idempotency_key=str(uuid5(UUID(self._task_id), f"chunk:{key_material}")),
+            payload=payload,
+            members=members,
+        )
+
+    def _payload(
+        self, entities: list[dict], addresses: list[str], collected_at: str, relations: list[dict] | None = None
+    ) -> dict:
+        payload = {
+            "schema_version": self._schema_version,
+            "source": "ssh_linux",
+            "run_id": self._run_id,
+            "job_id": self._task_id,
+            "collected_at": collected_at,
+            "entities": entities,
+            "relations": relations or [],
+            "meta": {
+                "target_addresses": addresses,
+                "connector_version": __version__,
+            },
+        }
+        if self._collectors is not None:
+            payload["meta"]["collectors"] = list(self._collectors)
+        return payload
+
+
+@dataclass(frozen=True)
+class _Entry:
+    external_id: str
+    member: str
+    entity: dict
+    address: str
+    related: list[dict] = field(default_factory=list)
+    relations: list[dict] = field(default_factory=list)
+
+
+def _entity_model(target: Target, facts: HostFacts) -> Entity:
     external_id = facts.fqdn or facts.hostname or target.address
 
     keys = HostKeys(
@@ -30,30 +249,62 @@ def build_batch(
         cpu_cores=facts.cpu_cores,
         mem_total_kb=facts.mem_total_kb,
         uptime_sec=facts.uptime_sec,
-        filesystems=[FileSystemFact.model_validate(item) for item in facts.filesystems],
+        filesystems=(
+            [FileSystemFact.model_validate(item) for item in facts.filesystems]
+            if facts.collected("filesystems")
+            else None
+        ),
+        packages=PackageInventory.model_validate(facts.packages) if facts.packages is not None else None,
     )
-
-    batch = BatchV1(
-        schema_version=schema_version,
-        source="ssh_linux",
-        run_id=run_id,
-        job_id=task_id,
-        collected_at=_utc_now_rfc3339(),
-        entities=[
-            Entity(
-                entity_type="host",
-                external_id=external_id,
-                keys=keys,
-                attributes=attributes,
-            )
-        ],
-        relations=[],
-        meta={
-            "target_address": target.address,
-            "connector_version": __version__,
-        },
+    return Entity(
+        entity_type="host",
+        external_id=external_id,
+        keys=keys,
+        attributes=attributes,
     )
-    return batch.model_dump(exclude_none=True)
+
+
+def _entity_dict(target: Target, facts: HostFacts) -> dict:
+    # Mirrors _entity_model(...).model_dump(exclude_none=True) key for key.
+    keys = {
+        "hostname": facts.hostname,
+        "fqdn": facts.fqdn,
+        "machine_id": facts.machine_id,
+        "ipv4": list(facts.ipv4) or None,
+    }
+    attributes = {
+        "os_pretty": facts.os_pretty,
+        "os_id": facts.os_id,
+        "os_version_id": facts.os_version_id,
+        "kernel_release": facts.kernel_release,
+        "cpu_cores": facts.cpu_cores,
+        "mem_total_kb": facts.mem_total_kb,
+        "uptime_sec": facts.uptime_sec,
+    }
+    entity = {
+        "entity_type": "host",
+        "external_id": facts.fqdn or facts.hostname or target.address,
+        "keys": {key: value for key, value in keys.items() if value is not None},
+        "attributes": {key: value for key, value in attributes.items() if value is not None},
+    }
+    if facts.collected("filesystems"):
+        entity["attributes"]["filesystems"] = [dict(item) for item in facts.filesystems]
+    if facts.packages is not None:
+        # Items are immutable tuples; only the containers need copying.
+        entity["attributes"]["packages"] = {**facts.packages, "items": list(facts.packages["items"])}
+    return entity
+
+
+def _service_external_id(host_external_id: str, proto: str, address: str, port: int, process: str | None) -> str:
+    # Brackets keep an IPv6 address apart from its port; the process tells apart
+    # distinct servers sharing one port through SO_REUSEPORT.
+    endpoint = f"[{address}]:{port}" if ":" in address else f"{address}:{port}"
+    external_id = f"{host_external_id}/{proto}/{endpoint}"
+    return f"{external_id}/{process}" if process is not None else external_id
+
+
+def _json_size(value: object) -> int:
+    return len(json.dumps(value, separators=(",", ":")).encode("utf-8"))
 
 
 def _utc_now_rfc3339() -> str:
@@ -1,20 +1,110 @@
 from __future__ import annotations
 
+import contextvars
 import ipaddress
+import secrets
+import shlex
+import threading
+import time
 from dataclasses import dataclass, field
-from typing import Callable
+from typing import Callable, Iterable, Mapping, Sequence, TypeVar
 
-from .errors import CollectionConnectorError, SSHConnectorError
+from .deadline import Deadline
+from .errors import CollectionConnectorError, SSHConnectorError, ValidationConnectorError
+from .metrics import record_span, span
 from .parsers import (
     parse_df_p,
     parse_ipv4_from_ip_addr,
     parse_meminfo,
     parse_os_release,
+    parse_listening_sockets,
+    parse_packages,
     parse_uptime_seconds,
 )
-from .ssh_client import SSHClient
+from .sftp import FileRead
+from .ssh_client import DEFAULT_MAX_CHANNELS, CommandResult, CommandStream, SSHClient
+from .state import BootFingerprint, CachedFacts, FactCache
 
 LogFn = Callable[[str, str], None]
+FetchFn = Callable[[str], "str | None"]
+T = TypeVar("T")
+ParseLinesFn = Callable[[str, Callable[[Iterable[str]], T], str], "T | None"]
+CollectFn = Callable[["HostFacts", FetchFn, ParseLinesFn, bool, LogFn], None]
+
+COLLECT_MODES = ("exec", "batched")
+FILE_READERS = ("exec", "sftp")
+
+# Package manager name, then one status/name/version/arch row per package.
+# Hosts with neither dpkg nor rpm report "none" instead of failing. Wrapped
+# in `sh -c` because exec mode runs it under the account's login shell,
+# which need not be POSIX (fish, csh).
+_PACKAGES_COMMAND = "sh -c " + shlex.quote(
+    "if command -v dpkg-query >/dev/null 2>&1; then echo dpkg; "
+    "dpkg-query -W -f='${db:Status-Abbrev}\\t${Package}\\t${Version}\\t${Architecture}\\n'; "
+    "elif command -v rpm >/dev/null 2>&1; then echo rpm; "
+    "rpm -qa --queryformat 'ii \\t%{NAME}\\t%|EPOCH?{%{EPOCH}:}|%{VERSION}-%{RELEASE}\\t%{ARCH}\\n'; "
+    "else echo none; fi"
+)
+
+# Listening TCP sockets from ss, or from /proc/net when ss is not installed
+# (minimal images); the first line names the source for the parser. Wrapped
+# in `sh -c` for the same reason as _PACKAGES_COMMAND.
+_SOCKETS_COMMAND = "sh -c " + shlex.quote(
+    "if command -v ss >/dev/null 2>&1; then echo ss; ss -tlnp; "
+    "else echo proc; cat /proc/net/tcp; cat /proc/net/tcp6 2>/dev/null || true; fi"
+)
+
+# Listening sockets kept per host. Each becomes a service entity and a
+# host->service relation, so this bounds what one host adds to a batch.
+MAX_SERVICES = 1000
+
+# Section name -> remote command. Section names double as framing labels in
+# batched mode, so they must stay free of whitespace.
+_COMMANDS: dict[str, str] = {
+    "hostname": "hostname",
+    "fqdn": "hostname -f",
+    "machine_id": "cat /etc/machine-id",
+    "ip_addr": "ip -j addr",
+    "hostname_i": "hostname -I",
+    "os_release": "cat /etc/os-release",
+    "kernel_release": "uname -r",
+    "nproc": "nproc",
+    "meminfo": "cat /proc/meminfo",
+    "uptime": "cat /proc/uptime",
+    "df": "df -P",
+    "packages": _PACKAGES_COMMAND,
+    "sockets": _SOCKETS_COMMAND,
+    # Machine id, boot id and os-release mtime; with a fact cache it runs in
+    # place of machine_id. No unit claims it, so it is never run otherwise.
+    # os-release is often a symlink into /usr/lib, which is what a package
+    # upgrade rewrites.
+    "boot_fingerprint": "cat /etc/machine-id /proc/sys/kernel/random/boot_id && stat -L -c %Y /etc/os-release",
+}
+
+# Sections that are a plain `cat` of one file -> (path, max_bytes). With the
+# sftp file reader, exec mode reads these over SFTP instead of spawning cat.
+_FILE_SECTIONS: dict[str, tuple[str, int]] = {
+    "machine_id": ("/etc/machine-id", 4096),
+    "os_release": ("/etc/os-release", 64 * 1024),
+    "meminfo": ("/proc/meminfo", 64 * 1024),
+    "uptime": ("/proc/uptime", 4096),
+}
+
+# Sections whose output only changes across reboots or OS upgrades; with a
+# fact cache they are served from it while the host's boot fingerprint holds.
+_STATIC_SECTIONS = ("os_release", "kernel_release", "nproc")
+# Sections whose failure is not reported: a host without a boot fingerprint
+# is just collected without the fact cache.
+_OPTIONAL_SECTIONS = frozenset({"boot_fingerprint"})
+
+# Sections that exec mode only runs when an earlier section calls for them.
+_LAZY_SECTIONS = frozenset({"hostname_i"})
+# Sections whose output can be large (one df line per mount, thousands on
+# container hosts); exec mode streams these into their parser.
+_STREAMED_SECTIONS = ("df", "packages", "sockets")
+# Sections a lenient run drops once its deadline is nearly exhausted, so the
+# remaining budget goes to host identity, OS facts and the upload.
+_LOW_PRIORITY_SECTIONS = ("nproc", "meminfo", "uptime", "df", "packages", "sockets")
 
 
 @dataclass
@@ -34,82 +124,664 @@ class HostFacts:
     uptime_sec: int | None = None
 
     filesystems: list[dict[str, object]] = field(default_factory=list)
+    # parse_packages output: manager, count, digest and (name, version, arch) items.
+    packages: dict[str, object] | None = None
+    # Listening sockets as (proto, address, port, process), lowest ports first.
+    services: list[tuple[str, str, int, str | None]] = field(default_factory=list)
+
+    # Collector units that ran; None means all of them.
+    collectors: tuple[str, ...] | None = None
+
+    def collected(self, unit: str) -> bool:
+        return self.collectors is None or unit in self.collectors
+
+
+def collect_host_facts(
+    ssh: SSHClient,
+    strict: bool,
+    log: LogFn,
+    mode: str = "exec",
+    max_channels: int = DEFAULT_MAX_CHANNELS,
+    deadline: Deadline | None = None,
+    command_timeout_sec: int | None = None,
+    collectors: Sequence[str] | None = None,
+    file_reader: str = "exec",
+    fact_cache: FactCache | None = None,
+    fact_cache_key: str | None = None,
+) -> HostFacts:
+    """Collect the facts of ``collectors`` (every unit in ``COLLECTORS`` by default) from ``ssh``.
 
+    ``command_timeout_sec`` caps how long a single command may go without
+    output; ``deadline`` (already enforced by ``ssh``) lets a lenient run skip
+    ``_LOW_PRIORITY_SECTIONS`` when little of the task's budget is left.
+    Each unit that ran logs a ``collector`` span with the remote time and
+    stdout bytes of its commands. ``file_reader="sftp"`` makes exec mode read
+    file-backed sections over one SFTP session, falling back to exec.
 
-def collect_host_facts(ssh: SSHClient, strict: bool, log: LogFn) -> HostFacts:
-    facts = HostFacts()
+    With ``fact_cache`` the boot fingerprint replaces ``cat /etc/machine-id``
+    and runs along with the other sections. ``_STATIC_SECTIONS`` cached under
+    ``fact_cache_key`` for that same fingerprint are served from the cache:
+    the batched script only runs them when the fingerprint differs, and exec
+    mode only fetches them on a miss. Fresh ones are stored for next time.
+    """
+    if mode not in COLLECT_MODES:
+        raise ValueError(f"unknown collect mode: {mode}")
+    units = [COLLECTORS[name] for name in resolve_collectors(names=collectors) or COLLECTORS]
+    sections = [name for name in _COMMANDS if any(name in unit.sections for unit in units)]
+    previous: CachedFacts | None = None
+    reusable: list[str] = []
+    fingerprinted = (
+        fact_cache is not None
+        and fact_cache_key is not None
+        and any(name == "machine_id" or name in _STATIC_SECTIONS for name in sections)
+    )
+    if fingerprinted:
+        previous = fact_cache.lookup(fact_cache_key)
+        if previous is not None:
+            reusable = [name for name in _STATIC_SECTIONS if name in sections and name in previous.sections]
+        # First, so the batched script can check it before the sections it guards.
+        sections = ["boot_fingerprint", *sections]
 
-    facts.hostname = _run_text(ssh, "hostname", strict, log)
-    facts.fqdn = _run_text(ssh, "hostname -f", strict, log) or facts.hostname
-    facts.machine_id = _run_text(ssh, "cat /etc/machine-id", strict, log)
+    served: dict[str, CommandResult | None] = {}
+    if mode == "batched":
+        guards: dict[str, str] = {}
+        if fingerprinted:
+            # The fingerprint section sets _fp and _fprc; see _build_composite_script.
+            guards["machine_id"] = '[ "$_fprc" != 0 ]'
+            if previous is not None:
+                expected = shlex.quote(_fingerprint_text(previous.fingerprint))
+                guards.update((name, f'[ "$_fp" != {expected} ]') for name in reusable)
+        fetch_remote = _batched_fetcher(ssh, strict, log, deadline, command_timeout_sec, sections, served, guards)
+        parse_lines = _text_line_parser(fetch_remote, strict, log)
+    else:
+        # machine_id is only needed if the fingerprint fails, the cached sections only on a miss.
+        deferred = ["machine_id", *reusable] if fingerprinted else []
+        fetch_remote, parse_lines = _exec_fetcher(
+            ssh, strict, log, max_channels, deadline, command_timeout_sec, sections, served, file_reader, deferred
+        )
 
-    ip_addr_json = _run_text(ssh, "ip -j addr", strict, log)
+    cached: dict[str, str] = {}
+    fingerprint: BootFingerprint | None = None
+    if fingerprinted:
+        fingerprint = _parse_fingerprint(fetch_remote("boot_fingerprint"))
+    if fingerprint is not None:
+        hit = previous is not None and previous.fingerprint == fingerprint
+        if hit:
+            cached = {name: previous.sections[name] for name in reusable}
+        result = served.get("boot_fingerprint")
+        duration = result.duration_sec if result is not None else 0.0
+        record_span("fact_cache", duration, name="hit" if hit else "miss", sections=len(cached))
+        cached["machine_id"] = fingerprint.machine_id
+    fresh: dict[str, str] = {}
+
+    def fetch(name: str) -> str | None:
+        if name in cached:
+            return cached[name]
+        text = fetch_remote(name)
+        if text is not None and name in _STATIC_SECTIONS:
+            fresh[name] = text
+        return text
+
+    facts = HostFacts(collectors=None if len(units) == len(COLLECTORS) else tuple(unit.name for unit in units))
+    for unit in units:
+        unit.collect(facts, fetch, parse_lines, strict, log)
+        _record_unit(unit, served)
+    if fingerprint is not None and fresh:
+        static = {name: text for name, text in cached.items() if name in _STATIC_SECTIONS}
+        try:
+            fact_cache.store(fact_cache_key, fingerprint, {**static, **fresh})
+        except OSError as exc:
+            log("warn", f"fact cache entry not written: {exc}")
+    return facts
+
+
+def resolve_collectors(profile: str = "full", names: Iterable[str] | None = None) -> tuple[str, ...] | None:
+    """Units to run, in registry order: ``names`` if given, else those of ``profile``.
+
+    Returns ``None`` when that is every unit, so full collection stays the
+    default everywhere a selection is threaded through.
+    """
+    if names is None:
+        selected = COLLECT_PROFILES.get(profile)
+        if selected is None:
+            raise ValidationConnectorError(
+                f"unknown collection profile {profile!r}; expected one of {', '.join(COLLECT_PROFILES)}"
+            )
+    else:
+        selected = tuple(names)
+        unknown = [name for name in selected if name not in COLLECTORS]
+        if unknown or not selected:
+            raise ValidationConnectorError(
+                f"unknown collectors {', '.join(unknown) or '(none given)'}; expected some of {', '.join(COLLECTORS)}"
+            )
+    ordered = tuple(name for name in COLLECTORS if name in selected)
+    return None if len(ordered) == len(COLLECTORS) else ordered
+
+
+def _collect_identity(facts: HostFacts, fetch: FetchFn, parse_lines: ParseLinesFn, strict: bool, log: LogFn) -> None:
+    facts.hostname = fetch("hostname")
+    facts.fqdn = fetch("fqdn") or facts.hostname
+    facts.machine_id = fetch("machine_id")
+
+
+def _collect_network(facts: HostFacts, fetch: FetchFn, parse_lines: ParseLinesFn, strict: bool, log: LogFn) -> None:
+    ip_addr_json = fetch("ip_addr")
     if ip_addr_json:
         try:
-            facts.ipv4 = parse_ipv4_from_ip_addr(ip_addr_json)
+            with span("parse", "ip_addr"):
+                facts.ipv4 = parse_ipv4_from_ip_addr(ip_addr_json)
         except Exception as exc:  # noqa: BLE001
             _handle_error(strict, log, f"failed to parse ip -j addr output: {exc}")
     if not facts.ipv4:
-        hostname_i = _run_text(ssh, "hostname -I", strict, log)
+        hostname_i = fetch("hostname_i")
         if hostname_i:
             facts.ipv4 = _extract_ipv4_tokens(hostname_i)
 
-    os_release_raw = _run_text(ssh, "cat /etc/os-release", strict, log)
+
+def _collect_os(facts: HostFacts, fetch: FetchFn, parse_lines: ParseLinesFn, strict: bool, log: LogFn) -> None:
+    os_release_raw = fetch("os_release")
     if os_release_raw:
         try:
-            os_values = parse_os_release(os_release_raw)
+            with span("parse", "os_release"):
+                os_values = parse_os_release(os_release_raw)
             facts.os_pretty = os_values.get("os_pretty")
             facts.os_id = os_values.get("os_id")
             facts.os_version_id = os_values.get("os_version_id")
         except Exception as exc:  # noqa: BLE001
             _handle_error(strict, log, f"failed to parse /etc/os-release: {exc}")
 
-    facts.kernel_release = _run_text(ssh, "uname -r", strict, log)
+    facts.kernel_release = fetch("kernel_release")
+
 
-    cpu_raw = _run_text(ssh, "nproc", strict, log)
+def _collect_cpu_mem(facts: HostFacts, fetch: FetchFn, parse_lines: ParseLinesFn, strict: bool, log: LogFn) -> None:
+    cpu_raw = fetch("nproc")
     if cpu_raw:
         try:
             facts.cpu_cores = int(cpu_raw)
         except ValueError as exc:
             _handle_error(strict, log, f"failed to parse nproc output: {exc}")
 
-    meminfo_raw = _run_text(ssh, "cat /proc/meminfo", strict, log)
+    meminfo_raw = fetch("meminfo")
     if meminfo_raw:
         try:
-            facts.mem_total_kb = parse_meminfo(meminfo_raw)
+            with span("parse", "meminfo"):
+                facts.mem_total_kb = parse_meminfo(meminfo_raw)
         except Exception as exc:  # noqa: BLE001
             _handle_error(strict, log, f"failed to parse /proc/meminfo: {exc}")
 
-    uptime_raw = _run_text(ssh, "cat /proc/uptime", strict, log)
+
+def _collect_uptime(facts: HostFacts, fetch: FetchFn, parse_lines: ParseLinesFn, strict: bool, log: LogFn) -> None:
+    uptime_raw = fetch("uptime")
     if uptime_raw:
         try:
-            facts.uptime_sec = parse_uptime_seconds(uptime_raw)
+            with span("parse", "uptime"):
+                facts.uptime_sec = parse_uptime_seconds(uptime_raw)
         except Exception as exc:  # noqa: BLE001
             _handle_error(strict, log, f"failed to parse /proc/uptime: {exc}")
 
-    df_raw = _run_text(ssh, "df -P", strict, log)
-    if df_raw:
+
+def _collect_filesystems(
+    facts: HostFacts, fetch: FetchFn, parse_lines: ParseLinesFn, strict: bool, log: LogFn
+) -> None:
+    facts.filesystems = parse_lines("df", parse_df_p, "df -P output") or []
+
+
+def _collect_packages(facts: HostFacts, fetch: FetchFn, parse_lines: ParseLinesFn, strict: bool, log: LogFn) -> None:
+    facts.packages = parse_lines("packages", parse_packages, "package list")
+
+
+def _collect_services(facts: HostFacts, fetch: FetchFn, parse_lines: ParseLinesFn, strict: bool, log: LogFn) -> None:
+    sockets = parse_lines("sockets", parse_listening_sockets, "listening sockets") or []
+    if len(sockets) > MAX_SERVICES:
+        log("warn", f"{len(sockets)} listening sockets; kept the {MAX_SERVICES} with the lowest ports")
+        del sockets[MAX_SERVICES:]
+    facts.services = sockets
+
+
+@dataclass(frozen=True)
+class Collector:
+    """One fact group: the sections it runs and the ``HostFacts`` fields it fills."""
+
+    name: str
+    sections: tuple[str, ...]
+    fields: tuple[str, ...]
+    collect: CollectFn
+
+
+# Registry order is collection order; a unit only reads sections of its own.
+COLLECTORS: dict[str, Collector] = {
+    unit.name: unit
+    for unit in (
+        Collector(
+            "identity",
+            ("hostname", "fqdn", "machine_id"),
+            ("hostname", "fqdn", "machine_id"),
+            _collect_identity,
+        ),
+        Collector("network", ("ip_addr", "hostname_i"), ("ipv4",), _collect_network),
+        Collector(
+            "os",
+            ("os_release", "kernel_release"),
+            ("os_pretty", "os_id", "os_version_id", "kernel_release"),
+            _collect_os,
+        ),
+        Collector("cpu_mem", ("nproc", "meminfo"), ("cpu_cores", "mem_total_kb"), _collect_cpu_mem),
+        Collector("uptime", ("uptime",), ("uptime_sec",), _collect_uptime),
+        Collector("filesystems", ("df",), ("filesystems",), _collect_filesystems),
+        Collector("packages", ("packages",), ("packages",), _collect_packages),
+        Collector("services", ("sockets",), ("services",), _collect_services),
+    )
+}
+
+COLLECT_PROFILES: dict[str, tuple[str, ...]] = {
+    "full": tuple(COLLECTORS),
+    # Host identity and what rarely changes on it; no per-mount df.
+    "identity": ("identity", "network", "os"),
+    # Cheapest refresh: is the host there, is it the same one, did it reboot.
+    "liveness": ("identity", "uptime"),
+}
+
+
+def _parse_fingerprint(text: str | None) -> BootFingerprint | None:
+    lines = text.split() if text else []
+    if len(lines) != 3 or not lines[2].isdigit():
+        return None
+    return BootFingerprint(machine_id=lines[0], boot_id=lines[1], os_release_mtime=int(lines[2]))
+
+
+def _fingerprint_text(fingerprint: BootFingerprint) -> str:
+    # What the fingerprint command prints, less the trailing newline the shell strips.
+    return f"{fingerprint.machine_id}\n{fingerprint.boot_id}\n{fingerprint.os_release_mtime}"
+
+
+def _record_unit(unit: Collector, served: dict[str, CommandResult | None]) -> None:
+    ran = [served[name] for name in unit.sections if name in served]
+    if not ran:
+        return
+    record_span(
+        "collector",
+        sum(result.duration_sec for result in ran if result is not None),
+        name=unit.name,
+        bytes=sum(result.stdout_bytes for result in ran if result is not None),
+        ok=all(result is not None and result.exit_code == 0 for result in ran),
+        commands=len(ran),
+    )
+
+
+def _exec_fetcher(
+    ssh: SSHClient,
+    strict: bool,
+    log: LogFn,
+    max_channels: int,
+    deadline: Deadline | None = None,
+    command_timeout_sec: int | None = None,
+    sections: Sequence[str] | None = None,
+    served: dict[str, CommandResult | None] | None = None,
+    file_reader: str = "exec",
+    deferred: Sequence[str] = (),
+) -> tuple[FetchFn, ParseLinesFn]:
+    """Run the independent commands of ``sections`` up front on concurrent channels.
+
+    ``hostname -I`` is only a fallback for ``ip -j addr`` and stays lazy.
+    So are the ``deferred`` sections, which the first fetch of any of them
+    runs together.
+    Sections that can grow large are streamed line by line into their parser
+    on a channel of their own. Errors are reported when a section is fetched,
+    so warnings and strict failures surface in the same order as sequential
+    execution. Every section fetched is recorded in ``served``, ``None`` for
+    one that failed at the SSH layer. With the sftp ``file_reader`` the
+    ``_FILE_SECTIONS`` are read over SFTP alongside the commands.
+    """
+    sections = list(_COMMANDS) if sections is None else sections
+    served = {} if served is None else served
+    skipped: set[str] = set()
+    if _low_budget(strict, deadline):
+        skipped.update(name for name in _LOW_PRIORITY_SECTIONS if name in sections)
+        if skipped:
+            _log_skipped(log, deadline, [name for name in _LOW_PRIORITY_SECTIONS if name in skipped])
+
+    streams: dict[str, CommandStream | SSHConnectorError] = {}
+    for name in _STREAMED_SECTIONS:
+        if name in skipped or name not in sections:
+            continue
+        try:
+            streams[name] = ssh.stream_lines(_COMMANDS[name], timeout_sec=command_timeout_sec)
+        except SSHConnectorError as exc:
+            streams[name] = exc
+
+    names = [
+        name
+        for name in sections
+        if name not in _LAZY_SECTIONS
+        and name not in _STREAMED_SECTIONS
+        and name not in skipped
+        and name not in deferred
+    ]
+    pending = [name for name in deferred if name not in skipped]
+    reader: _SFTPReader | None = None
+    if file_reader == "sftp" and any(name in _FILE_SECTIONS for name in names):
+        reader = _SFTPReader(ssh, [name for name in names if name in _FILE_SECTIONS], command_timeout_sec)
+        names = [name for name in names if name not in _FILE_SECTIONS]
+    prefetched = _run_all(
+        ssh, names, max(1, max_channels - len(streams) - (reader is not None)), command_timeout_sec
+    )
+    labels: dict[str, str] = {}
+    if reader is not None:
+        prefetched.update(reader.results())
+        labels = reader.labels
+
+    def fetch(name: str) -> str | None:
+        command = labels.get(name) or _COMMANDS[name]
+        if name in skipped:
+            return None
+        if name in pending:
+            prefetched.update(_run_all(ssh, pending, max_channels, command_timeout_sec))
+            pending.clear()
+        outcome = prefetched.pop(name, None)
+        if outcome is None:
+            try:
+                outcome = ssh.run(command, timeout_sec=command_timeout_sec)
+            except SSHConnectorError as exc:
+                outcome = exc
+        section_strict, section_log = _reporting(name, strict, log)
+        if isinstance(outcome, SSHConnectorError):
+            served[name] = None
+            _handle_error(section_strict, section_log, f"{command} failed: {outcome}")
+            return None
+        served[name] = outcome
+        return _result_text(command, outcome, section_strict, section_log)
+
+    def parse_lines(name: str, parse: Callable[[Iterable[str]], T], what: str) -> T | None:
+        command = _COMMANDS[name]
+        if name in skipped:
+            return None
+        stream = streams.pop(name, None)
+        if stream is None:
+            return _text_line_parser(fetch, strict, log)(name, parse, what)
+        if isinstance(stream, SSHConnectorError):
+            served[name] = None
+            _handle_error(strict, log, f"{command} failed: {stream}")
+            return None
+        if name in _LOW_PRIORITY_SECTIONS and _low_budget(strict, deadline):
+            # The stream may still be running; leave what is left of the budget to the upload.
+            stream.close()
+            _log_skipped(log, deadline, [name])
+            return None
+
+        parsed: T | None = None
+        parse_error: Exception | None = None
+        try:
+            with stream:
+                lines = iter(stream)
+                try:
+                    parsed = parse(lines)
+                except SSHConnectorError:
+                    raise
+                except Exception as exc:  # noqa: BLE001
+                    parse_error = exc
+                # Drain whatever the parser left so the exit code is known.
+                for _line in lines:
+                    pass
+        except SSHConnectorError as exc:
+            served[name] = None
+            _handle_error(strict, log, f"{command} failed: {exc}")
+            return None
+
+        served[name] = stream.result
+        # Same order of checks as a buffered section: exit code, then parse.
+        if not _result_ok(command, stream.result, strict, log):
+            return None
+        if parse_error is not None:
+            _handle_error(strict, log, f"failed to parse {what}: {parse_error}")
+            return None
+        return parsed
+
+    return fetch, parse_lines
+
+
+class _SFTPReader:
+    """``SSHClient.read_files`` for file-backed sections, on a thread alongside ``run_many``.
+
+    If the host has no SFTP subsystem, or the session fails, the same
+    sections run as their exec commands instead.
+    """
+
+    def __init__(self, ssh: SSHClient, names: list[str], timeout_sec: int | None) -> None:
+        self.labels: dict[str, str] = {}
+        self._ssh = ssh
+        self._names = names
+        self._timeout_sec = timeout_sec
+        self._outcome: list[FileRead] | SSHConnectorError | None = None
+        self._duration_sec = 0.0
+        # Copy the context so spans logged from the thread keep the task fields.
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(target=context.run, args=(self._read,), name="ssh_linux-sftp", daemon=True)
+        self._thread.start()
+
+    def results(self) -> dict[str, CommandResult | SSHConnectorError]:
+        self._thread.join()
+        if not isinstance(self._outcome, list):
+            try:
+                results = self._ssh.run_many([_COMMANDS[name] for name in self._names], timeout_sec=self._timeout_sec)
+            except SSHConnectorError as exc:
+                return {name: exc for name in self._names}
+            return dict(zip(self._names, results))
+
+        self.labels = {name: f"sftp read {read.path}" for name, read in zip(self._names, self._outcome)}
+        return {name: self._result(read) for name, read in zip(self._names, self._outcome)}
+
+    def _read(self) -> None:
+        started = time.monotonic()
         try:
-            facts.filesystems = parse_df_p(df_raw)
+            self._outcome = self._ssh.read_files(
+                [_FILE_SECTIONS[name] for name in self._names], timeout_sec=self._timeout_sec
+            )
+        except SSHConnectorError as exc:
+            self._outcome = exc
+        self._duration_sec = time.monotonic() - started
+
+    def _result(self, read: FileRead) -> CommandResult:
+        # Shaped like the result of `cat`, so the same checks and parsers apply.
+        return CommandResult(
+            exit_code=0 if read.error is None else 1,
+            stdout=read.data.decode("utf-8", errors="replace").strip(),
+            stderr=read.error or "",
+            stdout_truncated=read.truncated,
+            duration_sec=self._duration_sec,
+            stdout_bytes=len(read.data),
+        )
+
+
+def _text_line_parser(fetch: FetchFn, strict: bool, log: LogFn) -> ParseLinesFn:
+    """``parse_lines`` over fully buffered section text."""
+
+    def parse_lines(name: str, parse: Callable[[Iterable[str]], T], what: str) -> T | None:
+        raw = fetch(name)
+        if not raw:
+            return None
+        try:
+            with span("parse", name):
+                return parse(raw.splitlines())
         except Exception as exc:  # noqa: BLE001
-            _handle_error(strict, log, f"failed to parse df -P output: {exc}")
+            _handle_error(strict, log, f"failed to parse {what}: {exc}")
+            return None
 
-    return facts
+    return parse_lines
+
+
+def _batched_fetcher(
+    ssh: SSHClient,
+    strict: bool,
+    log: LogFn,
+    deadline: Deadline | None = None,
+    command_timeout_sec: int | None = None,
+    sections: Sequence[str] | None = None,
+    served: dict[str, CommandResult | None] | None = None,
+    guards: Mapping[str, str] | None = None,
+) -> FetchFn:
+    """Run ``sections`` in one composite remote script and serve results from it.
 
+    The script prints each section as it finishes, so ``command_timeout_sec``
+    still catches a single hung section. A section with a shell test in
+    ``guards`` only runs when the test passes; it is not fetched otherwise.
+    """
+    sections = list(_COMMANDS) if sections is None else sections
+    served = {} if served is None else served
+    skipped: tuple[str, ...] = ()
+    if _low_budget(strict, deadline):
+        skipped = tuple(name for name in _LOW_PRIORITY_SECTIONS if name in sections)
+        if skipped:
+            _log_skipped(log, deadline, skipped)
+    marker = f"@@ssh_linux:{secrets.token_hex(8)}"
+    script = _build_composite_script(marker, [name for name in sections if name not in skipped], guards)
 
-def _run_text(ssh: SSHClient, command: str, strict: bool, log: LogFn) -> str | None:
+    demuxed: dict[str, CommandResult] = {}
     try:
-        result = ssh.run(command)
+        result = ssh.run(f"sh -c {shlex.quote(script)}", timeout_sec=command_timeout_sec)
     except SSHConnectorError as exc:
-        _handle_error(strict, log, f"{command} failed: {exc}")
+        _handle_error(strict, log, f"batched collection failed: {exc}")
+        result = None
+
+    if result is not None:
+        demuxed = _demux_sections(result.stdout, marker)
+
+    def fetch(name: str) -> str | None:
+        command = _COMMANDS[name]
+        section = demuxed.get(name)
+        if name not in skipped:
+            served[name] = section
+        section_strict, section_log = _reporting(name, strict, log)
+        if section is None:
+            if result is not None and name not in skipped:
+                _handle_error(section_strict, section_log, f"{command} produced no section in batched output")
+            return None
+        return _result_text(command, section, section_strict, section_log)
+
+    return fetch
+
+
+def _run_all(
+    ssh: SSHClient, names: Sequence[str], max_channels: int, timeout_sec: int | None
+) -> dict[str, CommandResult | SSHConnectorError]:
+    try:
+        results = ssh.run_many([_COMMANDS[name] for name in names], max_channels=max_channels, timeout_sec=timeout_sec)
+    except SSHConnectorError as exc:
+        return {name: exc for name in names}
+    return dict(zip(names, results))
+
+
+def _reporting(name: str, strict: bool, log: LogFn) -> tuple[bool, LogFn]:
+    """``strict`` and ``log`` to report a failure of section ``name`` with."""
+    if name in _OPTIONAL_SECTIONS:
+        return False, lambda _level, _message: None
+    return strict, log
+
+
+def _build_composite_script(
+    marker: str, names: Iterable[str] | None = None, guards: Mapping[str, str] | None = None
+) -> str:
+    lines = [
+        '_e=$(mktemp 2>/dev/null) || _e="/tmp/.ssh_linux.$$"',
+        "trap 'rm -f \"$_e\"' EXIT",
+    ]
+    # `hostname -I` is always captured: it is cheap, and deciding locally
+    # whether it is needed keeps the fallback identical to exec mode, which
+    # ignores loopback addresses when parsing `ip -j addr`.
+    for name in _COMMANDS if names is None else names:
+        section = _composite_section(marker, name, _COMMANDS[name])
+        guard = (guards or {}).get(name)
+        lines.extend([f"if {guard}; then", *section, "fi"] if guard else section)
+        if name == "boot_fingerprint":
+            # Guards of later sections compare against the fingerprint and its exit code.
+            lines.append('_fp=$_out _fprc=$_rc')
+    return "\n".join(lines) + "\n"
+
+
+def _composite_section(marker: str, name: str, command: str) -> list[str]:
+    # /proc/uptime is read with the `read` builtin, so timing a section forks
+    # nothing; its 10 ms resolution is enough to tell cheap sections from expensive ones.
+    return [
+        "read _t0 _ 2>/dev/null </proc/uptime || _t0=-",
+        f"_out=$({{ {command}\n}} 2>\"$_e\" </dev/null); _rc=$?",
+        "read _t1 _ 2>/dev/null </proc/uptime || _t1=-",
+        f"printf '\\n%s\\n%s\\n' '{marker} BEGIN {name}' \"$_out\"",
+        f"printf '%s\\n' '{marker} STDERR {name}'; head -c 4096 \"$_e\"",
+        f"printf '\\n%s\\n' \"{marker} END {name} $_rc $_t0 $_t1\"",
+    ]
+
+
+def _demux_sections(raw: str, marker: str) -> dict[str, CommandResult]:
+    sections: dict[str, CommandResult] = {}
+    name: str | None = None
+    stream: list[str] | None = None
+    stdout_lines: list[str] = []
+    stderr_lines: list[str] = []
+
+    for line in raw.splitlines():
+        if not line.startswith(marker + " "):
+            if stream is not None:
+                stream.append(line)
+            continue
+
+        parts = line[len(marker) + 1 :].split()
+        if len(parts) == 2 and parts[0] == "BEGIN":
+            name, stream = parts[1], stdout_lines
+            stdout_lines.clear()
+            stderr_lines.clear()
+        elif len(parts) == 2 and parts[0] == "STDERR" and parts[1] == name:
+            stream = stderr_lines
+        elif len(parts) in (3, 5) and parts[0] == "END" and parts[1] == name:
+            try:
+                exit_code = int(parts[2])
+            except ValueError:
+                exit_code = -1
+            stdout = "\n".join(stdout_lines).strip()
+            sections[name] = CommandResult(
+                exit_code=exit_code,
+                stdout=stdout,
+                stderr="\n".join(stderr_lines).strip(),
+                duration_sec=_section_duration(parts[3:]),
+                stdout_bytes=len(stdout.encode("utf-8")),
+            )
+            name, stream = None, None
+
+    return sections
+
+
+def _section_duration(stamps: list[str]) -> float:
+    try:
+        started, finished = (float(stamp) for stamp in stamps)
+    except ValueError:
+        return 0.0
+    return max(0.0, finished - started)
+
+
+def _result_text(command: str, result: CommandResult, strict: bool, log: LogFn) -> str | None:
+    if not _result_ok(command, result, strict, log):
         return None
 
+    return result.stdout.strip() if result.stdout else None
+
+
+def _result_ok(command: str, result: CommandResult, strict: bool, log: LogFn) -> bool:
     if result.exit_code != 0:
         message = f"{command} returned exit={result.exit_code} stderr={result.stderr[:200]}"
         _handle_error(strict, log, message)
-        return None
+        return False
+    if result.stdout_truncated:
+        _handle_error(strict, log, f"{command} output exceeded the stdout cap and was truncated")
+    return True
 
-    return result.stdout.strip() if result.stdout else None
+
+def _low_budget(strict: bool, deadline: Deadline | None) -> bool:
+    # Strict runs want every fact or a failure, never a silently thinner host.
+    return not strict and deadline is not None and deadline.nearly_exhausted()
+
+
+def _log_skipped(log: LogFn, deadline: Deadline | None, names: Iterable[str]) -> None:
+    remaining = deadline.remaining() if deadline is not None else 0.0
+    commands = ", ".join(_COMMANDS[name] for name in names)
+    log("warn", f"task deadline nearly exhausted ({remaining:.1f}s left); skipped {commands}")
 
 
 def _handle_error(strict: bool, log: LogFn, message: str) -> None:
@@ -119,12 +791,12 @@ def _handle_error(strict: bool, log: LogFn, message: str) -> None:
 
 
 def _extract_ipv4_tokens(raw: str) -> list[str]:
-    ipv4: list[str] = []
+    ipv4: dict[str, None] = {}
     for token in raw.split():
         try:
             value = str(ipaddress.ip_address(token))
         except ValueError:
             continue
-        if "." in value and value not in ipv4:
-            ipv4.append(value)
-    return ipv4
+        if "." in value:
+            ipv4[value] = None
+    return list(ipv4)
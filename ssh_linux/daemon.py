@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import json
+import os
+import signal
+import socketserver
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from functools import partial
+from typing import IO, Any, Callable, Iterable, Iterator
+
+from pydantic import ValidationError as PydanticValidationError
+
+from .bastion import BASTIONS
+from .collectors import resolve_collectors
+from .errors import ExitCode, ValidationConnectorError
+from .ingest_client import IngestClientCache
+from .main import log, validate_uuid
+from .models import TaskEnvelope
+from .pipeline import TaskResult, TaskSpec, run_task, task_context
+from .prescan import Prescanner
+from .ssh_pool import SSHConnectionPool
+from .state import FactCache, FactStateStore
+
+
+class _ResultWriter:
+    """Serializes result lines from concurrent workers onto one stream."""
+
+    def __init__(self, stream: IO[bytes]) -> None:
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def write(self, payload: dict[str, Any]) -> None:
+        data = (json.dumps(payload, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            try:
+                self._stream.write(data)
+                self._stream.flush()
+            except (BrokenPipeError, ConnectionResetError, ValueError):
+                # The caller went away; the task itself already ran and logged.
+                pass
+
+
+def handle_envelope(
+    raw: str,
+    defaults: dict[str, Any],
+    ssh_pool: SSHConnectionPool | None = None,
+    ingest_clients: IngestClientCache | None = None,
+    fact_state: FactStateStore | None = None,
+    fact_cache: FactCache | None = None,
+    prescanner: Prescanner | None = None,
+) -> dict[str, Any]:
+    """Run one NDJSON task envelope and return its ``task_result`` payload."""
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        return _validation_failure(None, None, "task envelope must be valid JSON")
+
+    run_id = data.get("run_id") if isinstance(data, dict) else None
+    task_id = data.get("task_id") if isinstance(data, dict) else None
+    if not isinstance(run_id, str):
+        run_id = None
+    if not isinstance(task_id, str):
+        task_id = None
+
+    try:
+        envelope = TaskEnvelope.model_validate(data)
+    except PydanticValidationError:
+        return _validation_failure(run_id, task_id, "task envelope failed schema validation")
+
+    try:
+        spec = _build_spec(envelope, defaults)
+    except ValidationConnectorError as exc:
+        return _validation_failure(run_id, task_id, str(exc))
+
+    error = None
+    # A pooled connection already shows the target is up; probing it would only open another.
+    if prescanner is not None and not (ssh_pool is not None and ssh_pool.has_connection(spec.target, spec.ssh_profile)):
+        error = prescanner.scan([spec.target])[0]
+    if error is not None:
+        log("error", "ssh_error", message=error, **task_context(spec))
+        return _result_payload(spec.run_id, spec.task_id, TaskResult(exit_code=int(ExitCode.SSH_ERROR), message=error))
+
+    result = run_task(
+        spec, ssh_pool=ssh_pool, ingest_clients=ingest_clients, fact_state=fact_state, fact_cache=fact_cache
+    )
+    return _result_payload(spec.run_id, spec.task_id, result)
+
+
+def serve(
+    socket_path: str | None,
+    workers: int,
+    defaults: dict[str, Any],
+    stop: threading.Event | None = None,
+    ssh_pool: SSHConnectionPool | None = None,
+    ingest_clients: IngestClientCache | None = None,
+    fact_state: FactStateStore | None = None,
+    fact_cache: FactCache | None = None,
+    prescanner: Prescanner | None = None,
+) -> int:
+    """Keep dependencies imported and execute task envelopes until EOF, SIGTERM or ``stop``."""
+    stop = stop or threading.Event()
+    started = time.monotonic()
+    _warm_up()
+    log(
+        "info",
+        "daemon_ready",
+        socket=socket_path,
+        workers=workers,
+        warmup_ms=round((time.monotonic() - started) * 1000, 1),
+    )
+
+    slots = threading.BoundedSemaphore(workers)
+    handle = partial(
+        handle_envelope,
+        defaults=defaults,
+        ssh_pool=ssh_pool,
+        ingest_clients=ingest_clients,
+        fact_state=fact_state,
+        fact_cache=fact_cache,
+        prescanner=prescanner,
+    )
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ssh_linux") as pool:
+            with _shutdown_signals(stop, interrupt_reads=socket_path is None):
+                if socket_path is None:
+                    _serve_stream(sys.stdin, _ResultWriter(sys.stdout.buffer), pool, slots, handle, stop)
+                else:
+                    _serve_socket(socket_path, pool, slots, handle, stop)
+    except ValidationConnectorError as exc:
+        log("error", "validation_error", message=str(exc))
+        return int(ExitCode.VALIDATION_ERROR)
+    finally:
+        if ssh_pool is not None:
+            ssh_pool.close()
+        # After the pool: its connections to targets behind a bastion run inside these tunnels.
+        BASTIONS.close()
+        if ingest_clients is not None:
+            ingest_clients.close()
+
+    log("info", "daemon_stopped")
+    return int(ExitCode.SUCCESS)
+
+
+class _Shutdown(Exception):
+    """Raised from the signal handler to break out of a blocking stdin read."""
+
+
+@contextmanager
+def _shutdown_signals(stop: threading.Event, interrupt_reads: bool) -> Iterator[None]:
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def handler(_signum: int, _frame: object) -> None:
+        first = not stop.is_set()
+        stop.set()
+        # Only the first signal breaks the read; a repeated one must not abort the drain.
+        if interrupt_reads and first:
+            raise _Shutdown()
+
+    previous = {sig: signal.signal(sig, handler) for sig in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        yield
+    finally:
+        for sig, old_handler in previous.items():
+            signal.signal(sig, old_handler)
+
+
+def _serve_stream(
+    lines: Iterable[str | bytes],
+    writer: _ResultWriter,
+    pool: ThreadPoolExecutor,
+    slots: threading.BoundedSemaphore,
+    handle: Callable[[str], dict[str, Any]],
+    stop: threading.Event,
+) -> None:
+    pending: set[Future[None]] = set()
+    lock = threading.Lock()
+
+    def finished(future: Future[None]) -> None:
+        with lock:
+            pending.discard(future)
+        slots.release()
+
+    try:
+        for raw in lines:
+            if stop.is_set():
+                break
+            if isinstance(raw, bytes):
+                raw = raw.decode("utf-8", errors="replace")
+            if not raw.strip():
+                continue
+            slots.acquire()
+            future = pool.submit(lambda line=raw: writer.write(handle(line)))
+            with lock:
+                pending.add(future)
+            future.add_done_callback(finished)
+    except _Shutdown:
+        pass
+
+    while True:
+        with lock:
+            in_flight = list(pending)
+        try:
+            wait(in_flight)
+            return
+        except _Shutdown:
+            # The first signal arrived after the input ended; keep draining.
+            pass
+
+
+def _serve_socket(
+    socket_path: str,
+    pool: ThreadPoolExecutor,
+    slots: threading.BoundedSemaphore,
+    handle: Callable[[str], dict[str, Any]],
+    stop: threading.Event,
+) -> None:
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            _serve_stream(self.rfile, _ResultWriter(self.wfile), pool, slots, handle, stop)
+
+    _remove_stale_socket(socket_path)
+    # Envelopes carry ingest tokens and target credentials, so the socket must
+    # never be reachable by other users, not even between bind() and chmod().
+    previous_umask = os.umask(0o177)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+    finally:
+        os.umask(previous_umask)
+    server.daemon_threads = True
+
+    def shutdown_on_stop() -> None:
+        stop.wait()
+        server.shutdown()
+
+    threading.Thread(target=shutdown_on_stop, daemon=True).start()
+    try:
+        server.serve_forever()
+    finally:
+        stop.set()
+        server.server_close()
+        _remove_stale_socket(socket_path)
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise ValidationConnectorError(f"socket path exists and is not a socket: {socket_path}")
+    os.unlink(socket_path)
+
+
+_ENVELOPE_OPTIONS = (
+    "ingest_url",
+    "ingest_token",
+    "schema_version",
+    "timeout_sec",
+    "strict",
+    "collect_mode",
+    "delta_mode",
+)
+
+
+def _build_spec(envelope: TaskEnvelope, defaults: dict[str, Any]) -> TaskSpec:
+    options = {
+        key: getattr(envelope, key) if getattr(envelope, key) is not None else defaults.get(key)
+        for key in _ENVELOPE_OPTIONS
+    }
+    for key in ("ingest_url", "ingest_token"):
+        if not options[key]:
+            raise ValidationConnectorError(f"{key} is required in the envelope or daemon arguments")
+
+    return TaskSpec(
+        run_id=validate_uuid(envelope.run_id, "run_id"),
+        task_id=validate_uuid(envelope.task_id, "task_id"),
+        target=envelope.target,
+        max_channels=defaults.get("max_channels", TaskSpec.max_channels),
+        validate_batch=defaults.get("validate_batch", TaskSpec.validate_batch),
+        ssh_profile=defaults.get("ssh_profile", TaskSpec.ssh_profile),
+        command_timeout_sec=defaults.get("command_timeout_sec", TaskSpec.command_timeout_sec),
+        collectors=_collectors(envelope, defaults),
+        file_reader=defaults.get("file_reader", TaskSpec.file_reader),
+        **options,
+    )
+
+
+def _collectors(envelope: TaskEnvelope, defaults: dict[str, Any]) -> tuple[str, ...] | None:
+    # A scheduler picks the profile per envelope: cheap ones often, full ones rarely.
+    if envelope.collect_profile is None and envelope.collectors is None:
+        return defaults.get("collectors", TaskSpec.collectors)
+    return resolve_collectors(envelope.collect_profile or "full", envelope.collectors)
+
+
+def _validation_failure(run_id: object, task_id: object, message: str) -> dict[str, Any]:
+    log("error", "validation_error", message=message, run_id=run_id, task_id=task_id)
+    result = TaskResult(exit_code=int(ExitCode.VALIDATION_ERROR), message=message)
+    return _result_payload(run_id, task_id, result)
+
+
+def _result_payload(run_id: object, task_id: object, result: TaskResult) -> dict[str, Any]:
+    payload: dict[str, Any] = {
+        "event": "task_result",
+        "run_id": run_id,
+        "task_id": task_id,
+        "exit_code": result.exit_code,
+    }
+    if result.batch_id:
+        payload["batch_id"] = result.batch_id
+    if result.message:
+        payload["error"] = result.message
+    return payload
+
+
+def _warm_up() -> None:
+    """Import the heavy dependencies up front so the first task does not pay for them."""
+    import cryptography.hazmat.primitives.asymmetric.ed25519  # noqa: F401
+    import paramiko  # noqa: F401
+    import requests  # noqa: F401
+
+    from .models import BatchV1
+
+    # Output models use defer_build; build the schema now instead of on the first task.
+    BatchV1.model_rebuild(force=True)
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import time
+
+
+class Deadline:
+    """Wall-clock budget of one task, shared by every step that runs for it.
+
+    ``--timeout-sec`` used to be handed unchanged to the SSH connect, banner
+    and auth timeouts, every command and every HTTP attempt, so one task could
+    take many times its nominal timeout. Each step now asks for ``timeout()``
+    and gets whatever is left of the budget, optionally capped per step.
+    """
+
+    def __init__(self, budget_sec: float) -> None:
+        self.budget_sec = budget_sec
+        self.expires_at = time.monotonic() + budget_sec
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, cap: float | None = None) -> float:
+        """Seconds left for the next step, at most ``cap``."""
+        remaining = self.remaining()
+        return remaining if cap is None else min(remaining, cap)
+
+    def nearly_exhausted(self, fraction: float = 0.2) -> bool:
+        """True once less than ``fraction`` of the budget is left."""
+        return self.remaining() < self.budget_sec * fraction
+
+    def __repr__(self) -> str:
+        return f"Deadline(budget_sec={self.budget_sec}, remaining_sec={self.remaining():.1f})"
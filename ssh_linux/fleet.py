@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID, uuid5
+
+from .batch import BatchAggregator, build_entity, build_services
+from .deadline import Deadline
+from .errors import ExitCode, IngestConnectorError
+from .ingest_client import IngestClientCache
+from .main import log
+from .metrics import span
+from .models import Target
+from .pipeline import TaskResult, TaskSpec, collect_task, record_delta, run_task, task_context
+from .prescan import Prescanner
+from .state import DeltaDecision, FactCache, FactStateStore, plan_delta
+
+_stdout_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class _PendingHost:
+    line_no: int
+    spec: TaskSpec
+    entity: dict
+    delta: DeltaDecision | None
+
+
+def derive_task_id(task_id: str, target: Target) -> str:
+    """Per-target task id: stable across re-runs so each host keeps its own Idempotency-Key."""
+    return str(uuid5(UUID(task_id), f"{target.address}:{target.port}:{target.user}"))
+
+
+def load_targets(path: str) -> list[tuple[int, Target | None, str | None]]:
+    """Read a JSONL targets file into (line_no, target, error) entries.
+
+    Invalid lines are returned with an error instead of aborting the whole file.
+    So is a repeated target: it would get the same per-target task id.
+    """
+    from pydantic import ValidationError as PydanticValidationError
+
+    entries: list[tuple[int, Target | None, str | None]] = []
+    seen: dict[tuple[str, int, str], int] = {}
+    with open(path, encoding="utf-8") as handle:
+        for line_no, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                target = Target.model_validate(json.loads(line))
+                first = seen.setdefault((target.address, target.port, target.user), line_no)
+                if first != line_no:
+                    entries.append((line_no, None, f"target repeats line {first} (same address, port and user)"))
+                else:
+                    entries.append((line_no, target, None))
+            except json.JSONDecodeError:
+                entries.append((line_no, None, "target line must be valid JSON"))
+            except PydanticValidationError:
+                entries.append((line_no, None, "target line failed schema validation"))
+    return entries
+
+
+def run_fleet(
+    targets_file: str,
+    *,
+    run_id: str,
+    task_id: str,
+    workers: int,
+    aggregate: bool = False,
+    batch_max_entities: int = 500,
+    batch_max_bytes: int = 4 * 1024 * 1024,
+    ingest_clients: IngestClientCache | None = None,
+    fact_state: FactStateStore | None = None,
+    fact_cache: FactCache | None = None,
+    prescanner: Prescanner | None = None,
+    **task_options: Any,
+) -> int:
+    """Run the single-target pipeline for every target in ``targets_file``."""
+    try:
+        entries = load_targets(targets_file)
+    except OSError as exc:
+        log("error", "validation_error", message=f"cannot read targets-file: {exc.strerror}")
+        return int(ExitCode.VALIDATION_ERROR)
+
+    log("info", "fleet_started", run_id=run_id, task_id=task_id, targets=len(entries), workers=workers)
+
+    owns_clients = ingest_clients is None
+    if ingest_clients is None:
+        ingest_clients = IngestClientCache(pool_size=workers)
+    try:
+        return _run_entries(
+            entries,
+            run_id=run_id,
+            task_id=task_id,
+            workers=workers,
+            aggregate=aggregate,
+            batch_max_entities=batch_max_entities,
+            batch_max_bytes=batch_max_bytes,
+            ingest_clients=ingest_clients,
+            fact_state=fact_state,
+            fact_cache=fact_cache,
+            prescanner=prescanner,
+            task_options=task_options,
+        )
+    finally:
+        if owns_clients:
+            ingest_clients.close()
+
+
+def _run_entries(
+    entries: list[tuple[int, Target | None, str | None]],
+    *,
+    run_id: str,
+    task_id: str,
+    workers: int,
+    aggregate: bool,
+    batch_max_entities: int,
+    batch_max_bytes: int,
+    ingest_clients: IngestClientCache,
+    fact_state: FactStateStore | None,
+    fact_cache: FactCache | None,
+    prescanner: Prescanner | None,
+    task_options: dict[str, Any],
+) -> int:
+    exit_codes: list[int] = []
+    unreachable: dict[int, str | None] = {}
+    if prescanner is not None:
+        valid = [(line_no, target) for line_no, target, _error in entries if target is not None]
+        errors = prescanner.scan([target for _line_no, target in valid])
+        unreachable = {line_no: error for (line_no, _target), error in zip(valid, errors)}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ssh_linux") as pool:
+        futures = {}
+        for line_no, target, error in entries:
+            if target is None:
+                log("error", "validation_error", message=error, run_id=run_id, line=line_no)
+                result = TaskResult(exit_code=int(ExitCode.VALIDATION_ERROR), message=error)
+                exit_codes.append(_emit_result(line_no, None, None, result))
+                continue
+            spec = TaskSpec(
+                run_id=run_id,
+                task_id=derive_task_id(task_id, target),
+                target=target,
+                **task_options,
+            )
+            error = unreachable.get(line_no)
+            if error is not None:
+                log("error", "ssh_error", message=error, **task_context(spec))
+                result = TaskResult(exit_code=int(ExitCode.SSH_ERROR), message=error)
+                exit_codes.append(_emit_result(line_no, target, spec.task_id, result))
+                continue
+            if aggregate:
+                future = pool.submit(collect_task, spec, fact_cache=fact_cache)
+            else:
+                future = pool.submit(
+                    run_task, spec, ingest_clients=ingest_clients, fact_state=fact_state, fact_cache=fact_cache
+                )
+            futures[future] = (line_no, spec)
+
+        aggregator = BatchAggregator(
+            run_id,
+            task_id,
+            schema_version=task_options.get("schema_version", "1.0"),
+            max_entities=batch_max_entities,
+            max_bytes=batch_max_bytes,
+            collectors=task_options.get("collectors"),
+        )
+        pending: dict[str, _PendingHost] = {}
+        for future in as_completed(futures):
+            line_no, spec = futures[future]
+            outcome = future.result()
+            if isinstance(outcome, TaskResult):
+                exit_codes.append(_emit_result(line_no, spec.target, spec.task_id, outcome))
+                continue
+            try:
+                entity = build_entity(spec.target, outcome, validate=spec.validate_batch)
+                services, relations = build_services(entity["external_id"], outcome, validate=spec.validate_batch)
+            except Exception as exc:  # noqa: BLE001
+                log("error", "batch_build_error", message=str(exc), **task_context(spec))
+                result = TaskResult(exit_code=int(ExitCode.COLLECTION_ERROR), message=str(exc))
+                exit_codes.append(_emit_result(line_no, spec.target, spec.task_id, result))
+                continue
+
+            delta = None
+            if fact_state is not None and spec.delta_mode != "off":
+                delta = plan_delta(fact_state, spec.delta_mode, entity, related=services)
+                if delta.skip:
+                    log("info", "ingest_skipped_unchanged", batch_id=delta.previous.batch_id, **task_context(spec))
+                    result = TaskResult(exit_code=int(ExitCode.SUCCESS), batch_id=delta.previous.batch_id)
+                    exit_codes.append(_emit_result(line_no, spec.target, spec.task_id, result))
+                    continue
+            unchanged = delta is not None and delta.unchanged
+            aggregator.add_entity(
+                spec.task_id,
+                spec.target.address,
+                delta.entity if delta is not None else entity,
+                unchanged=unchanged,
+                related=() if unchanged else services,
+                relations=() if unchanged else relations,
+            )
+            pending[spec.task_id] = _PendingHost(line_no, spec, entity, delta)
+
+    if aggregate and pending:
+        exit_codes.extend(_ingest_chunks(aggregator, pending, run_id, ingest_clients, fact_state, task_options))
+
+    failed = sum(1 for code in exit_codes if code != ExitCode.SUCCESS)
+    log("info", "fleet_complete", run_id=run_id, task_id=task_id, targets=len(exit_codes), failed=failed)
+    return max(exit_codes, default=int(ExitCode.SUCCESS))
+
+
+def _ingest_chunks(
+    aggregator: BatchAggregator,
+    pending: dict[str, _PendingHost],
+    run_id: str,
+    ingest_clients: IngestClientCache,
+    fact_state: FactStateStore | None,
+    task_options: dict[str, Any],
+) -> list[int]:
+    client = ingest_clients.get(task_options["ingest_url"], task_options["ingest_token"])
+    exit_codes: list[int] = []
+    for chunk in aggregator.chunks():
+        try:
+            with span("ingest", run_id=run_id, idempotency_key=chunk.idempotency_key) as ingest_span:
+                timeout_sec = task_options.get("timeout_sec", 120)
+                ingest = client.post(chunk.payload, chunk.idempotency_key, timeout_sec, deadline=Deadline(timeout_sec))
+                ingest_span.bytes = ingest.bytes_sent
+        except IngestConnectorError as exc:
+            log("error", "ingest_error", message=str(exc), run_id=run_id, idempotency_key=chunk.idempotency_key)
+            result = TaskResult(exit_code=int(ExitCode.INGEST_ERROR), message=str(exc))
+        else:
+            log(
+                "info",
+                "ingest_success",
+                batch_id=ingest.batch_id,
+                run_id=run_id,
+                entities=len(chunk.members),
+                idempotency_key=chunk.idempotency_key,
+                bytes_sent=ingest.bytes_sent,
+                latency_ms=round(ingest.latency_sec * 1000, 1),
+            )
+            result = TaskResult(exit_code=int(ExitCode.SUCCESS), batch_id=ingest.batch_id)
+
+        for member in chunk.members:
+            host = pending[member]
+            if fact_state is not None and host.delta is not None and result.batch_id:
+                record_delta(fact_state, host.entity, host.delta, result.batch_id, task_context(host.spec))
+            exit_codes.append(_emit_result(host.line_no, host.spec.target, host.spec.task_id, result))
+    return exit_codes
+
+
+def _emit_result(line_no: int, target: Target | None, task_id: str | None, result: TaskResult) -> int:
+    payload: dict[str, Any] = {
+        "event": "target_result",
+        "line": line_no,
+        "target_address": target.address if target is not None else None,
+        "task_id": task_id,
+        "exit_code": result.exit_code,
+    }
+    if result.batch_id:
+        payload["batch_id"] = result.batch_id
+    if result.message:
+        payload["error"] = result.message
+
+    with _stdout_lock:
+        print(json.dumps(payload, separators=(",", ":")), flush=True)
+    return result.exit_code
@@ -1,9 +1,288 @@
 from __future__ import annotations
 
-import requests
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable
 
+from .deadline import Deadline
 from .errors import IngestConnectorError
 
+_sleep = time.sleep
+
+
+@dataclass(frozen=True)
+class IngestResult:
+    batch_id: str
+    bytes_sent: int
+    payload_bytes: int
+    latency_sec: float
+    compressed: bool
+    attempts: int = 1
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Retries for ingest uploads; safe because every request carries an Idempotency-Key."""
+
+    max_attempts: int = 4
+    base_delay_sec: float = 0.5
+    max_delay_sec: float = 30.0
+    retry_statuses: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        if retry_after is not None:
+            return min(max(retry_after, 0.0), self.max_delay_sec)
+        ceiling = min(self.max_delay_sec, self.base_delay_sec * 2 ** (attempt - 1))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+class CircuitBreaker:
+    """Fails ingest fast after ``failure_threshold`` consecutive failed attempts.
+
+    While open every request is refused for ``reset_timeout_sec``; after that a
+    single probe request is let through, and its outcome closes or re-opens
+    the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_sec: float = 30.0) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout_sec = reset_timeout_sec
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._reset_timeout_sec - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._probing:
+                raise IngestConnectorError(
+                    f"ingest circuit breaker open: consecutive_failures={self._failures} "
+                    f"retry_in_sec={max(remaining, 0):.0f}"
+                )
+            self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._failures >= self._failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker_for(ingest_url: str, failure_threshold: int = 5, reset_timeout_sec: float = 30.0) -> CircuitBreaker:
+    """Process-wide breaker per ingest endpoint; the first caller's settings win."""
+    key = ingest_url.rstrip("/")
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(failure_threshold, reset_timeout_sec)
+            _breakers[key] = breaker
+        return breaker
+
+
+RetryFn = Callable[[int, float, str], None]
+
+
+class IngestClient:
+    """Keep-alive client for ``POST /v1/ingest/batches``.
+
+    Owns one ``requests.Session`` whose connection pool holds up to
+    ``pool_size`` connections, so fleet and daemon runs reuse TCP/TLS
+    connections. Bodies of at least ``gzip_min_bytes`` are sent with
+    ``Content-Encoding: gzip`` (0 disables compression); if the server answers
+    415 the body is re-sent uncompressed and compression stays off for this
+    client.
+
+    Transport errors and ``retry.retry_statuses`` are retried with jittered
+    exponential backoff, honouring ``Retry-After``; ``on_retry`` is called with
+    (attempt, delay_sec, reason) before each wait. Every attempt goes through
+    the endpoint's process-wide circuit breaker. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        ingest_url: str,
+        ingest_token: str,
+        pool_size: int = 10,
+        gzip_min_bytes: int = 16 * 1024,
+        retry: RetryPolicy | None = None,
+        breaker: CircuitBreaker | None = None,
+        on_retry: RetryFn | None = None,
+    ) -> None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._url = f"{ingest_url.rstrip('/')}/v1/ingest/batches"
+        self._gzip_min_bytes = gzip_min_bytes
+        self._gzip_supported = True
+        self._retry = retry or RetryPolicy()
+        self._breaker = breaker or circuit_breaker_for(ingest_url)
+        self._on_retry = on_retry
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers.update(
+            {
+                "Authorization": f"Bearer {ingest_token}",
+                "Content-Type": "application/json",
+            }
+        )
+
+    def post(
+        self,
+        batch_payload: dict,
+        idempotency_key: str,
+        timeout_sec: float,
+        deadline: Deadline | None = None,
+    ) -> IngestResult:
+        """Upload one batch; ``timeout_sec`` caps each attempt.
+
+        With ``deadline`` every attempt gets at most the task's remaining
+        budget, and no retry is started or waited for once the budget cannot
+        cover it.
+        """
+        import requests
+
+        body = json.dumps(batch_payload, separators=(",", ":")).encode("utf-8")
+        gzipped: bytes | None = None
+        started = time.monotonic()
+
+        attempt = 0
+        failure: IngestConnectorError | None = None
+        cause: Exception | None = None
+        while True:
+            attempt += 1
+            if deadline is not None and deadline.expired():
+                message = f"task deadline exceeded before ingest attempt {attempt}"
+                if failure is not None:
+                    message += f"; last error: {failure}"
+                raise IngestConnectorError(message) from cause
+            attempt_timeout = timeout_sec if deadline is None else deadline.timeout(timeout_sec)
+            self._breaker.before_request()
+
+            compress = self._gzip_supported and 0 < self._gzip_min_bytes <= len(body)
+            if compress and gzipped is None:
+                gzipped = gzip.compress(body, compresslevel=6)
+            data = gzipped if compress else body
+
+            retry_after: float | None = None
+            cause = None
+            try:
+                response = self._send(data, idempotency_key, attempt_timeout, compress)
+                if compress and response.status_code == 415:
+                    self._gzip_supported = False
+                    compress, data = False, body
+                    response = self._send(data, idempotency_key, attempt_timeout, compress)
+            except requests.RequestException as exc:
+                failure = IngestConnectorError(f"ingest request failed: {exc}")
+                cause = exc
+            else:
+                if response.status_code not in self._retry.retry_statuses:
+                    self._breaker.record_success()
+                    return IngestResult(
+                        batch_id=_parse_response(response),
+                        bytes_sent=len(data),
+                        payload_bytes=len(body),
+                        latency_sec=time.monotonic() - started,
+                        compressed=compress,
+                        attempts=attempt,
+                    )
+                failure = IngestConnectorError(_status_message(response))
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+
+            self._breaker.record_failure()
+            if attempt >= self._retry.max_attempts:
+                raise failure from cause
+
+            delay = self._retry.delay(attempt, retry_after)
+            if deadline is not None and delay >= deadline.remaining():
+                raise failure from cause
+            if self._on_retry is not None:
+                self._on_retry(attempt, delay, str(failure))
+            _sleep(delay)
+
+    def close(self) -> None:
+        self._session.close()
+
+    def __enter__(self) -> "IngestClient":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _send(self, data: bytes, idempotency_key: str, timeout_sec: float, compress: bool):
+        headers = {"Idempotency-Key": idempotency_key}
+        if compress:
+            headers["Content-Encoding"] = "gzip"
+        return self._session.post(self._url, data=data, headers=headers, timeout=timeout_sec)
+
+
+class IngestClientCache:
+    """One shared IngestClient per (ingest_url, ingest_token) pair."""
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        gzip_min_bytes: int = 16 * 1024,
+        retry: RetryPolicy | None = None,
+        breaker_threshold: int = 5,
+        breaker_reset_sec: float = 30.0,
+        on_retry: RetryFn | None = None,
+    ) -> None:
+        self._pool_size = pool_size
+        self._gzip_min_bytes = gzip_min_bytes
+        self._retry = retry
+        self._breaker_threshold = breaker_threshold
+        self._breaker_reset_sec = breaker_reset_sec
+        self._on_retry = on_retry
+        self._clients: dict[tuple[str, str], IngestClient] = {}
+        self._lock = threading.Lock()
+
+    def get(self, ingest_url: str, ingest_token: str) -> IngestClient:
+        key = (ingest_url, hashlib.sha256(ingest_token.encode("utf-8")).hexdigest())
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = IngestClient(
+                    ingest_url,
+                    ingest_token,
+                    pool_size=self._pool_size,
+                    gzip_min_bytes=self._gzip_min_bytes,
+                    retry=self._retry,
+                    breaker=circuit_breaker_for(ingest_url, self._breaker_threshold, self._breaker_reset_sec),
+                    on_retry=self._on_retry,
+                )
+                self._clients[key] = client
+            return client
+
+    def close(self) -> None:
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
 
 def post_batch(
     ingest_url: str,
@@ -11,24 +290,16 @@ def post_batch(
     task_id: str,
     batch_payload: dict,
     timeout_sec: int,
+    idempotency_key: str | None = None,
+    deadline: Deadline | None = None,
 ) -> str:
-    url = f"{ingest_url.rstrip('/')}/v1/ingest/batches"
-    headers = {
-        "Authorization": f"Bearer {ingest_token}",
-        "Idempotency-Key": task_id,
-        "Content-Type": "application/json",
-    }
+    with IngestClient(ingest_url, ingest_token, pool_size=1) as client:
+        return client.post(batch_payload, idempotency_key or task_id, timeout_sec, deadline=deadline).batch_id
 
-    try:
-        response = requests.post(url, json=batch_payload, headers=headers, timeout=timeout_sec)
-    except requests.RequestException as exc:
-        raise IngestConnectorError(f"ingest request failed: {exc}") from exc
 
+def _parse_response(response) -> str:
     if response.status_code not in (200, 201):
-        body = response.text.strip().replace("\n", " ")
-        raise IngestConnectorError(
-            f"ingest failed status={response.status_code} body={body[:500]}"
-        )
+        raise IngestConnectorError(_status_message(response))
 
     try:
         payload = response.json()
@@ -42,6 +313,27 @@ def post_batch(
     return batch_id
 
 
+def _status_message(response) -> str:
+    body = response.text.strip().replace("\n", " ")
+    return f"ingest failed status={response.status_code} body={body[:500]}"
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    """Retry-After as seconds to wait; accepts delta-seconds or an HTTP-date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
 def _extract_batch_id(payload: object) -> str | None:
     if not isinstance(payload, dict):
         return None
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import paramiko
+
+# (st_dev, st_ino, st_mtime_ns, st_size): a rotated or rewritten key file gets
+# a new inode or mtime, so its stale parsed key is never reused.
+FileFingerprint = tuple[int, int, int, int]
+
+
+@dataclass(frozen=True)
+class _CachedKey:
+    fingerprint: FileFingerprint
+    passphrase_digest: str
+    pkey: paramiko.PKey
+
+
+class PrivateKeyCache:
+    """Parsed private keys shared by every connection in the process.
+
+    Fleet and daemon runs typically use one key for thousands of hosts;
+    reading, parsing and (for encrypted keys) decrypting it once instead of
+    per connection keeps that cost off every handshake. Entries are keyed by
+    path and validated against the file's inode and mtime on each lookup.
+    Passphrases are only kept as a SHA-256 digest, and nothing here logs.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: dict[str, _CachedKey] = {}
+        self._path_locks: dict[str, threading.Lock] = {}
+
+    def load(self, path: str, passphrase: str | None = None) -> paramiko.PKey:
+        """``PKey`` for ``path``; raises ``OSError`` or ``paramiko.SSHException`` like paramiko would."""
+        import paramiko
+
+        path = os.path.abspath(os.path.expanduser(path))
+        digest = _passphrase_digest(passphrase)
+        with self._lock:
+            path_lock = self._path_locks.setdefault(path, threading.Lock())
+        # Concurrent workers wanting the same key wait for one parse instead of racing.
+        with path_lock:
+            try:
+                fingerprint = _fingerprint(path)
+            except OSError:
+                self.evict(path)
+                raise
+            cached = self._entries.get(path)
+            if cached is not None and cached.fingerprint == fingerprint and cached.passphrase_digest == digest:
+                return cached.pkey
+            try:
+                pkey = paramiko.PKey.from_path(path, passphrase=passphrase.encode("utf-8") if passphrase else None)
+            except (ValueError, TypeError, paramiko.UnknownKeyType) as exc:
+                # cryptography reports a wrong or missing passphrase as ValueError/TypeError.
+                raise paramiko.SSHException(f"cannot load private key: {exc}") from exc
+            with self._lock:
+                self._entries[path] = _CachedKey(fingerprint, digest, pkey)
+            return pkey
+
+    def evict(self, path: str) -> None:
+        with self._lock:
+            self._entries.pop(os.path.abspath(os.path.expanduser(path)), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+KEY_CACHE = PrivateKeyCache()
+
+
+def _fingerprint(path: str) -> FileFingerprint:
+    stat = os.stat(path)
+    return (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _passphrase_digest(passphrase: str | None) -> str:
+    return hashlib.sha256((passphrase or "").encode("utf-8")).hexdigest()
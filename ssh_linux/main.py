@@ -3,10 +3,17 @@ from __future__ import annotations
 import argparse
 import json
 import sys
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timezone
+from typing import Iterator
 from uuid import UUID
 
-from .errors import ExitCode, IngestConnectorError, SSHConnectorError, ValidationConnectorError
+from .deadline import Deadline
+from .errors import ExitCode, ValidationConnectorError
+from .ssh_profiles import SSH_PROFILES
+
+_log_lock = threading.Lock()
 
 
 class ConnectorArgumentParser(argparse.ArgumentParser):
@@ -16,13 +23,32 @@ class ConnectorArgumentParser(argparse.ArgumentParser):
 
 def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser = ConnectorArgumentParser(description="CMDB connector that discovers Linux hosts over SSH")
-    parser.add_argument("--run-id", required=True, help="Run UUID")
-    parser.add_argument("--task-id", required=True, help="Task UUID")
-    parser.add_argument("--target-json", required=True, help="Target JSON string")
-    parser.add_argument("--ingest-url", required=True, help="Ingest API base URL")
-    parser.add_argument("--ingest-token", required=True, help="Ingest API bearer token")
-    parser.add_argument("--schema-version", required=True, choices=["1.0"], help="Batch schema version")
-    parser.add_argument("--timeout-sec", type=int, default=120, help="Connector timeout in seconds")
+    parser.add_argument("--run-id", help="Run UUID")
+    parser.add_argument("--task-id", help="Task UUID")
+    targets = parser.add_mutually_exclusive_group()
+    targets.add_argument("--target-json", help="Target JSON string")
+    targets.add_argument("--targets-file", help="JSONL file with one target per line (fleet mode)")
+    targets.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Serve NDJSON task envelopes from stdin or --socket until EOF/SIGTERM",
+    )
+    parser.add_argument("--socket", help="Unix socket path to listen on in --daemon mode")
+    parser.add_argument("--ingest-url", help="Ingest API base URL")
+    parser.add_argument("--ingest-token", help="Ingest API bearer token")
+    parser.add_argument("--schema-version", choices=["1.0"], help="Batch schema version")
+    parser.add_argument(
+        "--timeout-sec",
+        type=int,
+        default=120,
+        help="Deadline for a whole task (SSH connect, collection and ingest together), in seconds",
+    )
+    parser.add_argument(
+        "--command-timeout-sec",
+        type=parse_positive_int,
+        default=None,
+        help="Cap on how long one remote command may go without output (default: the task deadline)",
+    )
     parser.add_argument(
         "--strict",
         nargs="?",
@@ -31,7 +57,181 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         type=parse_bool,
         help="Strict mode for command/parse failures",
     )
-    return parser.parse_args(argv)
+    parser.add_argument(
+        "--validate-batch",
+        action="store_true",
+        help="Build batches through the pydantic models (slower; for debugging schema problems)",
+    )
+    parser.add_argument(
+        "--collect-mode",
+        choices=["exec", "batched"],
+        default="exec",
+        help="exec runs one SSH command per fact; batched collects everything in a single round trip",
+    )
+    collection = parser.add_mutually_exclusive_group()
+    collection.add_argument(
+        "--profile",
+        default="full",
+        help="Collection profile: full, identity (identity, network, os) or liveness (identity, uptime)",
+    )
+    collection.add_argument(
+        "--collectors",
+        type=parse_name_list,
+        help="Comma-separated collector units to run instead of a profile "
+        "(identity, network, os, cpu_mem, uptime, filesystems, packages, services)",
+    )
+    parser.add_argument(
+        "--file-reader",
+        choices=["exec", "sftp"],
+        default="exec",
+        help="How exec mode reads file-backed facts (/etc/os-release, /proc/meminfo, ...); "
+        "sftp uses one SFTP session and falls back to exec where SFTP is unavailable",
+    )
+    parser.add_argument(
+        "--ssh-max-channels",
+        type=parse_positive_int,
+        default=8,
+        help="Concurrent SSH channels per host in exec mode (keep below the server's MaxSessions)",
+    )
+    parser.add_argument(
+        "--ssh-profile",
+        choices=sorted(SSH_PROFILES),
+        default="default",
+        help="SSH algorithm profile; a target's meta.ssh_profile overrides it",
+    )
+    parser.add_argument(
+        "--prescan",
+        action="store_true",
+        help="Probe targets for an SSH banner first and fail unreachable ones at once with exit code 2",
+    )
+    parser.add_argument(
+        "--prescan-timeout-sec",
+        type=parse_positive_float,
+        default=3.0,
+        help="Time a target has to accept the TCP connection and send its SSH banner",
+    )
+    parser.add_argument(
+        "--workers",
+        type=parse_positive_int,
+        default=16,
+        help="Concurrent targets in --targets-file and --daemon mode",
+    )
+    parser.add_argument(
+        "--aggregate-batches",
+        action="store_true",
+        help="In --targets-file mode, post many hosts per BatchV1 instead of one batch per host",
+    )
+    parser.add_argument(
+        "--batch-max-entities",
+        type=parse_positive_int,
+        default=500,
+        help="Maximum entities per aggregated batch",
+    )
+    parser.add_argument(
+        "--batch-max-bytes",
+        type=parse_positive_int,
+        default=4 * 1024 * 1024,
+        help="Maximum serialized size of an aggregated batch",
+    )
+    parser.add_argument(
+        "--ingest-pool-size",
+        type=parse_positive_int,
+        default=10,
+        help="Kept-alive HTTP connections per ingest endpoint",
+    )
+    parser.add_argument(
+        "--ingest-gzip-min-bytes",
+        type=parse_non_negative_int,
+        default=16 * 1024,
+        help="Gzip ingest bodies at least this large; 0 disables compression",
+    )
+    parser.add_argument(
+        "--ingest-max-attempts",
+        type=parse_positive_int,
+        default=4,
+        help="Ingest attempts per batch, retrying 429/5xx and connection errors with backoff",
+    )
+    parser.add_argument(
+        "--ingest-breaker-threshold",
+        type=parse_positive_int,
+        default=5,
+        help="Consecutive failed ingest attempts that open the circuit breaker",
+    )
+    parser.add_argument(
+        "--ingest-breaker-reset-sec",
+        type=parse_positive_int,
+        default=30,
+        help="Seconds the ingest circuit breaker stays open before probing again",
+    )
+    parser.add_argument(
+        "--ssh-pool-max-per-host",
+        type=parse_positive_int,
+        default=4,
+        help="Pooled SSH connections kept per target in --daemon mode",
+    )
+    parser.add_argument(
+        "--ssh-pool-idle-sec",
+        type=parse_positive_int,
+        default=300,
+        help="Close pooled SSH connections idle for this long",
+    )
+    parser.add_argument(
+        "--ssh-pool-max-age-sec",
+        type=parse_positive_int,
+        default=1800,
+        help="Never reuse a pooled SSH connection older than this",
+    )
+    parser.add_argument(
+        "--delta-mode",
+        choices=["off", "skip", "marker"],
+        default="off",
+        help="Skip unchanged hosts or send them as a compact marker instead of re-uploading full facts",
+    )
+    parser.add_argument(
+        "--state-dir",
+        help="Directory holding the last ingested content hash and the static-fact cache per host",
+    )
+    parser.add_argument(
+        "--no-fact-cache",
+        action="store_true",
+        help="Re-run every static fact command instead of reusing cached output from --state-dir",
+    )
+    parser.add_argument(
+        "--fact-cache-ttl-sec",
+        type=parse_positive_int,
+        default=86400,
+        help="Re-collect static facts at least this often even if the host has not rebooted",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        help="Write span histograms in Prometheus text format to this file (node_exporter textfile collector)",
+    )
+    parser.add_argument(
+        "--metrics-interval-sec",
+        type=parse_positive_int,
+        default=15,
+        help="How often --metrics-textfile is rewritten while running; it is always written on exit",
+    )
+    args = parser.parse_args(argv)
+
+    if args.delta_mode != "off" and args.state_dir is None:
+        parser.error("--delta-mode requires --state-dir")
+    if args.socket is not None and not args.daemon:
+        parser.error("--socket requires --daemon")
+    if not args.daemon:
+        # Daemon envelopes carry their own ids and may override the ingest
+        # parameters, so these are only mandatory for one-shot runs.
+        required = ["run_id", "task_id", "ingest_url", "ingest_token", "schema_version"]
+        missing = [f"--{name.replace('_', '-')}" for name in required if getattr(args, name) is None]
+        if missing:
+            parser.error(f"the following arguments are required: {', '.join(missing)}")
+        if args.target_json is None and args.targets_file is None:
+            parser.error("one of the arguments --target-json --targets-file --daemon is required")
+
+    from .collectors import resolve_collectors
+
+    args.collectors = resolve_collectors(args.profile, args.collectors)
+    return args
 
 
 def parse_bool(value: str) -> bool:
@@ -46,6 +246,40 @@ def parse_bool(value: str) -> bool:
     raise argparse.ArgumentTypeError(f"invalid bool value: {value}")
 
 
+def parse_positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value}") from exc
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1: {value}")
+    return number
+
+
+def parse_positive_float(value: str) -> float:
+    try:
+        number = float(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid float value: {value}") from exc
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be > 0: {value}")
+    return number
+
+
+def parse_name_list(value: str) -> list[str]:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def parse_non_negative_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value}") from exc
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be >= 0: {value}")
+    return number
+
+
 def log(level: str, event: str, **fields: object) -> None:
     payload = {
         "ts": datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z"),
@@ -53,7 +287,9 @@ def log(level: str, event: str, **fields: object) -> None:
         "event": event,
         **fields,
     }
-    print(json.dumps(payload, separators=(",", ":")), file=sys.stderr, flush=True)
+    line = json.dumps(payload, separators=(",", ":"))
+    with _log_lock:
+        print(line, file=sys.stderr, flush=True)
 
 
 def validate_uuid(value: str, field_name: str) -> str:
@@ -72,18 +308,56 @@ def run(argv: list[str] | None = None) -> int:
         log("error", "validation_error", message=str(exc))
         return int(ExitCode.VALIDATION_ERROR)
 
-    try:
-        from pydantic import ValidationError as PydanticValidationError
+    # The single-target budget starts before imports and validation, which count against it too.
+    deadline = Deadline(args.timeout_sec)
 
-        from .batch import build_batch
-        from .collectors import collect_host_facts
-        from .ingest_client import post_batch
-        from .models import Target
-        from .ssh_client import SSHClient
-    except ModuleNotFoundError as exc:
-        log("error", "dependency_error", message=f"missing dependency: {exc.name}")
+    try:
+        fact_state = _fact_state(args)
+        fact_cache = _fact_cache(args)
+    except OSError as exc:
+        log("error", "validation_error", message=f"state-dir is not usable: {exc}")
         return int(ExitCode.VALIDATION_ERROR)
 
+    # Heavy dependencies (pydantic, paramiko, requests) are imported only once
+    # the cheap argument checks have passed, so invalid invocations exit fast.
+    if args.daemon:
+        if not _runtime_dependencies_available():
+            return int(ExitCode.VALIDATION_ERROR)
+
+        from .daemon import serve
+        from .ssh_pool import SSHConnectionPool
+
+        with _metrics_export(args):
+            return serve(
+                socket_path=args.socket,
+                workers=args.workers,
+                defaults={
+                    "ingest_url": args.ingest_url,
+                    "ingest_token": args.ingest_token,
+                    "schema_version": args.schema_version or "1.0",
+                    "timeout_sec": args.timeout_sec,
+                    "strict": args.strict,
+                    "collect_mode": args.collect_mode,
+                    "delta_mode": args.delta_mode,
+                    "max_channels": args.ssh_max_channels,
+                    "validate_batch": args.validate_batch,
+                    "ssh_profile": args.ssh_profile,
+                    "command_timeout_sec": args.command_timeout_sec,
+                    "collectors": args.collectors,
+                    "file_reader": args.file_reader,
+                },
+                ssh_pool=SSHConnectionPool(
+                    max_per_host=args.ssh_pool_max_per_host,
+                    max_idle_sec=args.ssh_pool_idle_sec,
+                    max_age_sec=args.ssh_pool_max_age_sec,
+                    reap_interval_sec=min(60, args.ssh_pool_idle_sec),
+                ),
+                ingest_clients=_ingest_clients(args, pool_size=args.ingest_pool_size),
+                fact_state=fact_state,
+                fact_cache=fact_cache,
+                prescanner=_prescanner(args),
+            )
+
     try:
         run_id = validate_uuid(args.run_id, "run-id")
         task_id = validate_uuid(args.task_id, "task-id")
@@ -91,69 +365,173 @@ def run(argv: list[str] | None = None) -> int:
         log("error", "validation_error", message=str(exc))
         return int(ExitCode.VALIDATION_ERROR)
 
+    task_options = {
+        "ingest_url": args.ingest_url,
+        "ingest_token": args.ingest_token,
+        "schema_version": args.schema_version,
+        "timeout_sec": args.timeout_sec,
+        "strict": args.strict,
+        "collect_mode": args.collect_mode,
+        "delta_mode": args.delta_mode,
+        "max_channels": args.ssh_max_channels,
+        "validate_batch": args.validate_batch,
+        "ssh_profile": args.ssh_profile,
+        "command_timeout_sec": args.command_timeout_sec,
+        "collectors": args.collectors,
+        "file_reader": args.file_reader,
+    }
+
+    if args.targets_file is not None:
+        if not _runtime_dependencies_available():
+            return int(ExitCode.VALIDATION_ERROR)
+
+        from .fleet import run_fleet
+        ingest_clients = _ingest_clients(args, pool_size=args.ingest_pool_size)
+        try:
+            with _metrics_export(args):
+                return run_fleet(
+                    args.targets_file,
+                    run_id=run_id,
+                    task_id=task_id,
+                    workers=args.workers,
+                    aggregate=args.aggregate_batches,
+                    batch_max_entities=args.batch_max_entities,
+                    batch_max_bytes=args.batch_max_bytes,
+                    ingest_clients=ingest_clients,
+                    fact_state=fact_state,
+                    fact_cache=fact_cache,
+                    prescanner=_prescanner(args),
+                    **task_options,
+                )
+        finally:
+            ingest_clients.close()
+
     try:
         target_data = json.loads(args.target_json)
     except json.JSONDecodeError:
         log("error", "validation_error", message="target-json must be valid JSON")
         return int(ExitCode.VALIDATION_ERROR)
 
+    try:
+        from pydantic import ValidationError as PydanticValidationError
+
+        from .models import Target
+    except ModuleNotFoundError as exc:
+        log("error", "dependency_error", message=f"missing dependency: {exc.name}")
+        return int(ExitCode.VALIDATION_ERROR)
+
     try:
         target = Target.model_validate(target_data)
     except PydanticValidationError:
         log("error", "validation_error", message="target-json failed schema validation")
         return int(ExitCode.VALIDATION_ERROR)
 
-    context = {
-        "run_id": run_id,
-        "task_id": task_id,
-        "target_address": target.address,
-    }
+    if not _runtime_dependencies_available():
+        return int(ExitCode.VALIDATION_ERROR)
 
-    log("info", "connector_started", strict=args.strict, timeout_sec=args.timeout_sec, **context)
+    from .pipeline import TaskSpec, run_task
 
+    prescanner = _prescanner(args)
+    if prescanner is not None:
+        error = prescanner.scan([target])[0]
+        if error is not None:
+            log("error", "ssh_error", message=error, run_id=run_id, task_id=task_id, target_address=target.address)
+            return int(ExitCode.SSH_ERROR)
+
+    ingest_clients = _ingest_clients(args, pool_size=1)
     try:
-        with SSHClient(target, timeout_sec=args.timeout_sec) as ssh:
-            log("info", "ssh_connected", **context)
-            facts = collect_host_facts(
-                ssh,
-                strict=args.strict,
-                log=lambda level, message: log(level, "collector_warning", message=message, **context),
+        with _metrics_export(args):
+            result = run_task(
+                TaskSpec(run_id=run_id, task_id=task_id, target=target, **task_options),
+                ingest_clients=ingest_clients,
+                fact_state=fact_state,
+                deadline=deadline,
+                fact_cache=fact_cache,
             )
-            log("info", "collection_complete", **context)
-    except SSHConnectorError as exc:
-        log("error", "ssh_error", message=str(exc), **context)
-        return int(ExitCode.SSH_ERROR)
-    except Exception as exc:  # noqa: BLE001
-        log("error", "collection_error", message=str(exc), **context)
-        return int(ExitCode.COLLECTION_ERROR)
+    finally:
+        ingest_clients.close()
+    if result.exit_code == ExitCode.SUCCESS:
+        print(f"BATCH_ID={result.batch_id}", flush=True)
+    return result.exit_code
+
 
+def _ingest_clients(args: argparse.Namespace, pool_size: int):
+    from .ingest_client import IngestClientCache, RetryPolicy
+
+    return IngestClientCache(
+        pool_size=pool_size,
+        gzip_min_bytes=args.ingest_gzip_min_bytes,
+        retry=RetryPolicy(max_attempts=args.ingest_max_attempts),
+        breaker_threshold=args.ingest_breaker_threshold,
+        breaker_reset_sec=args.ingest_breaker_reset_sec,
+        on_retry=lambda attempt, delay, reason: log(
+            "warn",
+            "ingest_retry",
+            attempt=attempt,
+            delay_sec=round(delay, 2),
+            message=reason,
+        ),
+    )
+
+
+@contextmanager
+def _metrics_export(args: argparse.Namespace) -> Iterator[None]:
+    if args.metrics_textfile is None:
+        yield
+        return
+
+    from .metrics import export_textfile_periodically
+
+    stop = threading.Event()
+    exporter = export_textfile_periodically(args.metrics_textfile, args.metrics_interval_sec, stop)
     try:
-        batch_payload = build_batch(
-            run_id=run_id,
-            task_id=task_id,
-            target=target,
-            facts=facts,
-            schema_version=args.schema_version,
-        )
-    except Exception as exc:  # noqa: BLE001
-        log("error", "batch_build_error", message=str(exc), **context)
-        return int(ExitCode.COLLECTION_ERROR)
+        yield
+    finally:
+        stop.set()
+        exporter.join()
+
+
+def _fact_state(args: argparse.Namespace):
+    if args.state_dir is None:
+        return None
 
+    from .state import FactStateStore
+
+    return FactStateStore(args.state_dir)
+
+
+def _fact_cache(args: argparse.Namespace):
+    if args.state_dir is None or args.no_fact_cache:
+        return None
+
+    from .state import FactCache
+
+    cache = FactCache(args.state_dir, ttl_sec=args.fact_cache_ttl_sec)
+    cache.prune()
+    return cache
+
+
+def _prescanner(args: argparse.Namespace):
+    if not args.prescan:
+        return None
+
+    from pathlib import Path
+
+    from .prescan import Prescanner
+
+    state_path = Path(args.state_dir) / "unreachable.json" if args.state_dir is not None else None
+    return Prescanner(timeout_sec=args.prescan_timeout_sec, state_path=state_path)
+
+
+def _runtime_dependencies_available() -> bool:
     try:
-        batch_id = post_batch(
-            ingest_url=args.ingest_url,
-            ingest_token=args.ingest_token,
-            task_id=task_id,
-            batch_payload=batch_payload,
-            timeout_sec=args.timeout_sec,
-        )
-    except IngestConnectorError as exc:
-        log("error", "ingest_error", message=str(exc), **context)
-        return int(ExitCode.INGEST_ERROR)
-
-    log("info", "ingest_success", batch_id=batch_id, **context)
-    print(f"BATCH_ID={batch_id}", flush=True)
-    return int(ExitCode.SUCCESS)
+        import paramiko  # noqa: F401
+        import pydantic  # noqa: F401
+        import requests  # noqa: F401
+    except ModuleNotFoundError as exc:
+        log("error", "dependency_error", message=f"missing dependency: {exc.name}")
+        return False
+    return True
 
 
 def main() -> int:
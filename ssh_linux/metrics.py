@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import contextvars
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from .main import log
+
+DURATION_BUCKETS_SEC = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_HELP = {
+    "ssh_linux_span_duration_seconds": (
+        "Duration of connector phases "
+        "(prescan, ssh_connect, ssh_handshake, command, sftp, parse, collector, fact_cache, build_batch, ingest)."
+    ),
+    "ssh_linux_span_bytes_total": "Bytes handled by connector phases (command output, ingest body).",
+    "ssh_linux_span_errors_total": "Connector phases that ended in an error.",
+}
+
+# Task fields (run_id, task_id, target_address) attached to every span event
+# logged from the current thread; set by the pipeline around each task.
+_span_context: contextvars.ContextVar[dict[str, object]] = contextvars.ContextVar("span_context", default={})
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+@dataclass
+class Span:
+    """Mutable outcome of a ``span`` block; set ``bytes`` or ``ok`` from inside it."""
+
+    bytes: int | None = None
+    ok: bool = True
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe histograms and counters rendered in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._histograms: dict[str, dict[LabelKey, _Histogram]] = {}
+        self._counters: dict[str, dict[LabelKey, float]] = {}
+
+    def observe(
+        self,
+        metric: str,
+        value: float,
+        /,
+        buckets: tuple[float, ...] = DURATION_BUCKETS_SEC,
+        **labels: str,
+    ) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(metric, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, metric: str, amount: float = 1, /, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(metric, {})
+            series[key] = series.get(key, 0) + amount
+
+    def render(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            for name in sorted(self._histograms):
+                lines.extend(_header(name, "histogram"))
+                for key, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip((*histogram.buckets, float("inf")), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else _format_value(bound)
+                        lines.append(f"{name}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.total)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+            for name in sorted(self._counters):
+                lines.extend(_header(name, "counter"))
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def write_textfile(self, path: str | Path) -> None:
+        """Atomically replace ``path``, as node_exporter's textfile collector expects."""
+        target = Path(path)
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                handle.write(self.render())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+REGISTRY = MetricsRegistry()
+
+
+@contextmanager
+def span_context(**fields: object) -> Iterator[None]:
+    """Attach ``fields`` to every span logged from this thread inside the block."""
+    token = _span_context.set({**_span_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _span_context.reset(token)
+
+
+@contextmanager
+def span(phase: str, name: str = "", **fields: object) -> Iterator[Span]:
+    """Time the block as one ``phase`` span; an exception marks it failed."""
+    current = Span()
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException:
+        current.ok = False
+        raise
+    finally:
+        record_span(phase, time.perf_counter() - started, name=name, bytes=current.bytes, ok=current.ok, **fields)
+
+
+def record_span(
+    phase: str,
+    duration_sec: float,
+    name: str = "",
+    bytes: int | None = None,  # noqa: A002
+    ok: bool = True,
+    **fields: object,
+) -> None:
+    """Log a ``span`` event and fold it into the process-wide histograms."""
+    labels = {"phase": phase, "name": name}
+    REGISTRY.observe("ssh_linux_span_duration_seconds", duration_sec, **labels)
+    if bytes is not None:
+        REGISTRY.inc("ssh_linux_span_bytes_total", bytes, **labels)
+    if not ok:
+        REGISTRY.inc("ssh_linux_span_errors_total", **labels)
+
+    event: dict[str, object] = {"phase": phase}
+    if name:
+        event["name"] = name
+    event["duration_ms"] = round(duration_sec * 1000, 1)
+    if bytes is not None:
+        event["bytes"] = bytes
+    event["ok"] = ok
+    log("info", "span", **event, **{**_span_context.get(), **fields})
+
+
+def export_textfile_periodically(path: str | Path, interval_sec: float, stop: threading.Event) -> threading.Thread:
+    """Rewrite the textfile every ``interval_sec`` until ``stop`` is set, then once more."""
+
+    def loop() -> None:
+        while not stop.wait(interval_sec):
+            _write_quietly(path)
+        _write_quietly(path)
+
+    thread = threading.Thread(target=loop, name="ssh_linux-metrics", daemon=True)
+    thread.start()
+    return thread
+
+
+def _write_quietly(path: str | Path) -> None:
+    try:
+        REGISTRY.write_textfile(path)
+    except OSError as exc:
+        log("warn", "metrics_export_error", message=str(exc), path=str(path))
+
+
+def _label_key(labels: dict[str, str]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _header(name: str, kind: str) -> list[str]:
+    return [f"# HELP {name} {_HELP.get(name, name)}", f"# TYPE {name} {kind}"]
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    body = ",".join(f'{name}="{_escape(value)}"' for name, value in key)
+    return "{" + body + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Literal, Optional
+from typing import Annotated, Any, Literal, Optional, Union
 
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 
@@ -8,6 +8,7 @@ from pydantic import BaseModel, ConfigDict, Field, model_validator
 class TargetAuth(BaseModel):
     method: Literal["key", "password"]
     key_path: Optional[str] = None
+    passphrase: Optional[str] = None
     password: Optional[str] = None
 
     model_config = ConfigDict(extra="forbid")
@@ -21,17 +22,34 @@ class TargetAuth(BaseModel):
         return self
 
 
+class JumpHost(BaseModel):
+    """Bastion that the target is reached through via ``direct-tcpip``."""
+
+    address: str
+    port: int = Field(default=22, ge=1, le=65535)
+    user: str
+    auth: TargetAuth
+    max_channels: int = Field(default=32, ge=1)
+
+    model_config = ConfigDict(extra="forbid")
+
+
 class Target(BaseModel):
     type: Literal["host"]
     address: str
     port: int = Field(default=22, ge=1, le=65535)
     user: str
     auth: TargetAuth
+    jump: Optional[JumpHost] = None
     meta: dict[str, Any] = Field(default_factory=dict)
 
     model_config = ConfigDict(extra="forbid")
 
 
+# Output models below are only needed once a host has been collected, so their
+# validators are built on first use (defer_build) rather than at import time.
+
+
 class FileSystemFact(BaseModel):
     filesystem: str
     size_kb: int
@@ -39,7 +57,7 @@ class FileSystemFact(BaseModel):
     avail_kb: int
     mountpoint: str
 
-    model_config = ConfigDict(extra="forbid")
+    model_config = ConfigDict(extra="forbid", defer_build=True)
 
 
 class HostKeys(BaseModel):
@@ -48,7 +66,17 @@ class HostKeys(BaseModel):
     machine_id: Optional[str] = None
     ipv4: Optional[list[str]] = None
 
-    model_config = ConfigDict(extra="forbid")
+    model_config = ConfigDict(extra="forbid", defer_build=True)
+
+
+class PackageInventory(BaseModel):
+    manager: Literal["dpkg", "rpm"]
+    count: int
+    digest: str
+    # (name, version, arch) rows rather than one object per package: hosts list thousands.
+    items: list[tuple[str, str, str]]
+
+    model_config = ConfigDict(extra="forbid", defer_build=True)
 
 
 class HostAttributes(BaseModel):
@@ -59,9 +87,11 @@ class HostAttributes(BaseModel):
     cpu_cores: Optional[int] = None
     mem_total_kb: Optional[int] = None
     uptime_sec: Optional[int] = None
-    filesystems: list[FileSystemFact] = Field(default_factory=list)
+    # None when the filesystems collector did not run, so a partial refresh never reads as "no mounts".
+    filesystems: Optional[list[FileSystemFact]] = None
+    packages: Optional[PackageInventory] = None
 
-    model_config = ConfigDict(extra="forbid")
+    model_config = ConfigDict(extra="forbid", defer_build=True)
 
 
 class Entity(BaseModel):
@@ -70,7 +100,41 @@ class Entity(BaseModel):
     keys: HostKeys
     attributes: HostAttributes
 
-    model_config = ConfigDict(extra="forbid")
+    model_config = ConfigDict(extra="forbid", defer_build=True)
+
+
+class ServiceKeys(BaseModel):
+    host: str
+    proto: Literal["tcp", "tcp6"]
+    address: str
+    port: int
+
+    model_config = ConfigDict(extra="forbid", defer_build=True)
+
+
+class ServiceAttributes(BaseModel):
+    process: Optional[str] = None
+
+    model_config = ConfigDict(extra="forbid", defer_build=True)
+
+
+class ServiceEntity(BaseModel):
+    """A listening socket of a host; ``keys.host`` is the host entity's external_id."""
+
+    entity_type: Literal["service"]
+    external_id: str
+    keys: ServiceKeys
+    attributes: ServiceAttributes
+
+    model_config = ConfigDict(extra="forbid", defer_build=True)
+
+
+class Relation(BaseModel):
+    relation_type: Literal["hosts"]
+    from_external_id: str
+    to_external_id: str
+
+    model_config = ConfigDict(extra="forbid", defer_build=True)
 
 
 class BatchV1(BaseModel):
@@ -79,8 +143,27 @@ class BatchV1(BaseModel):
     run_id: str
     job_id: str
     collected_at: str
-    entities: list[Entity]
-    relations: list[dict[str, Any]] = Field(default_factory=list)
+    entities: list[Annotated[Union[Entity, ServiceEntity], Field(discriminator="entity_type")]]
+    relations: list[Relation] = Field(default_factory=list)
     meta: dict[str, Any] = Field(default_factory=dict)
 
+    model_config = ConfigDict(extra="forbid", defer_build=True)
+
+
+class TaskEnvelope(BaseModel):
+    """One unit of work for the worker daemon; unset fields fall back to daemon defaults."""
+
+    run_id: str
+    task_id: str
+    target: Target
+    ingest_url: Optional[str] = None
+    ingest_token: Optional[str] = None
+    schema_version: Optional[Literal["1.0"]] = None
+    timeout_sec: Optional[int] = Field(default=None, ge=1)
+    strict: Optional[bool] = None
+    collect_mode: Optional[Literal["exec", "batched"]] = None
+    collect_profile: Optional[str] = None
+    collectors: Optional[list[str]] = None
+    delta_mode: Optional[Literal["off", "skip", "marker"]] = None
+
     model_config = ConfigDict(extra="forbid")
@@ -1,8 +1,20 @@
 from __future__ import annotations
 
+import hashlib
+import ipaddress
 import json
 import re
-from typing import Any
+from typing import Any, Iterable
+
+_MEMTOTAL_RE = re.compile(r"^MemTotal:\s+(\d+)\s+kB$", re.MULTILINE)
+
+# The package digest is a sum modulo 2**256, the width of one SHA-256 value.
+_DIGEST_MASK = (1 << 256) - 1
+
+# Prefix of the process list `ss -p` prints for a socket, up to its first process name.
+_SS_USERS = 'users:(("'
+# Socket state column of /proc/net/tcp{,6} for a listening socket.
+_PROC_LISTEN = "0A"
 
 _OS_RELEASE_KEYS = {
     "PRETTY_NAME": "os_pretty",
@@ -29,22 +41,36 @@ def parse_os_release(raw: str) -> dict[str, str]:
 
 
 def parse_meminfo(raw: str) -> int | None:
-    match = re.search(r"^MemTotal:\s+(\d+)\s+kB$", raw, re.MULTILINE)
+    # MemTotal is the first line of /proc/meminfo; jump to it instead of
+    # letting the pattern try every line. `^` still only matches at a line start.
+    start = raw.find("MemTotal:")
+    if start < 0:
+        return None
+    match = _MEMTOTAL_RE.search(raw, start)
     if not match:
         return None
     return int(match.group(1))
 
 
-def parse_df_p(raw: str) -> list[dict[str, Any]]:
-    rows: list[dict[str, Any]] = []
-    lines = [line.strip() for line in raw.splitlines() if line.strip()]
-    if not lines:
-        return rows
-    if lines[0].lower().startswith("filesystem"):
-        lines = lines[1:]
+def parse_df_p(raw: str | Iterable[str]) -> list[dict[str, Any]]:
+    """Parse ``df -P`` output given as text or as an iterable of lines.
 
+    Lines are consumed one at a time, so a streamed command output never has
+    to be held in memory as a whole.
+    """
+    rows: list[dict[str, Any]] = []
+    lines = raw.splitlines() if isinstance(raw, str) else raw
+    first = True
     for line in lines:
-        parts = re.split(r"\s+", line, maxsplit=5)
+        line = line.strip()
+        if not line:
+            continue
+        if first:
+            first = False
+            if line.lower().startswith("filesystem"):
+                continue
+
+        parts = line.split(None, 5)
         if len(parts) != 6:
             continue
         filesystem, size_kb, used_kb, avail_kb, _capacity, mountpoint = parts
@@ -69,7 +95,8 @@ def parse_ipv4_from_ip_addr(raw: str) -> list[str]:
     except json.JSONDecodeError:
         return []
 
-    ipv4: list[str] = []
+    # dict keeps first-seen order while deduplicating in O(1) per address.
+    ipv4: dict[str, None] = {}
     for iface in payload:
         if iface.get("ifname") == "lo":
             continue
@@ -77,9 +104,9 @@ def parse_ipv4_from_ip_addr(raw: str) -> list[str]:
             if addr.get("family") != "inet":
                 continue
             value = str(addr.get("local", "")).strip()
-            if value and value not in ipv4:
-                ipv4.append(value)
-    return ipv4
+            if value:
+                ipv4[value] = None
+    return list(ipv4)
 
 
 def parse_uptime_seconds(raw: str) -> int | None:
@@ -90,3 +117,97 @@ def parse_uptime_seconds(raw: str) -> int | None:
         return int(float(first))
     except ValueError:
         return None
+
+
+def parse_packages(raw: str | Iterable[str]) -> dict[str, Any] | None:
+    """Parse a package listing: a ``dpkg``/``rpm`` header line, then ``status\tname\tversion\tarch`` rows.
+
+    Lines are consumed one at a time, like ``parse_df_p``. Only installed
+    packages (dpkg status ``?i``) are kept, as ``(name, version, arch)``
+    tuples sorted by name. ``digest`` is the sum of the SHA-256 of every
+    ``name\tversion\tarch`` row modulo 2**256: it is updated as each line
+    arrives and does not depend on the order the package manager lists them
+    in, so two hosts or two runs with the same packages get the same digest.
+    Returns ``None`` for a host with neither dpkg nor rpm.
+    """
+    lines = iter(raw.splitlines() if isinstance(raw, str) else raw)
+    manager = next((line.strip() for line in lines if line.strip()), None)
+    if manager not in ("dpkg", "rpm"):
+        return None
+
+    items: list[tuple[str, str, str]] = []
+    digest = 0
+    for line in lines:
+        status, sep, row = line.rstrip("\r").partition("\t")
+        if not sep or status[1:2] != "i":
+            continue
+        fields = row.split("\t")
+        if len(fields) != 3 or not fields[0]:
+            continue
+        digest = (digest + int.from_bytes(hashlib.sha256(row.encode("utf-8")).digest(), "big")) & _DIGEST_MASK
+        items.append((fields[0], fields[1], fields[2]))
+    items.sort()
+    return {"manager": manager, "count": len(items), "digest": f"{digest:064x}", "items": items}
+
+
+def parse_listening_sockets(raw: str | Iterable[str]) -> list[tuple[str, str, int, str | None]]:
+    """Parse listening TCP sockets: an ``ss`` or ``proc`` header line, then that source's output.
+
+    ``ss`` is the output of ``ss -tlnp``; ``proc`` is /proc/net/tcp and
+    /proc/net/tcp6 concatenated, which names no process. Lines are consumed
+    one at a time, like ``parse_df_p``. Sockets come back as
+    ``(proto, address, port, process)`` tuples, ``proto`` being ``tcp`` or
+    ``tcp6``. They are deduplicated on the whole tuple through a dict, so the
+    thousands of ``SO_REUSEPORT`` sockets of one server cost one lookup each,
+    and sorted by port, then address, so well-known ports come first.
+    """
+    lines = iter(raw.splitlines() if isinstance(raw, str) else raw)
+    source = next((line.strip() for line in lines if line.strip()), None)
+    if source == "ss":
+        parse_line = _ss_socket
+    elif source == "proc":
+        parse_line = _proc_socket
+    else:
+        return []
+
+    sockets: dict[tuple[str, str, int, str | None], None] = {}
+    for line in lines:
+        socket = parse_line(line)
+        if socket is not None:
+            sockets[socket] = None
+    return sorted(sockets, key=lambda item: (item[2], item[0], item[1], item[3] or ""))
+
+
+def _ss_socket(line: str) -> tuple[str, str, int, str | None] | None:
+    parts = line.split(None, 5)
+    # State Recv-Q Send-Q Local Peer [Process]; the header line starts with "State".
+    if len(parts) < 5 or parts[0] != "LISTEN":
+        return None
+    address, _, port = parts[3].rpartition(":")
+    if not address or not port.isdigit():
+        return None
+    # "[::]" -> "::", "127.0.0.53%lo" -> "127.0.0.53": the scope is not part of the address.
+    address = address.strip("[]").partition("%")[0]
+    process = None
+    start = line.find(_SS_USERS)
+    if start >= 0:
+        start += len(_SS_USERS)
+        process = line[start : line.find('"', start)] or None
+    return ("tcp6" if ":" in address else "tcp", address, int(port), process)
+
+
+def _proc_socket(line: str) -> tuple[str, str, int, str | None] | None:
+    parts = line.split(None, 4)
+    if len(parts) < 4 or parts[3] != _PROC_LISTEN:
+        return None
+    address_hex, _, port_hex = parts[1].partition(":")
+    try:
+        # Each 32-bit word of the address is printed in host (little-endian) byte order.
+        packed = b"".join(
+            bytes.fromhex(address_hex[index : index + 8])[::-1] for index in range(0, len(address_hex), 8)
+        )
+        address = ipaddress.ip_address(packed)
+        port = int(port_hex, 16)
+    except ValueError:
+        return None
+    return ("tcp6" if address.version == 6 else "tcp", str(address), port, None)
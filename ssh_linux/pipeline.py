@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from .batch import build_batch
+from .collectors import HostFacts, collect_host_facts
+from .deadline import Deadline
+from .errors import ExitCode, IngestConnectorError, SSHConnectorError, ValidationConnectorError
+from .ingest_client import IngestClient, IngestClientCache, IngestResult
+from .main import log
+from .metrics import span, span_context
+from .models import Target
+from .ssh_client import DEFAULT_MAX_CHANNELS, SSHClient
+from .ssh_pool import SSHConnectionPool
+from .state import DeltaDecision, FactCache, FactStateStore, fact_cache_key, plan_delta
+
+
+@dataclass(frozen=True)
+class TaskSpec:
+    run_id: str
+    task_id: str
+    target: Target
+    ingest_url: str
+    ingest_token: str
+    schema_version: str = "1.0"
+    timeout_sec: int = 120
+    strict: bool = False
+    collect_mode: str = "exec"
+    delta_mode: str = "off"
+    max_channels: int = DEFAULT_MAX_CHANNELS
+    validate_batch: bool = False
+    ssh_profile: str = "default"
+    command_timeout_sec: int | None = None
+    collectors: tuple[str, ...] | None = None
+    file_reader: str = "exec"
+
+
+@dataclass(frozen=True)
+class TaskResult:
+    exit_code: int
+    batch_id: str | None = None
+    message: str | None = None
+
+
+def run_task(
+    spec: TaskSpec,
+    ssh_pool: SSHConnectionPool | None = None,
+    ingest_clients: IngestClientCache | None = None,
+    fact_state: FactStateStore | None = None,
+    deadline: Deadline | None = None,
+    fact_cache: FactCache | None = None,
+) -> TaskResult:
+    """Collect one target over SSH and post its batch; never raises.
+
+    Connect, collection and upload share one ``deadline`` of
+    ``spec.timeout_sec`` (started here unless the caller already did), so the
+    task as a whole, not each step of it, is bounded by the timeout.
+
+    With ``ssh_pool`` the SSH session is borrowed from the pool instead of
+    being opened and torn down for this task alone; with ``ingest_clients``
+    the upload reuses a kept-alive HTTP session. With ``fact_state`` and a
+    ``delta_mode`` other than ``off``, unchanged hosts are skipped or sent as
+    a compact marker, and the store is updated after each successful upload.
+    ``fact_cache`` spares re-running static commands; see ``collect_host_facts``.
+    """
+    deadline = deadline or Deadline(spec.timeout_sec)
+    facts = collect_task(spec, ssh_pool, deadline, fact_cache)
+    if isinstance(facts, TaskResult):
+        return facts
+
+    context = task_context(spec)
+
+    try:
+        with span("build_batch", **context):
+            batch_payload = build_batch(
+                run_id=spec.run_id,
+                task_id=spec.task_id,
+                target=spec.target,
+                facts=facts,
+                schema_version=spec.schema_version,
+                validate=spec.validate_batch,
+            )
+    except Exception as exc:  # noqa: BLE001
+        log("error", "batch_build_error", message=str(exc), **context)
+        return TaskResult(exit_code=int(ExitCode.COLLECTION_ERROR), message=str(exc))
+
+    delta = None
+    if fact_state is not None and spec.delta_mode != "off":
+        entity, *services = batch_payload["entities"]
+        delta = plan_delta(fact_state, spec.delta_mode, entity, related=services)
+        if delta.skip:
+            log("info", "ingest_skipped_unchanged", batch_id=delta.previous.batch_id, **context)
+            return TaskResult(exit_code=int(ExitCode.SUCCESS), batch_id=delta.previous.batch_id)
+        if delta.unchanged:
+            # Unchanged services are covered by the content hash and stay as last ingested.
+            batch_payload["entities"] = [delta.entity]
+            batch_payload["relations"] = []
+            batch_payload["meta"]["delta"] = {
+                "unchanged_external_ids": [entity["external_id"]],
+                "content_hash": delta.content_hash,
+            }
+
+    try:
+        with span("ingest", **context) as ingest_span:
+            if ingest_clients is not None:
+                ingest = ingest_clients.get(spec.ingest_url, spec.ingest_token).post(
+                    batch_payload, spec.task_id, spec.timeout_sec, deadline=deadline
+                )
+            else:
+                with IngestClient(spec.ingest_url, spec.ingest_token, pool_size=1) as client:
+                    ingest = client.post(batch_payload, spec.task_id, spec.timeout_sec, deadline=deadline)
+            ingest_span.bytes = ingest.bytes_sent
+    except IngestConnectorError as exc:
+        log("error", "ingest_error", message=str(exc), **context)
+        return TaskResult(exit_code=int(ExitCode.INGEST_ERROR), message=str(exc))
+
+    batch_id = ingest.batch_id
+    log("info", "ingest_success", batch_id=batch_id, **_ingest_fields(ingest), **context)
+    if delta is not None:
+        record_delta(fact_state, entity, delta, batch_id, context)
+    return TaskResult(exit_code=int(ExitCode.SUCCESS), batch_id=batch_id)
+
+
+def collect_task(
+    spec: TaskSpec,
+    ssh_pool: SSHConnectionPool | None = None,
+    deadline: Deadline | None = None,
+    fact_cache: FactCache | None = None,
+) -> HostFacts | TaskResult:
+    """SSH and collection half of ``run_task``; failures come back as a TaskResult."""
+    context = task_context(spec)
+    deadline = deadline or Deadline(spec.timeout_sec)
+
+    log(
+        "info",
+        "connector_started",
+        strict=spec.strict,
+        timeout_sec=spec.timeout_sec,
+        collect_mode=spec.collect_mode,
+        collectors=",".join(spec.collectors) if spec.collectors else "full",
+        **context,
+    )
+
+    try:
+        if ssh_pool is not None:
+            session = ssh_pool.session(
+                spec.target, timeout_sec=spec.timeout_sec, profile=spec.ssh_profile, deadline=deadline
+            )
+        else:
+            session = SSHClient(spec.target, timeout_sec=spec.timeout_sec, profile=spec.ssh_profile, deadline=deadline)
+        with span_context(**context):
+            with span("ssh_connect"):
+                session.connect()
+            try:
+                log("info", "ssh_connected", **context)
+                facts = collect_host_facts(
+                    session,
+                    strict=spec.strict,
+                    log=lambda level, message: log(level, "collector_warning", message=message, **context),
+                    mode=spec.collect_mode,
+                    max_channels=spec.max_channels,
+                    deadline=deadline,
+                    command_timeout_sec=spec.command_timeout_sec,
+                    collectors=spec.collectors,
+                    file_reader=spec.file_reader,
+                    fact_cache=fact_cache,
+                    fact_cache_key=fact_cache_key(spec.target),
+                )
+                log("info", "collection_complete", **context)
+            finally:
+                session.close()
+    except ValidationConnectorError as exc:
+        log("error", "validation_error", message=str(exc), **context)
+        return TaskResult(exit_code=int(ExitCode.VALIDATION_ERROR), message=str(exc))
+    except SSHConnectorError as exc:
+        log("error", "ssh_error", message=str(exc), **context)
+        return TaskResult(exit_code=int(ExitCode.SSH_ERROR), message=str(exc))
+    except Exception as exc:  # noqa: BLE001
+        log("error", "collection_error", message=str(exc), **context)
+        return TaskResult(exit_code=int(ExitCode.COLLECTION_ERROR), message=str(exc))
+
+    return facts
+
+
+def record_delta(
+    fact_state: FactStateStore,
+    entity: dict,
+    delta: DeltaDecision,
+    batch_id: str,
+    context: dict[str, object],
+) -> None:
+    try:
+        fact_state.record(entity, delta.content_hash, batch_id)
+    except OSError as exc:
+        # The upload succeeded; a stale state entry only costs a full upload next time.
+        log("warn", "fact_state_error", message=str(exc), **context)
+
+
+def task_context(spec: TaskSpec) -> dict[str, str]:
+    return {
+        "run_id": spec.run_id,
+        "task_id": spec.task_id,
+        "target_address": spec.target.address,
+    }
+
+
+def _ingest_fields(ingest: IngestResult) -> dict[str, object]:
+    return {
+        "bytes_sent": ingest.bytes_sent,
+        "payload_bytes": ingest.payload_bytes,
+        "compressed": ingest.compressed,
+        "latency_ms": round(ingest.latency_sec * 1000, 1),
+    }
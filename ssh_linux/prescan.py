@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Sequence
+
+from .metrics import record_span
+from .state import _write_json
+
+if TYPE_CHECKING:
+    from .models import Target
+
+# Probes in flight at once: thousands of targets take a few timeouts, while
+# the sockets stay well below the usual 1024 open-file limit.
+DEFAULT_CONCURRENCY = 512
+# A target that failed twice in a row is not probed again for 1 min, then
+# 2, 4, ... up to 1 h; one success forgets it.
+BACKOFF_BASE_SEC = 60.0
+BACKOFF_MAX_SEC = 3600.0
+# RFC 4253 lets a server send other lines before its "SSH-" version line.
+_MAX_BANNER_LINES = 8
+
+
+@dataclass(frozen=True)
+class _Failure:
+    failures: int
+    # Wall clock, so a persisted entry stays meaningful across runs.
+    retry_at: float
+    reason: str
+
+
+class Prescanner:
+    """Fails dead targets fast with a concurrent TCP connect and SSH banner probe.
+
+    ``scan`` probes every distinct address and port of its targets on one
+    asyncio loop, at most ``concurrency`` at a time, each within
+    ``timeout_sec``. A target counts as reachable once it sends an ``SSH-``
+    banner. Targets that keep failing are backed off exponentially and
+    reported from the negative cache without being probed. With
+    ``state_path`` that cache survives restarts. Targets behind a jump host
+    are never probed, because only the bastion can reach them.
+    """
+
+    def __init__(
+        self,
+        timeout_sec: float = 3.0,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        state_path: str | Path | None = None,
+    ) -> None:
+        self._timeout_sec = timeout_sec
+        self._concurrency = concurrency
+        self._state_path = Path(state_path) if state_path is not None else None
+        self._lock = threading.Lock()
+        self._failures = self._load()
+
+    def scan(self, targets: Sequence[Target]) -> list[str | None]:
+        """Per target, ``None`` if it may be collected, else the error to report for it."""
+        started = time.monotonic()
+        now = time.time()
+        errors: list[str | None] = [None] * len(targets)
+        probes: dict[tuple[str, int], list[int]] = {}
+        with self._lock:
+            for index, target in enumerate(targets):
+                if target.jump is not None:
+                    continue
+                failure = self._failures.get(_key(target.address, target.port))
+                if failure is not None and failure.retry_at > now:
+                    errors[index] = _message(
+                        target.address,
+                        target.port,
+                        f"{failure.reason} ({failure.failures} failed probes; "
+                        f"next probe in {failure.retry_at - now:.0f}s)",
+                    )
+                else:
+                    probes.setdefault((target.address, target.port), []).append(index)
+
+        if probes:
+            reasons = asyncio.run(self._probe_all(list(probes)))
+            now = time.time()
+            with self._lock:
+                for (address, port), reason in zip(probes, reasons):
+                    self._record(_key(address, port), reason, now)
+                    for index in probes[address, port]:
+                        errors[index] = _message(address, port, reason) if reason is not None else None
+                self._save()
+        record_span(
+            "prescan",
+            time.monotonic() - started,
+            targets=len(targets),
+            probed=len(probes),
+            unreachable=sum(error is not None for error in errors),
+        )
+        return errors
+
+    async def _probe_all(self, endpoints: list[tuple[str, int]]) -> list[str | None]:
+        slots = asyncio.Semaphore(self._concurrency)
+
+        async def probe(address: str, port: int) -> str | None:
+            async with slots:
+                return await _probe(address, port, self._timeout_sec)
+
+        return await asyncio.gather(*(probe(address, port) for address, port in endpoints))
+
+    def _record(self, key: str, reason: str | None, now: float) -> None:
+        if reason is None:
+            self._failures.pop(key, None)
+            return
+        previous = self._failures.get(key)
+        failures = previous.failures + 1 if previous is not None else 1
+        # A single failure is not backed off: one dropped SYN must not hide a host.
+        delay = min(BACKOFF_BASE_SEC * 2 ** (failures - 2), BACKOFF_MAX_SEC) if failures > 1 else 0.0
+        self._failures[key] = _Failure(failures, now + delay, reason)
+
+    def _load(self) -> dict[str, _Failure]:
+        if self._state_path is None:
+            return {}
+        try:
+            data = json.loads(self._state_path.read_text(encoding="utf-8"))
+            return {str(key): _Failure(int(value[0]), float(value[1]), str(value[2])) for key, value in data.items()}
+        except (OSError, ValueError, KeyError, TypeError, IndexError, AttributeError):
+            return {}
+
+    def _save(self) -> None:
+        if self._state_path is None:
+            return
+        payload = {key: [failure.failures, failure.retry_at, failure.reason] for key, failure in self._failures.items()}
+        try:
+            _write_json(self._state_path, payload)
+        except OSError:
+            # Only the backoff is lost; the next run probes these targets again.
+            pass
+
+
+async def _probe(address: str, port: int, timeout_sec: float) -> str | None:
+    loop = asyncio.get_running_loop()
+    expires_at = loop.time() + timeout_sec
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout_sec)
+    except asyncio.TimeoutError:
+        return f"TCP connect timed out after {timeout_sec:g}s"
+    except OSError as exc:
+        return f"TCP connect failed: {exc.strerror or exc}"
+
+    try:
+        for _ in range(_MAX_BANNER_LINES):
+            line = await asyncio.wait_for(reader.readline(), max(0.0, expires_at - loop.time()))
+            if line.startswith(b"SSH-"):
+                return None
+            if not line:
+                return "connection closed before the SSH banner"
+        return "no SSH banner in the server greeting"
+    except asyncio.TimeoutError:
+        return f"no SSH banner within {timeout_sec:g}s"
+    except (OSError, ValueError) as exc:
+        return f"reading the SSH banner failed: {exc}"
+    finally:
+        writer.close()
+        with suppress(OSError):
+            await writer.wait_closed()
+
+
+def _key(address: str, port: int) -> str:
+    return f"{address}:{port}"
+
+
+def _message(address: str, port: int, reason: str) -> str:
+    return f"SSH prescan failed: host={address} port={port} cause={reason}"
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Sequence
+
+if TYPE_CHECKING:
+    import paramiko
+
+# paramiko's own read size; every SFTP server answers reads this large.
+READ_SIZE = 32768
+
+
+@dataclass(frozen=True)
+class FileRead:
+    """One remote file read over SFTP; ``error`` is set instead of ``data`` when it failed."""
+
+    path: str
+    data: bytes = b""
+    truncated: bool = False
+    error: str | None = None
+
+
+def read_files(sftp: paramiko.SFTPClient, files: Sequence[tuple[str, int]], deadline: float) -> list[FileRead]:
+    """Read each ``(path, max_bytes)`` of ``files`` with pipelined SFTP requests.
+
+    All OPENs go out at once, and each file's next READ is sent as soon as
+    the previous one is answered, so the whole list costs about as many
+    round trips as its largest file rather than the sum over all files.
+    Sizes are never asked for: /proc files report 0 and are read to EOF.
+    Raises ``OSError`` (including ``TimeoutError`` at ``deadline``) or
+    ``paramiko.SSHException`` if the session itself fails.
+    """
+    pending = [_PendingFile(sftp, path, max_bytes) for path, max_bytes in files]
+    for file in pending:
+        file.open()
+    while not all(file.done for file in pending):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("SFTP reads did not finish before the deadline")
+        sftp.sock.settimeout(remaining)
+        sftp._read_response()
+    # Handles are not closed one by one: closing the session releases them all.
+    return [file.result() for file in pending]
+
+
+class _PendingFile:
+    """Request state of one file; paramiko calls ``_async_response`` with each reply."""
+
+    def __init__(self, sftp: paramiko.SFTPClient, path: str, max_bytes: int) -> None:
+        self.done = False
+        self._sftp = sftp
+        self._path = path
+        # One byte past the cap tells a truncated file from one exactly at the cap.
+        self._limit = max_bytes + 1
+        self._handle: bytes | None = None
+        self._chunks: list[bytes] = []
+        self._received = 0
+        self._error: str | None = None
+
+    def open(self) -> None:
+        from paramiko.sftp import CMD_OPEN, SFTP_FLAG_READ
+        from paramiko.sftp_attr import SFTPAttributes
+
+        self._sftp._async_request(self, CMD_OPEN, self._path.encode("utf-8"), SFTP_FLAG_READ, SFTPAttributes())
+
+    def result(self) -> FileRead:
+        if self._error is not None:
+            return FileRead(self._path, error=self._error)
+        data = b"".join(self._chunks)
+        if len(data) < self._limit:
+            return FileRead(self._path, data)
+        # Same rule as a capped command: keep whole lines only.
+        data = data[: self._limit - 1]
+        return FileRead(self._path, data[: data.rfind(b"\n") + 1], truncated=True)
+
+    def _async_response(self, t: int, msg: paramiko.Message, num: int) -> None:
+        from paramiko.sftp import CMD_DATA, CMD_HANDLE, CMD_STATUS
+
+        if t == CMD_STATUS:
+            try:
+                self._sftp._convert_status(msg)
+            except EOFError:
+                pass
+            except OSError as exc:
+                self._error = str(exc)
+            self.done = True
+        elif t == CMD_HANDLE and self._handle is None:
+            self._handle = msg.get_binary()
+            self._read_next()
+        elif t == CMD_DATA:
+            data = msg.get_string()
+            self._chunks.append(data)
+            self._received += len(data)
+            if not data or self._received >= self._limit:
+                self.done = True
+            else:
+                self._read_next()
+        else:
+            self._error = f"unexpected SFTP response type {t}"
+            self.done = True
+
+    def _read_next(self) -> None:
+        from paramiko.sftp import CMD_READ, int64
+
+        size = min(READ_SIZE, self._limit - self._received)
+        self._sftp._async_request(self, CMD_READ, self._handle, int64(self._received), size)
@@ -1,11 +1,25 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-
-import paramiko
+import math
+import select
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Iterator, Sequence
 
+from .deadline import Deadline
 from .errors import SSHConnectorError
-from .models import Target
+from .keys import KEY_CACHE
+from .metrics import record_span
+from .ssh_profiles import handshake_sec, negotiated, resolve_profile, transport_factory
+
+if TYPE_CHECKING:
+    import paramiko
+
+    from .bastion import Tunnel
+    from .models import Target
+    from .sftp import FileRead
 
 
 @dataclass(frozen=True)
@@ -13,15 +27,88 @@ class CommandResult:
     exit_code: int
     stdout: str
     stderr: str
+    stdout_truncated: bool = False
+    stderr_truncated: bool = False
+    # Measurements, not output: wall time of the command and stdout bytes received before any cap.
+    duration_sec: float = field(default=0.0, compare=False)
+    stdout_bytes: int = field(default=0, compare=False)
+
+
+# OpenSSH's default MaxSessions is 10 channels per connection.
+DEFAULT_MAX_CHANNELS = 8
+DEFAULT_MAX_STDOUT_BYTES = 16 * 1024 * 1024
+DEFAULT_MAX_STDERR_BYTES = 64 * 1024
+
+_RECV_BYTES = 32768
+
+
+class _BoundedBuffer:
+    """Keeps the first ``limit`` bytes of a stream and drops the rest."""
+
+    def __init__(self, limit: int) -> None:
+        self._limit = limit
+        self._size = 0
+        self._chunks: list[bytes] = []
+        self.truncated = False
+        self.received = 0
+
+    def append(self, data: bytes) -> None:
+        self.received += len(data)
+        room = self._limit - self._size
+        if len(data) > room:
+            self.truncated = True
+            data = data[: max(room, 0)]
+        if data:
+            self._chunks.append(data)
+            self._size += len(data)
+
+    def text(self) -> str:
+        raw = b"".join(self._chunks)
+        if self.truncated:
+            # Never hand a parser half a line.
+            raw = raw[: raw.rfind(b"\n") + 1]
+        return raw.decode("utf-8", errors="replace").strip()
+
+
+@dataclass
+class _RunningCommand:
+    index: int
+    command: str
+    started: float
+    deadline: float
+    stdout: _BoundedBuffer
+    stderr: _BoundedBuffer
 
 
 class SSHClient:
-    def __init__(self, target: Target, timeout_sec: int) -> None:
+    def __init__(
+        self,
+        target: Target,
+        timeout_sec: int,
+        max_stdout_bytes: int = DEFAULT_MAX_STDOUT_BYTES,
+        max_stderr_bytes: int = DEFAULT_MAX_STDERR_BYTES,
+        profile: str = "default",
+        deadline: Deadline | None = None,
+    ) -> None:
         self._target = target
+        self._profile = resolve_profile(target, profile)
+        self._deadline = deadline
         self._timeout_sec = timeout_sec
+        self._max_stdout_bytes = max_stdout_bytes
+        self._max_stderr_bytes = max_stderr_bytes
         self._client: paramiko.SSHClient | None = None
+        self._tunnel: Tunnel | None = None
 
     def connect(self) -> None:
+        """Open and authenticate the connection within the remaining task budget.
+
+        paramiko applies its TCP, banner and auth timeouts one after another,
+        so with a deadline a watchdog closes the half-open connection once the
+        budget runs out instead of letting the three add up.
+        """
+        import paramiko
+
+        timeout = self._connect_timeout()
         client = paramiko.SSHClient()
         client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
 
@@ -29,48 +116,217 @@ class SSHClient:
             "hostname": self._target.address,
             "port": self._target.port,
             "username": self._target.user,
-            "timeout": self._timeout_sec,
-            "banner_timeout": self._timeout_sec,
-            "auth_timeout": self._timeout_sec,
+            "timeout": timeout,
+            "banner_timeout": timeout,
+            "auth_timeout": timeout,
             "look_for_keys": False,
             "allow_agent": False,
+            "compress": self._profile.compress,
+            "transport_factory": transport_factory(self._profile),
         }
-        if self._target.auth.method == "key":
-            kwargs["key_filename"] = self._target.auth.key_path
-        else:
+        if self._target.auth.method != "key":
             kwargs["password"] = self._target.auth.password
 
+        expired = threading.Event()
+        watchdog: threading.Timer | None = None
+        if self._deadline is not None:
+
+            def expire() -> None:
+                expired.set()
+                client.close()
+
+            watchdog = threading.Timer(timeout, expire)
+            watchdog.daemon = True
+            watchdog.start()
+
         try:
+            if self._target.auth.method == "key":
+                kwargs["pkey"] = KEY_CACHE.load(self._target.auth.key_path, self._target.auth.passphrase)
+            if self._target.jump is not None:
+                kwargs["sock"] = self._open_tunnel(timeout).channel
             client.connect(**kwargs)
-        except (paramiko.AuthenticationException, paramiko.SSHException, OSError) as exc:
-            raise SSHConnectorError(self._format_connect_error(exc)) from exc
+        except (paramiko.AuthenticationException, paramiko.SSHException, OSError, EOFError) as exc:
+            self._close_tunnel()
+            cause = TimeoutError("task deadline exceeded") if expired.is_set() else exc
+            raise SSHConnectorError(self._format_connect_error(cause)) from exc
+        except BaseException:
+            self._close_tunnel()
+            raise
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+        if expired.is_set():
+            self._close_tunnel()
+            raise SSHConnectorError(self._format_connect_error(TimeoutError("task deadline exceeded")))
 
         self._client = client
+        self._record_handshake()
 
     def run(self, command: str, timeout_sec: int | None = None) -> CommandResult:
-        if self._client is None:
-            raise SSHConnectorError("SSH client is not connected")
+        """Run one command, draining stdout and stderr together into bounded buffers.
+
+        Output beyond the byte caps is dropped and flagged on the result, cut
+        back to the last complete line. ``timeout_sec`` bounds how long the
+        command may go without producing output or exiting.
+        """
+        outcome = self.run_many([command], max_channels=1, timeout_sec=timeout_sec)[0]
+        if isinstance(outcome, SSHConnectorError):
+            raise outcome
+        return outcome
 
+    def run_many(
+        self,
+        commands: Sequence[str],
+        max_channels: int = DEFAULT_MAX_CHANNELS,
+        timeout_sec: int | None = None,
+    ) -> list[CommandResult | SSHConnectorError]:
+        """Run independent commands on concurrent channels of the one transport.
+
+        At most ``max_channels`` channels are open at once, so wall time is
+        roughly the slowest command rather than the sum of all of them.
+        Results keep the order of ``commands``; a command that failed at the
+        SSH layer yields its ``SSHConnectorError`` in place of a result, the
+        same error ``run`` would have raised for it.
+        """
+        import paramiko
+
+        transport = self._transport()
+        timeout = timeout_sec or self._timeout_sec
+        hard_deadline = self._hard_deadline()
+        results: list[CommandResult | SSHConnectorError | None] = [None] * len(commands)
+        queued = deque(enumerate(commands))
+        running: dict[paramiko.Channel, _RunningCommand] = {}
+        limit = max(1, max_channels)
+
+        while queued or running:
+            while queued and len(running) < limit:
+                index, command = queued.popleft()
+                started = time.monotonic()
+                if started >= hard_deadline:
+                    results[index] = self._deadline_error(command, timeout)
+                    record_span("command", 0.0, name=_span_name(command), ok=False)
+                    continue
+                try:
+                    channel = _open_exec_channel(transport, command, min(timeout, hard_deadline - started))
+                except paramiko.ChannelException as exc:
+                    if running:
+                        # The server allows fewer sessions than requested:
+                        # retry once one of ours finishes and stay below it.
+                        queued.appendleft((index, command))
+                        limit = len(running)
+                        break
+                    results[index] = self._command_error(command, timeout, exc)
+                    record_span("command", time.monotonic() - started, name=_span_name(command), ok=False)
+                    continue
+                except (paramiko.SSHException, OSError) as exc:
+                    results[index] = self._command_error(command, timeout, exc)
+                    record_span("command", time.monotonic() - started, name=_span_name(command), ok=False)
+                    continue
+                running[channel] = _RunningCommand(
+                    index,
+                    command,
+                    started=started,
+                    deadline=min(started + timeout, hard_deadline),
+                    stdout=_BoundedBuffer(self._max_stdout_bytes),
+                    stderr=_BoundedBuffer(self._max_stderr_bytes),
+                )
+
+            if not running:
+                continue
+
+            _wait_readable(list(running), min(run.deadline for run in running.values()))
+
+            now = time.monotonic()
+            for channel, run in list(running.items()):
+                if _drain(channel, run.stdout.append, run.stderr.append):
+                    run.deadline = min(now + timeout, hard_deadline)
+                if _finished(channel):
+                    result = CommandResult(
+                        exit_code=channel.recv_exit_status(),
+                        stdout=run.stdout.text(),
+                        stderr=run.stderr.text(),
+                        stdout_truncated=run.stdout.truncated,
+                        stderr_truncated=run.stderr.truncated,
+                        duration_sec=now - run.started,
+                        stdout_bytes=run.stdout.received,
+                    )
+                    results[run.index] = result
+                    ok = result.exit_code == 0
+                elif now >= run.deadline:
+                    results[run.index] = self._command_error(run.command, timeout, _timeout_cause(now, hard_deadline))
+                    ok = False
+                else:
+                    continue
+                name = _span_name(run.command)
+                record_span("command", now - run.started, name=name, bytes=run.stdout.received, ok=ok)
+                channel.close()
+                del running[channel]
+
+        return results  # type: ignore[return-value]
+
+    def read_files(self, files: Sequence[tuple[str, int]], timeout_sec: int | None = None) -> list[FileRead]:
+        """Read ``(path, max_bytes)`` files over one SFTP session, without spawning remote processes.
+
+        A file that cannot be read comes back with ``FileRead.error`` set.
+        ``SSHConnectorError`` means the SFTP subsystem is unavailable or the
+        session failed; the transport itself stays usable for commands.
+        """
+        import paramiko
+
+        from .sftp import read_files
+
+        transport = self._transport()
+        timeout = timeout_sec or self._timeout_sec
+        started = time.monotonic()
+        deadline = min(started + timeout, self._hard_deadline())
+        received = 0
+        channel = None
         try:
-            _, stdout, stderr = self._client.exec_command(
-                command,
-                timeout=timeout_sec or self._timeout_sec,
-            )
-            stdout_value = stdout.read().decode("utf-8", errors="replace").strip()
-            stderr_value = stderr.read().decode("utf-8", errors="replace").strip()
-            exit_code = stdout.channel.recv_exit_status()
-            return CommandResult(exit_code=exit_code, stdout=stdout_value, stderr=stderr_value)
-        except (paramiko.SSHException, OSError) as exc:
+            channel = transport.open_session(timeout=max(deadline - started, 0.001))
+            channel.settimeout(max(deadline - time.monotonic(), 0.001))
+            channel.invoke_subsystem("sftp")
+            reads = read_files(paramiko.SFTPClient(channel), files, deadline)
+            received = sum(len(read.data) for read in reads)
+        except (paramiko.SSHException, OSError, EOFError) as exc:
+            record_span("sftp", time.monotonic() - started, name="read_files", ok=False)
             raise SSHConnectorError(
-                f"SSH command execution failed: command={command!r} "
-                f"timeout_sec={timeout_sec or self._timeout_sec} "
+                f"SFTP read failed: paths={[path for path, _ in files]} timeout_sec={timeout} "
                 f"cause={_format_exception_reason(exc)}"
             ) from exc
+        finally:
+            if channel is not None:
+                channel.close()
+        record_span("sftp", time.monotonic() - started, name="read_files", bytes=received)
+        return reads
+
+    def stream_lines(self, command: str, timeout_sec: int | None = None) -> CommandStream:
+        """Start ``command`` and return an iterator over its stdout lines.
+
+        Lines are decoded as they arrive, so a parser can consume large output
+        without the whole text being held in memory. stderr is drained
+        alongside into a bounded buffer so a chatty command cannot stall the
+        channel. The exit code is available on ``CommandStream.result`` once
+        the iterator is exhausted.
+        """
+        import paramiko
+
+        transport = self._transport()
+        timeout = timeout_sec or self._timeout_sec
+        hard_deadline = self._hard_deadline()
+        now = time.monotonic()
+        if now >= hard_deadline:
+            raise self._deadline_error(command, timeout)
+        try:
+            channel = _open_exec_channel(transport, command, min(timeout, hard_deadline - now))
+        except (paramiko.SSHException, OSError) as exc:
+            raise self._command_error(command, timeout, exc) from exc
+        return CommandStream(self, channel, command, timeout)
 
     def close(self) -> None:
         if self._client is not None:
             self._client.close()
             self._client = None
+        self._close_tunnel()
 
     def __enter__(self) -> "SSHClient":
         self.connect()
@@ -85,15 +341,204 @@ class SSHClient:
             f"port={self._target.port}",
             f"user={self._target.user}",
             f"auth_method={self._target.auth.method}",
+            f"ssh_profile={self._profile.name}",
             f"timeout_sec={self._timeout_sec}",
         ]
 
+        if self._target.jump is not None:
+            jump = self._target.jump
+            details.append(f"jump={jump.user}@{jump.address}:{jump.port}")
         if self._target.auth.method == "key" and self._target.auth.key_path:
             details.append(f"key_path={self._target.auth.key_path}")
 
         details.append(f"cause={_format_exception_reason(exc)}")
         return f"SSH connect/auth failed: {' '.join(details)}"
 
+    def _open_tunnel(self, timeout_sec: float) -> Tunnel:
+        from .bastion import BASTIONS
+
+        self._tunnel = BASTIONS.open_tunnel(self._target.jump, self._target.address, self._target.port, timeout_sec)
+        return self._tunnel
+
+    def _close_tunnel(self) -> None:
+        if self._tunnel is not None:
+            self._tunnel.close()
+            self._tunnel = None
+
+    def _connect_timeout(self) -> float:
+        if self._deadline is None:
+            return self._timeout_sec
+        if self._deadline.expired():
+            raise SSHConnectorError(self._format_connect_error(TimeoutError("task deadline exceeded")))
+        return self._deadline.timeout(self._timeout_sec)
+
+    def _hard_deadline(self) -> float:
+        """Monotonic time by which every command must be done; inf without a deadline."""
+        return self._deadline.expires_at if self._deadline is not None else math.inf
+
+    def _deadline_error(self, command: str, timeout_sec: int) -> SSHConnectorError:
+        # Not a transport failure, so the pooled connection stays reusable.
+        return SSHConnectorError(
+            f"SSH command execution failed: command={command!r} timeout_sec={timeout_sec} "
+            "cause=TimeoutError: task deadline exceeded before the command started"
+        )
+
+    def _record_handshake(self) -> None:
+        transport = self._client.get_transport() if self._client is not None else None
+        duration = handshake_sec(transport) if transport is not None else None
+        if duration is None:
+            return
+        record_span("ssh_handshake", duration, name=self._profile.name, **negotiated(transport))
+
+    def _transport(self) -> paramiko.Transport:
+        if self._client is None:
+            raise SSHConnectorError("SSH client is not connected")
+        transport = self._client.get_transport()
+        if transport is None or not transport.is_active():
+            raise self._command_failed(SSHConnectorError("SSH command execution failed: transport is not active"))
+        return transport
+
+    def _command_error(self, command: str, timeout_sec: int, exc: Exception) -> SSHConnectorError:
+        return self._command_failed(
+            SSHConnectorError(
+                f"SSH command execution failed: command={command!r} "
+                f"timeout_sec={timeout_sec} "
+                f"cause={_format_exception_reason(exc)}"
+            )
+        )
+
+    def _command_failed(self, error: SSHConnectorError) -> SSHConnectorError:
+        """Hook for every SSH-level command failure; returns ``error`` unchanged."""
+        return error
+
+
+class CommandStream:
+    """stdout lines of a running command; see ``SSHClient.stream_lines``.
+
+    A line longer than the client's stdout cap is cut at the cap and
+    ``result.stdout_truncated`` is set. The stream can be iterated once;
+    every ``iter()`` returns the same iterator. Closing the stream early
+    closes the channel.
+    """
+
+    def __init__(self, client: SSHClient, channel: paramiko.Channel, command: str, timeout_sec: int) -> None:
+        self.result: CommandResult | None = None
+        self._client = client
+        self._channel = channel
+        self._command = command
+        self._timeout_sec = timeout_sec
+        self._started = time.monotonic()
+        self._lines: Iterator[str] | None = None
+
+    def __iter__(self) -> Iterator[str]:
+        if self._lines is None:
+            self._lines = self._read_lines()
+        return self._lines
+
+    def _read_lines(self) -> Iterator[str]:
+        channel = self._channel
+        max_line = self._client._max_stdout_bytes
+        stderr = _BoundedBuffer(self._client._max_stderr_bytes)
+        truncated = False
+        pending = b""
+        received = 0
+        ok = False
+        hard_deadline = self._client._hard_deadline()
+        deadline = min(time.monotonic() + self._timeout_sec, hard_deadline)
+        try:
+            while True:
+                chunks: list[bytes] = []
+                if _drain(channel, chunks.append, stderr.append):
+                    deadline = min(time.monotonic() + self._timeout_sec, hard_deadline)
+                    data = b"".join(chunks)
+                    received += len(data)
+                    pending += data
+                    *lines, pending = pending.split(b"\n")
+                    for line in lines:
+                        if len(line) > max_line:
+                            truncated = True
+                            line = line[:max_line]
+                        yield line.decode("utf-8", errors="replace")
+                    if len(pending) > max_line:
+                        truncated = True
+                        yield pending[:max_line].decode("utf-8", errors="replace")
+                        pending = b""
+                if _finished(channel):
+                    break
+                now = time.monotonic()
+                if now >= deadline:
+                    cause = _timeout_cause(now, hard_deadline)
+                    raise self._client._command_error(self._command, self._timeout_sec, cause)
+                _wait_readable([channel], deadline)
+            if pending:
+                yield pending.decode("utf-8", errors="replace")
+            self.result = CommandResult(
+                exit_code=channel.recv_exit_status(),
+                stdout="",
+                stderr=stderr.text(),
+                stdout_truncated=truncated,
+                stderr_truncated=stderr.truncated,
+                duration_sec=time.monotonic() - self._started,
+                stdout_bytes=received,
+            )
+            ok = self.result.exit_code == 0
+        finally:
+            channel.close()
+            duration = time.monotonic() - self._started
+            record_span("command", duration, name=_span_name(self._command), bytes=received, ok=ok)
+
+    def close(self) -> None:
+        self._channel.close()
+
+    def __enter__(self) -> "CommandStream":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def _open_exec_channel(transport: paramiko.Transport, command: str, timeout_sec: int) -> paramiko.Channel:
+    channel = transport.open_session(timeout=timeout_sec)
+    channel.exec_command(command)
+    return channel
+
+
+def _wait_readable(channels: list[paramiko.Channel], deadline: float) -> None:
+    wait = max(0.0, deadline - time.monotonic())
+    # fileno() wakes on stdout, stderr and EOF; the cap covers an exit status
+    # that arrives without any of those.
+    select.select(channels, [], [], min(wait, 0.5))
+
+
+def _timeout_cause(now: float, hard_deadline: float) -> TimeoutError:
+    return TimeoutError("task deadline exceeded" if now >= hard_deadline else "command timed out")
+
+
+def _span_name(command: str) -> str:
+    # A batched composite script would make an unbounded metric label; the
+    # single-line `sh -c` wrappers of fixed commands are labels like any other.
+    return "sh -c <script>" if command.startswith("sh -c ") and "\n" in command else command
+
+
+def _finished(channel: paramiko.Channel) -> bool:
+    return channel.exit_status_ready() and not channel.recv_ready() and not channel.recv_stderr_ready()
+
+
+def _drain(
+    channel: paramiko.Channel,
+    on_stdout: Callable[[bytes], None],
+    on_stderr: Callable[[bytes], None],
+) -> bool:
+    """Read whatever both streams have buffered; True if anything arrived."""
+    progressed = False
+    while channel.recv_ready():
+        on_stdout(channel.recv(_RECV_BYTES))
+        progressed = True
+    while channel.recv_stderr_ready():
+        on_stderr(channel.recv_stderr(_RECV_BYTES))
+        progressed = True
+    return progressed
+
 
 def _format_exception_reason(exc: Exception) -> str:
     message = str(exc).strip()
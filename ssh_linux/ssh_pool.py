@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+
+from .deadline import Deadline
+from .errors import SSHConnectorError
+from .models import JumpHost, Target
+from .ssh_client import SSHClient
+
+PoolKey = tuple[str, int, str, str, str, str, str]
+
+
+@dataclass
+class _PooledConnection:
+    key: PoolKey
+    client: SSHClient
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class PooledSSHClient(SSHClient):
+    """SSHClient whose connect/close borrow a live transport from a pool.
+
+    It is a drop-in for ``SSHClient`` so ``collect_host_facts`` works unchanged.
+    A session whose command hit an SSH error is discarded instead of being
+    returned, since the transport may be half-dead.
+    """
+
+    def __init__(
+        self,
+        pool: SSHConnectionPool,
+        target: Target,
+        timeout_sec: int,
+        profile: str = "default",
+        deadline: Deadline | None = None,
+    ) -> None:
+        super().__init__(target, timeout_sec, profile=profile, deadline=deadline)
+        self._pool = pool
+        self._connection: _PooledConnection | None = None
+        self._broken = False
+
+    def connect(self) -> None:
+        self._connection = self._pool._acquire(
+            self._target, self._connect_timeout(), self._profile.name, self._deadline
+        )
+        self._client = self._connection.client._client
+        self._broken = False
+
+    def _command_failed(self, error: SSHConnectorError) -> SSHConnectorError:
+        self._broken = True
+        return error
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._pool._release(self._connection, reusable=not self._broken)
+            self._connection = None
+        self._client = None
+
+
+class SSHConnectionPool:
+    """Reusable SSH transports keyed by (address, port, user, auth).
+
+    Idle connections are health-checked on checkout, evicted after
+    ``max_idle_sec`` without use and never reused past ``max_age_sec``. At most
+    ``max_per_host`` connections (idle plus checked out) exist per key; callers
+    beyond that wait up to their own ``timeout_sec`` for one to be released.
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = 4,
+        max_idle_sec: float = 300.0,
+        max_age_sec: float = 1800.0,
+        reap_interval_sec: float | None = None,
+    ) -> None:
+        self._max_per_host = max_per_host
+        self._max_idle_sec = max_idle_sec
+        self._max_age_sec = max_age_sec
+        self._idle: dict[PoolKey, list[_PooledConnection]] = {}
+        self._open: dict[PoolKey, int] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._reaper_stop = threading.Event()
+        if reap_interval_sec:
+            threading.Thread(
+                target=self._reap_forever,
+                args=(reap_interval_sec,),
+                name="ssh_linux-pool-reaper",
+                daemon=True,
+            ).start()
+
+    def session(
+        self,
+        target: Target,
+        timeout_sec: int,
+        profile: str = "default",
+        deadline: Deadline | None = None,
+    ) -> PooledSSHClient:
+        return PooledSSHClient(self, target, timeout_sec, profile=profile, deadline=deadline)
+
+    def has_connection(self, target: Target, profile: str = "default") -> bool:
+        """Whether a connection to ``target`` is open, idle or checked out."""
+        with self._cond:
+            return self._open.get(pool_key(target, profile), 0) > 0
+
+    def evict_idle(self) -> int:
+        """Close idle connections past their idle or age limit; return how many."""
+        with self._cond:
+            expired = self._take_expired(time.monotonic())
+        for connection in expired:
+            connection.client.close()
+        return len(expired)
+
+    def close(self) -> None:
+        self._reaper_stop.set()
+        with self._cond:
+            self._closed = True
+            idle = [connection for connections in self._idle.values() for connection in connections]
+            for connection in idle:
+                self._forget(connection.key)
+            self._idle.clear()
+            self._cond.notify_all()
+        for connection in idle:
+            connection.client.close()
+
+    def _acquire(
+        self,
+        target: Target,
+        timeout_sec: float,
+        profile: str = "default",
+        task_deadline: Deadline | None = None,
+    ) -> _PooledConnection:
+        key = pool_key(target, profile)
+        deadline = time.monotonic() + timeout_sec
+        while True:
+            stale: list[_PooledConnection] = []
+            with self._cond:
+                if self._closed:
+                    raise SSHConnectorError("SSH connection pool is closed")
+                stale.extend(self._take_expired(time.monotonic()))
+                idle = self._idle.get(key)
+                candidate = idle.pop() if idle else None
+                if candidate is None:
+                    if self._open.get(key, 0) < self._max_per_host:
+                        self._open[key] = self._open.get(key, 0) + 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise SSHConnectorError(
+                            f"SSH connection pool exhausted: host={target.address} port={target.port} "
+                            f"max_per_host={self._max_per_host} timeout_sec={timeout_sec}"
+                        )
+                    self._cond.wait(remaining)
+            for connection in stale:
+                connection.client.close()
+
+            if candidate is None:
+                continue
+            if _is_healthy(candidate.client):
+                candidate.last_used = time.monotonic()
+                return candidate
+            self._discard(candidate)
+
+        # A slot is reserved for this key; handshake outside the lock. The task
+        # deadline only bounds this handshake: the pooled client itself never
+        # runs commands, each task's PooledSSHClient does.
+        client = SSHClient(target, timeout_sec=timeout_sec, profile=profile, deadline=task_deadline)
+        try:
+            client.connect()
+        except BaseException:
+            with self._cond:
+                self._forget(key)
+            raise
+        return _PooledConnection(key=key, client=client)
+
+    def _release(self, connection: _PooledConnection, reusable: bool) -> None:
+        now = time.monotonic()
+        keep = reusable and now - connection.created_at < self._max_age_sec and _is_healthy(connection.client)
+        with self._cond:
+            if keep and not self._closed:
+                connection.last_used = now
+                self._idle.setdefault(connection.key, []).append(connection)
+                self._cond.notify_all()
+                return
+        self._discard(connection)
+
+    def _discard(self, connection: _PooledConnection) -> None:
+        connection.client.close()
+        with self._cond:
+            self._forget(connection.key)
+
+    def _forget(self, key: PoolKey) -> None:
+        remaining = self._open.get(key, 0) - 1
+        if remaining > 0:
+            self._open[key] = remaining
+        else:
+            self._open.pop(key, None)
+        self._cond.notify_all()
+
+    def _take_expired(self, now: float) -> list[_PooledConnection]:
+        expired: list[_PooledConnection] = []
+        for key in list(self._idle):
+            kept = []
+            for connection in self._idle[key]:
+                if now - connection.last_used >= self._max_idle_sec or now - connection.created_at >= self._max_age_sec:
+                    expired.append(connection)
+                    self._forget(key)
+                else:
+                    kept.append(connection)
+            if kept:
+                self._idle[key] = kept
+            else:
+                del self._idle[key]
+        return expired
+
+    def _reap_forever(self, interval_sec: float) -> None:
+        while not self._reaper_stop.wait(interval_sec):
+            self.evict_idle()
+
+
+def pool_key(target: Target | JumpHost, profile: str = "default") -> PoolKey:
+    if target.auth.method == "key":
+        secret = target.auth.key_path or ""
+        if target.auth.passphrase:
+            secret += ":" + hashlib.sha256(target.auth.passphrase.encode("utf-8")).hexdigest()
+    else:
+        # Keep only a digest so the pool never holds a second copy of the password.
+        secret = hashlib.sha256((target.auth.password or "").encode("utf-8")).hexdigest()
+    # The same address behind two different bastions is two different hosts.
+    jump = getattr(target, "jump", None)
+    route = "|".join(pool_key(jump)[:5]) if jump is not None else ""
+    return (target.address, target.port, target.user, target.auth.method, secret, profile, route)
+
+
+def _is_healthy(client: SSHClient) -> bool:
+    raw = client._client
+    if raw is None:
+        return False
+    transport = raw.get_transport()
+    if transport is None or not transport.is_active():
+        return False
+    try:
+        transport.send_ignore()
+    except Exception:  # noqa: BLE001
+        return False
+    return True
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
+
+from .errors import ValidationConnectorError
+
+if TYPE_CHECKING:
+    import paramiko
+
+    from .models import Target
+
+# Target meta key that overrides the run's --ssh-profile for one host.
+PROFILE_META_KEY = "ssh_profile"
+
+_FAST_KEX = (
+    "curve25519-sha256@libssh.org",
+    "ecdh-sha2-nistp256",
+    "ecdh-sha2-nistp384",
+    "ecdh-sha2-nistp521",
+    "diffie-hellman-group16-sha512",
+    "diffie-hellman-group14-sha256",
+)
+_FAST_CIPHERS = ("aes128-gcm@openssh.com", "aes256-gcm@openssh.com", "aes128-ctr", "aes256-ctr")
+_FAST_MACS = ("hmac-sha2-256-etm@openssh.com", "hmac-sha2-256", "hmac-sha2-512-etm@openssh.com", "hmac-sha2-512")
+_FAST_HOST_KEYS = ("ssh-ed25519", "ecdsa-sha2-nistp256", "rsa-sha2-256", "rsa-sha2-512")
+
+
+@dataclass(frozen=True)
+class SSHProfile:
+    """Algorithm preferences for one SSH connection.
+
+    Empty tuples keep paramiko's defaults. Non-empty ones replace paramiko's
+    preference list, in order, limited to what the installed paramiko
+    supports; the server still has the final say among them.
+    """
+
+    name: str
+    kex: tuple[str, ...] = ()
+    ciphers: tuple[str, ...] = ()
+    macs: tuple[str, ...] = ()
+    host_key_types: tuple[str, ...] = ()
+    compress: bool = False
+
+    def apply(self, transport: paramiko.Transport) -> None:
+        options = transport.get_security_options()
+        for attribute, preferred in (
+            ("kex", self.kex),
+            ("ciphers", self.ciphers),
+            ("digests", self.macs),
+            ("key_types", self.host_key_types),
+        ):
+            supported = set(getattr(options, attribute))
+            usable = tuple(name for name in preferred if name in supported)
+            if usable:
+                setattr(options, attribute, usable)
+        transport.use_compression(self.compress)
+
+
+SSH_PROFILES: dict[str, SSHProfile] = {
+    profile.name: profile
+    for profile in (
+        SSHProfile("default"),
+        # Cheapest safe choices first: X25519/ECDH instead of finite-field DH,
+        # AES-GCM (one pass, AES-NI) instead of CTR+HMAC, no SHA-1/MD5/CBC/DSA.
+        SSHProfile("fast", _FAST_KEX, _FAST_CIPHERS, _FAST_MACS, _FAST_HOST_KEYS),
+        # As fast, plus zlib for hosts with large outputs on slow links.
+        SSHProfile("compressed", _FAST_KEX, _FAST_CIPHERS, _FAST_MACS, _FAST_HOST_KEYS, compress=True),
+    )
+}
+
+
+def resolve_profile(target: Target, default: str = "default") -> SSHProfile:
+    """The target's ``meta.ssh_profile`` if set, otherwise ``default``."""
+    name = target.meta.get(PROFILE_META_KEY) or default
+    profile = SSH_PROFILES.get(name) if isinstance(name, str) else None
+    if profile is None:
+        raise ValidationConnectorError(
+            f"unknown SSH profile {name!r}; expected one of {', '.join(sorted(SSH_PROFILES))}"
+        )
+    return profile
+
+
+def transport_factory(profile: SSHProfile) -> Any:
+    """``transport_factory`` for ``paramiko.SSHClient.connect`` applying ``profile``."""
+    timed_transport = _timed_transport_class()
+
+    def factory(sock: Any, **kwargs: Any) -> paramiko.Transport:
+        transport = timed_transport(sock, **kwargs)
+        profile.apply(transport)
+        return transport
+
+    return factory
+
+
+def negotiated(transport: paramiko.Transport) -> dict[str, object]:
+    """Algorithms the finished key exchange settled on."""
+    return {
+        "kex": getattr(transport, "negotiated_kex", None),
+        "host_key_type": transport.host_key_type,
+        "cipher": transport.local_cipher,
+        "mac": transport.local_mac,
+        "compression": transport.local_compression,
+    }
+
+
+def handshake_sec(transport: paramiko.Transport) -> float | None:
+    """Seconds from the protocol banner to the end of key exchange, if measured."""
+    return getattr(transport, "handshake_sec", None)
+
+
+@lru_cache(maxsize=None)
+def _timed_transport_class() -> type:
+    import paramiko
+
+    class TimedTransport(paramiko.Transport):
+        handshake_sec: float | None = None
+        negotiated_kex: str | None = None
+
+        def _parse_kex_init(self, m: Any) -> None:
+            super()._parse_kex_init(m)
+            # paramiko drops kex_engine once the exchange completes; keep its name.
+            engine = type(self.kex_engine)
+            self.negotiated_kex = next(
+                (name for name in self.preferred_kex if self._kex_info.get(name) is engine), engine.__name__
+            )
+
+        def start_client(self, event: Any = None, timeout: float | None = None) -> None:
+            started = time.perf_counter()
+            super().start_client(event, timeout)
+            self.handshake_sec = time.perf_counter() - started
+
+    return TimedTransport
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Sequence
+
+if TYPE_CHECKING:
+    from .models import Target
+
+DELTA_MODES = ("off", "skip", "marker")
+
+# Attributes that change on every run without the host having changed.
+VOLATILE_ATTRIBUTES = frozenset({"uptime_sec"})
+
+
+@dataclass(frozen=True)
+class BootFingerprint:
+    """What a host's static facts depend on: which host, which boot, which OS release."""
+
+    machine_id: str
+    boot_id: str
+    os_release_mtime: int
+
+
+@dataclass(frozen=True)
+class CachedFacts:
+    fingerprint: BootFingerprint
+    sections: dict[str, str]
+
+
+@dataclass(frozen=True)
+class StateEntry:
+    content_hash: str
+    batch_id: str
+    ingested_at: str
+
+
+@dataclass(frozen=True)
+class DeltaDecision:
+    entity: dict
+    content_hash: str
+    previous: StateEntry | None
+    unchanged: bool
+    skip: bool
+
+
+def plan_delta(store: FactStateStore, mode: str, entity: dict, related: Sequence[dict] = ()) -> DeltaDecision:
+    """Decide how to upload ``entity`` given the last ingested state.
+
+    In ``skip`` mode an unchanged entity is not uploaded at all; in ``marker``
+    mode it is replaced by ``unchanged_marker``. Changed or unknown entities
+    are always sent in full. ``related`` entities (the host's services) count
+    towards the content hash and are only sent along with a changed entity.
+    """
+    content_hash = entity_content_hash(entity, related)
+    previous = store.lookup(entity)
+    unchanged = previous is not None and previous.content_hash == content_hash
+    return DeltaDecision(
+        entity=unchanged_marker(entity) if unchanged and mode == "marker" else entity,
+        content_hash=content_hash,
+        previous=previous,
+        unchanged=unchanged,
+        skip=unchanged and mode == "skip",
+    )
+
+
+def state_key(entity: dict) -> str:
+    machine_id = entity.get("keys", {}).get("machine_id")
+    if machine_id:
+        return f"machine_id:{machine_id}"
+    return f"external_id:{entity['external_id']}"
+
+
+def entity_content_hash(entity: dict, related: Sequence[dict] = ()) -> str:
+    """SHA-256 over the entity with volatile attributes removed and keys sorted.
+
+    A package inventory counts by its digest, which already covers every
+    package, so thousands of rows are not re-encoded just to be hashed.
+    ``related`` entities are hashed along with it, in the order given.
+    """
+    stable = dict(entity)
+    stable["attributes"] = {
+        key: value for key, value in entity.get("attributes", {}).items() if key not in VOLATILE_ATTRIBUTES
+    }
+    packages = stable["attributes"].get("packages")
+    if isinstance(packages, dict) and "digest" in packages:
+        stable["attributes"]["packages"] = {key: value for key, value in packages.items() if key != "items"}
+    if related:
+        # Only added when present, so hosts without services keep their stored hashes.
+        stable["related"] = list(related)
+    encoded = json.dumps(stable, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def unchanged_marker(entity: dict) -> dict:
+    """Compact stand-in for an unchanged entity: identity plus volatile attributes only."""
+    return {
+        "entity_type": entity["entity_type"],
+        "external_id": entity["external_id"],
+        "keys": entity["keys"],
+        "attributes": {
+            key: value for key, value in entity.get("attributes", {}).items() if key in VOLATILE_ATTRIBUTES
+        },
+    }
+
+
+class FactStateStore:
+    """Last successfully ingested content hash per host, one small JSON file per host.
+
+    Hosts are keyed by ``machine_id`` when known, otherwise ``external_id``.
+    Writes go through a temp file and ``os.replace`` so concurrent workers and
+    processes sharing ``state_dir`` never observe a torn entry.
+    """
+
+    def __init__(self, state_dir: str | Path) -> None:
+        self._dir = Path(state_dir) / "ingested"
+        self._dir.mkdir(parents=True, exist_ok=True)
+
+    def lookup(self, entity: dict) -> StateEntry | None:
+        try:
+            data = json.loads(self._path(entity).read_text(encoding="utf-8"))
+            return StateEntry(
+                content_hash=str(data["content_hash"]),
+                batch_id=str(data["batch_id"]),
+                ingested_at=str(data["ingested_at"]),
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def record(self, entity: dict, content_hash: str, batch_id: str) -> None:
+        payload = {
+            "key": state_key(entity),
+            "content_hash": content_hash,
+            "batch_id": batch_id,
+            "ingested_at": datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z"),
+        }
+        _write_json(self._path(entity), payload)
+
+    def _path(self, entity: dict) -> Path:
+        digest = hashlib.sha256(state_key(entity).encode("utf-8")).hexdigest()
+        return self._dir / f"{digest}.json"
+
+
+class FactCache:
+    """Raw output of a host's static sections, reused while its ``BootFingerprint`` holds.
+
+    Entries are keyed by ``fact_cache_key`` and stored next to the delta
+    state, one small JSON file per host written like ``FactStateStore``
+    entries. The key is known before connecting, so a collection can send
+    the fingerprint it expects along with its first commands. The caller
+    serves an entry only for the same machine, boot and os-release mtime.
+    ``lookup`` never returns one that is ``ttl_sec`` old, which also bounds
+    what a missed change (a CPU hot-plug, say) can cost. ``prune`` deletes
+    expired entries.
+    """
+
+    def __init__(self, state_dir: str | Path, ttl_sec: float = 86400.0) -> None:
+        self._dir = Path(state_dir) / "facts"
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._ttl_sec = ttl_sec
+
+    def lookup(self, key: str) -> CachedFacts | None:
+        """The entry last stored under ``key``, unless it is missing, unreadable or expired."""
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if self._expired(data):
+                path.unlink(missing_ok=True)
+                return None
+            fingerprint = BootFingerprint(str(data["machine_id"]), str(data["boot_id"]), int(data["os_release_mtime"]))
+            return CachedFacts(fingerprint, {str(name): str(text) for name, text in data["sections"].items()})
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def store(self, key: str, fingerprint: BootFingerprint, sections: dict[str, str]) -> None:
+        payload = {
+            "key": key,
+            "machine_id": fingerprint.machine_id,
+            "boot_id": fingerprint.boot_id,
+            "os_release_mtime": fingerprint.os_release_mtime,
+            "stored_at": time.time(),
+            "sections": sections,
+        }
+        _write_json(self._path(key), payload)
+
+    def prune(self) -> int:
+        """Delete expired and unreadable entries; returns how many were removed."""
+        removed = 0
+        for path in self._dir.glob("*.json"):
+            try:
+                expired = self._expired(json.loads(path.read_text(encoding="utf-8")))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                expired = True
+            except OSError:
+                continue
+            if expired:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def _expired(self, data: dict) -> bool:
+        return time.time() - float(data["stored_at"]) >= self._ttl_sec
+
+    def _path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self._dir / f"{digest}.json"
+
+
+def fact_cache_key(target: Target) -> str:
+    """``FactCache`` key of ``target``: where it is reached, not who logs in."""
+    key = f"{target.address}:{target.port}"
+    if target.jump is not None:
+        # The same address behind two different bastions is two different hosts.
+        key += f" via {target.jump.address}:{target.jump.port}"
+    return key
+
+
+def _write_json(path: Path, payload: dict) -> None:
+    # Temp file plus os.replace, so concurrent readers never see a torn entry.
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
@@ -0,0 +1,149 @@
+import socket
+import subprocess
+import threading
+from types import SimpleNamespace
+from typing import Iterator
+
+import paramiko
+import pytest
+
+from ssh_linux import bastion
+from ssh_linux.bastion import BastionPool
+from ssh_linux.errors import SSHConnectorError
+from ssh_linux.models import JumpHost, Target
+from ssh_linux.ssh_client import SSHClient
+
+_HOST_KEY = paramiko.RSAKey.generate(1024)
+
+
+class _InnerServer(paramiko.ServerInterface):
+    """Target behind the bastion: password auth and one exec per session."""
+
+    def check_auth_password(self, username: str, password: str) -> int:
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username: str) -> str:
+        return "password"
+
+    def check_channel_request(self, kind: str, chanid: int) -> int:
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel: paramiko.Channel, command: bytes) -> bool:
+        threading.Thread(target=self._execute, args=(channel, command.decode()), daemon=True).start()
+        return True
+
+    def _execute(self, channel: paramiko.Channel, command: str) -> None:
+        proc = subprocess.run(command, shell=True, capture_output=True, check=False)
+        channel.sendall(proc.stdout)
+        channel.send_exit_status(proc.returncode)
+        channel.close()
+
+
+class _BastionServer(paramiko.ServerInterface):
+    """Bastion that accepts every ``direct-tcpip`` request and records its destination."""
+
+    def __init__(self) -> None:
+        self.destinations: list[tuple[str, int]] = []
+
+    def check_auth_none(self, username: str) -> int:
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username: str) -> str:
+        return "none"
+
+    def check_channel_direct_tcpip_request(self, chanid: int, origin: tuple, destination: tuple) -> int:
+        self.destinations.append(tuple(destination))
+        return paramiko.OPEN_SUCCEEDED
+
+
+@pytest.fixture
+def bastions(monkeypatch: pytest.MonkeyPatch) -> Iterator[tuple[BastionPool, _BastionServer, list[JumpHost]]]:
+    client_sock, server_sock = socket.socketpair()
+    server = _BastionServer()
+    server_transport = paramiko.Transport(server_sock)
+    server_transport.add_server_key(_HOST_KEY)
+    server_transport.start_server(threading.Event(), server=server)
+    client_transport = paramiko.Transport(client_sock)
+    client_transport.connect()
+    client_transport.auth_none("jump")
+
+    def serve_tunnels() -> None:
+        # Each tunnel ends in its own SSH server, as if it reached a separate host.
+        while True:
+            channel = server_transport.accept(timeout=None)
+            if channel is None:
+                return
+            inner = paramiko.Transport(channel)
+            inner.add_server_key(_HOST_KEY)
+            inner.start_server(threading.Event(), server=_InnerServer())
+
+    threading.Thread(target=serve_tunnels, daemon=True).start()
+
+    connects: list[JumpHost] = []
+
+    def fake_connect(jump: JumpHost, timeout_sec: float) -> SimpleNamespace:
+        connects.append(jump)
+        return SimpleNamespace(_client=SimpleNamespace(get_transport=lambda: client_transport), close=lambda: None)
+
+    monkeypatch.setattr(bastion, "_connect", fake_connect)
+    pool = BastionPool()
+    monkeypatch.setattr(bastion, "BASTIONS", pool)
+    try:
+        yield pool, server, connects
+    finally:
+        client_transport.close()
+        server_transport.close()
+
+
+def _jump(max_channels: int = 32) -> dict[str, object]:
+    return {
+        "address": "bastion.example",
+        "user": "jump",
+        "auth": {"method": "password", "password": "x"},
+        "max_channels": max_channels,
+    }
+
+
+def _target(address: str, jump: dict[str, object]) -> Target:
+    return Target.model_validate(
+        {
+            "type": "host",
+            "address": address,
+            "user": "ubuntu",
+            "auth": {"method": "password", "password": "x"},
+            "jump": jump,
+        }
+    )
+
+
+def test_targets_behind_one_bastion_share_its_connection(
+    bastions: tuple[BastionPool, _BastionServer, list[JumpHost]],
+) -> None:
+    _, server, connects = bastions
+    outputs = []
+    for address in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+        client = SSHClient(_target(address, _jump()), timeout_sec=5)
+        client.connect()
+        try:
+            outputs.append(client.run("echo ok").stdout.strip())
+        finally:
+            client.close()
+
+    assert outputs == ["ok", "ok", "ok"]
+    assert len(connects) == 1
+    assert server.destinations == [("10.0.0.1", 22), ("10.0.0.2", 22), ("10.0.0.3", 22)]
+
+
+def test_bastion_channel_limit_bounds_open_tunnels(
+    bastions: tuple[BastionPool, _BastionServer, list[JumpHost]],
+) -> None:
+    pool, _, _ = bastions
+    jump = JumpHost.model_validate(_jump(max_channels=1))
+    first = pool.open_tunnel(jump, "10.0.0.1", 22, timeout_sec=5)
+
+    with pytest.raises(SSHConnectorError, match="channel limit reached"):
+        pool.open_tunnel(jump, "10.0.0.2", 22, timeout_sec=0.1)
+
+    first.close()
+    first.close()
+    pool.open_tunnel(jump, "10.0.0.2", 22, timeout_sec=5).close()
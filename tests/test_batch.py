@@ -0,0 +1,117 @@
+import json
+
+from ssh_linux.batch import BatchAggregator, build_batch
+from ssh_linux.collectors import HostFacts
+from ssh_linux.models import BatchV1, Target
+
+_RUN_ID = "11111111-1111-1111-1111-111111111111"
+_TASK_ID = "22222222-2222-2222-2222-222222222222"
+
+
+def _target(address: str) -> Target:
+    return Target.model_validate(
+        {
+            "type": "host",
+            "address": address,
+            "user": "ubuntu",
+            "auth": {"method": "password", "password": "secret"},
+        }
+    )
+
+
+def _facts(hostname: str) -> HostFacts:
+    return HostFacts(
+        hostname=hostname,
+        cpu_cores=2,
+        filesystems=[{"filesystem": "/dev/sda1", "size_kb": 10, "used_kb": 4, "avail_kb": 6, "mountpoint": "/"}],
+    )
+
+
+def _aggregator(hosts: list[str], **limits: int) -> BatchAggregator:
+    aggregator = BatchAggregator(_RUN_ID, _TASK_ID, **limits)
+    for host in hosts:
+        aggregator.add(f"member-{host}", _target(f"10.0.0.{host[-1]}"), _facts(host))
+    return aggregator
+
+
+def test_build_batch_single_entity_is_schema_valid() -> None:
+    payload = build_batch(_RUN_ID, _TASK_ID, _target("10.0.0.1"), _facts("web-1"))
+
+    BatchV1.model_validate(payload)
+    assert [entity["external_id"] for entity in payload["entities"]] == ["web-1"]
+    assert payload["meta"]["target_address"] == "10.0.0.1"
+
+
+def test_build_batch_matches_validated_payload() -> None:
+    full = HostFacts(
+        hostname="web-1",
+        fqdn="web-1.example.internal",
+        ipv4=["10.0.0.1"],
+        os_id="ubuntu",
+        cpu_cores=2,
+        mem_total_kb=1024,
+        uptime_sec=42,
+        filesystems=_facts("web-1").filesystems,
+        packages={"manager": "dpkg", "count": 1, "digest": "ab" * 32, "items": [("bash", "5.2-2", "amd64")]},
+        services=[("tcp6", "::", 22, "sshd"), ("tcp", "127.0.0.1", 5432, None)],
+    )
+    partial = HostFacts(hostname="web-1", uptime_sec=42, collectors=("identity", "uptime"))
+    for facts in (full, HostFacts(), partial):
+        fast = build_batch(_RUN_ID, _TASK_ID, _target("10.0.0.1"), facts)
+        validated = build_batch(_RUN_ID, _TASK_ID, _target("10.0.0.1"), facts, validate=True)
+        validated["collected_at"] = fast["collected_at"]
+
+        assert json.dumps(fast) == json.dumps(validated)
+    assert "filesystems" not in fast["entities"][0]["attributes"]
+    assert fast["meta"]["collectors"] == ["identity", "uptime"]
+
+
+def test_aggregator_splits_by_entity_count_with_stable_keys() -> None:
+    chunks = _aggregator(["web-3", "web-1", "web-2"], max_entities=2).chunks()
+    reordered = _aggregator(["web-2", "web-3", "web-1"], max_entities=2).chunks()
+
+    assert [chunk.members for chunk in chunks] == [["member-web-1", "member-web-2"], ["member-web-3"]]
+    assert [chunk.idempotency_key for chunk in chunks] == [chunk.idempotency_key for chunk in reordered]
+    assert len({chunk.idempotency_key for chunk in chunks}) == 2
+    for chunk in chunks:
+        BatchV1.model_validate(chunk.payload)
+
+
+def test_aggregator_splits_by_serialized_size() -> None:
+    single = _aggregator(["web-1"]).chunks()[0]
+    limit = len(json.dumps(single.payload, separators=(",", ":"))) + 50
+
+    chunks = _aggregator(["web-1", "web-2", "web-3"], max_bytes=limit).chunks()
+
+    assert [len(chunk.members) for chunk in chunks] == [1, 1, 1]
+    for chunk in chunks:
+        assert len(json.dumps(chunk.payload, separators=(",", ":"))) <= limit
+
+
+def test_services_become_entities_with_relations_that_stay_with_their_host() -> None:
+    facts = _facts("web-1")
+    facts.services = [("tcp6", "::", 22, "sshd"), ("tcp", "127.0.0.1", 5432, None)]
+
+    payload = build_batch(_RUN_ID, _TASK_ID, _target("10.0.0.1"), facts)
+
+    assert [entity["external_id"] for entity in payload["entities"]] == [
+        "web-1",
+        "web-1/tcp6/[::]:22/sshd",
+        "web-1/tcp/127.0.0.1:5432",
+    ]
+    assert payload["entities"][1]["keys"] == {"host": "web-1", "proto": "tcp6", "address": "::", "port": 22}
+    assert payload["relations"][1] == {
+        "relation_type": "hosts",
+        "from_external_id": "web-1",
+        "to_external_id": "web-1/tcp/127.0.0.1:5432",
+    }
+
+    aggregator = BatchAggregator(_RUN_ID, _TASK_ID, max_entities=3)
+    aggregator.add("member-web-1", _target("10.0.0.1"), facts)
+    aggregator.add("member-web-2", _target("10.0.0.2"), _facts("web-2"))
+    chunks = aggregator.chunks()
+
+    assert [chunk.members for chunk in chunks] == [["member-web-1"], ["member-web-2"]]
+    assert len(chunks[0].payload["entities"]) == 3
+    assert len(chunks[0].payload["relations"]) == 2
+    assert chunks[1].payload["relations"] == []
@@ -0,0 +1,345 @@
+import json
+import re
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+
+from ssh_linux import collectors
+from ssh_linux.collectors import HostFacts, collect_host_facts, resolve_collectors
+from ssh_linux.deadline import Deadline
+from ssh_linux.errors import CollectionConnectorError, SSHConnectorError, ValidationConnectorError
+from ssh_linux.sftp import FileRead
+from ssh_linux.ssh_client import CommandResult
+from ssh_linux.state import FactCache
+
+_CANNED_COMMANDS = {
+    "hostname": "echo web-01",
+    "fqdn": "echo web-01.example.internal",
+    "machine_id": "echo 0123456789abcdef",
+    "ip_addr": "echo 'ip: command not found' >&2; exit 127",
+    "hostname_i": "echo '10.0.0.5 fe80::1 10.0.0.6'",
+    "os_release": "printf 'ID=ubuntu\\nVERSION_ID=\"22.04\"\\n'",
+    "kernel_release": "echo 6.8.0-generic",
+    "nproc": "echo 4",
+    "meminfo": "printf 'MemTotal:       16384256 kB\\nMemFree: 1 kB\\n'",
+    "uptime": "echo '12345.67 100.00'",
+    "df": "printf 'Filesystem 1024-blocks Used Available Capacity Mounted on\\n/dev/sda1 100 40 60 40%% /\\n'",
+    "packages": "printf 'dpkg\\nii \\tbash\\t5.1-6\\tamd64\\nrc \\tremoved\\t1.0\\tall\\n'",
+    "sockets": "printf 'ss\\nLISTEN 0 128 [::]:22 [::]:* users:((\"sshd\",pid=1,fd=3))\\n'",
+}
+
+
+def _result(exit_code: int, stdout: str, stderr: str) -> CommandResult:
+    stdout = stdout.strip()
+    return CommandResult(exit_code, stdout, stderr.strip(), stdout_bytes=len(stdout.encode()))
+
+
+class _LocalShell:
+    """Runs commands with the local /bin/sh in place of a remote host."""
+
+    def __init__(self) -> None:
+        self.commands: list[str] = []
+        # One entry per run or run_many call: the round trips a real host would see.
+        self.calls: list[list[str]] = []
+        self.output = ""
+
+    def run(self, command: str, timeout_sec: int | None = None) -> CommandResult:
+        self.commands.append(command)
+        self.calls.append([command])
+        proc = subprocess.run(command, shell=True, capture_output=True, text=True, check=False)
+        self.output += proc.stdout
+        return _result(proc.returncode, proc.stdout, proc.stderr)
+
+    def run_many(self, commands: list[str], max_channels: int = 8, timeout_sec: int | None = None) -> list[CommandResult]:
+        self.commands.extend(commands)
+        self.calls.append(list(commands))
+        procs = [
+            subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            for command in commands
+        ]
+        results = []
+        for proc in procs:
+            stdout, stderr = proc.communicate()
+            results.append(_result(proc.returncode, stdout, stderr))
+        return results
+
+    def stream_lines(self, command: str, timeout_sec: int | None = None) -> "_LocalStream":
+        self.commands.append(command)
+        return _LocalStream(command)
+
+
+class _LocalStream:
+    """Single-pass like ``CommandStream``: every ``iter()`` returns the same iterator."""
+
+    def __init__(self, command: str) -> None:
+        self.result: CommandResult | None = None
+        self._proc = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        self._lines = self._read_lines()
+
+    def __iter__(self):
+        return self._lines
+
+    def _read_lines(self):
+        for line in self._proc.stdout:
+            yield line.rstrip("\n")
+        stderr = self._proc.stderr.read()
+        self.result = CommandResult(exit_code=self._proc.wait(), stdout="", stderr=stderr.strip())
+
+    def __enter__(self) -> "_LocalStream":
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self._proc.stdout.close()
+        self._proc.stderr.close()
+        self._proc.wait()
+
+
+def test_batched_mode_matches_exec_mode_in_one_round_trip(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(collectors, "_COMMANDS", _CANNED_COMMANDS)
+    warnings: list[str] = []
+
+    exec_shell = _LocalShell()
+    exec_facts = collect_host_facts(exec_shell, strict=False, log=lambda _level, message: warnings.append(message))
+    batched_shell = _LocalShell()
+    batched_facts = collect_host_facts(
+        batched_shell,
+        strict=False,
+        log=lambda _level, message: warnings.append(message),
+        mode="batched",
+    )
+
+    assert batched_facts == exec_facts
+    assert batched_facts.ipv4 == ["10.0.0.5", "10.0.0.6"]
+    assert batched_facts.filesystems[0]["mountpoint"] == "/"
+    assert batched_facts.packages["items"] == [("bash", "5.1-6", "amd64")]
+    assert batched_facts.services == [("tcp6", "::", 22, "sshd")]
+    assert len(exec_shell.commands) == 13
+    assert len(batched_shell.commands) == 1
+    expected = f"{_CANNED_COMMANDS['ip_addr']} returned exit=127 stderr=ip: command not found"
+    assert warnings == [expected, expected]
+
+
+def test_batched_mode_strict_raises_on_failed_section(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(collectors, "_COMMANDS", _CANNED_COMMANDS)
+
+    with pytest.raises(CollectionConnectorError, match="returned exit=127 stderr=ip: command not found"):
+        collect_host_facts(_LocalShell(), strict=True, log=lambda _level, _message: None, mode="batched")
+
+
+def test_batched_mode_falls_back_when_only_loopback_has_ipv4(monkeypatch: pytest.MonkeyPatch) -> None:
+    ip_addr = [
+        {"ifname": "lo", "addr_info": [{"family": "inet", "local": "127.0.0.1"}]},
+        {"ifname": "eth0", "addr_info": [{"family": "inet6", "local": "fe80::1"}]},
+    ]
+    commands = {
+        **_CANNED_COMMANDS,
+        "ip_addr": f"echo '{json.dumps(ip_addr, separators=(',', ':'))}'",
+        "hostname_i": "echo '10.0.0.9 fe80::1'",
+    }
+    monkeypatch.setattr(collectors, "_COMMANDS", commands)
+
+    exec_facts = collect_host_facts(_LocalShell(), strict=True, log=lambda _level, _message: None)
+    batched_facts = collect_host_facts(_LocalShell(), strict=True, log=lambda _level, _message: None, mode="batched")
+
+    assert exec_facts.ipv4 == ["10.0.0.9"]
+    assert batched_facts.ipv4 == ["10.0.0.9"]
+
+
+class _TruncatedShell:
+    """Answers the composite script with only the `hostname` section."""
+
+    def run(self, command: str, timeout_sec: int | None = None) -> CommandResult:
+        marker = re.search(r"@@ssh_linux:[0-9a-f]+", command).group(0)
+        stdout = f"{marker} BEGIN hostname\nweb-01\n{marker} STDERR hostname\n{marker} END hostname 0"
+        return CommandResult(exit_code=0, stdout=stdout, stderr="")
+
+
+def test_batched_mode_reports_missing_sections() -> None:
+    warnings: list[str] = []
+
+    facts = collect_host_facts(
+        _TruncatedShell(),
+        strict=False,
+        log=lambda _level, message: warnings.append(message),
+        mode="batched",
+    )
+
+    assert facts.hostname == "web-01"
+    assert "uname -r produced no section in batched output" in warnings
+    with pytest.raises(CollectionConnectorError, match="hostname -f produced no section in batched output"):
+        collect_host_facts(_TruncatedShell(), strict=True, log=lambda _level, _message: None, mode="batched")
+
+
+def test_demux_ignores_marker_lookalikes_and_unterminated_sections() -> None:
+    marker = "@@ssh_linux:abc"
+    raw = "\n".join(
+        [
+            f"{marker} BEGIN hostname",
+            "@@ssh_linux:other END hostname 0",
+            "web-01",
+            f"{marker} STDERR hostname",
+            f"{marker} END hostname 0",
+            f"{marker} BEGIN nproc",
+            "4",
+        ]
+    )
+
+    sections = collectors._demux_sections(raw, marker)
+
+    assert sections == {
+        "hostname": CommandResult(exit_code=0, stdout="@@ssh_linux:other END hostname 0\nweb-01", stderr=""),
+    }
+
+
+@pytest.mark.parametrize("mode", ["exec", "batched"])
+def test_lenient_run_skips_low_priority_sections_near_the_deadline(
+    monkeypatch: pytest.MonkeyPatch, mode: str
+) -> None:
+    monkeypatch.setattr(collectors, "_COMMANDS", {**_CANNED_COMMANDS, "ip_addr": "echo '[]'"})
+    deadline = Deadline(100)
+    deadline.expires_at = time.monotonic() + 5
+    warnings: list[str] = []
+    shell = _LocalShell()
+
+    facts = collect_host_facts(
+        shell, strict=False, log=lambda _level, message: warnings.append(message), mode=mode, deadline=deadline
+    )
+
+    assert facts.hostname == "web-01" and facts.os_id == "ubuntu"
+    assert facts.cpu_cores is None and facts.mem_total_kb is None and facts.filesystems == []
+    assert any("task deadline nearly exhausted" in warning for warning in warnings)
+    assert not any("MemTotal" in command or "Filesystem" in command for command in shell.commands)
+
+    strict_facts = collect_host_facts(_LocalShell(), strict=True, log=lambda _level, _message: None, deadline=deadline)
+    assert strict_facts.filesystems
+
+
+@pytest.mark.parametrize("mode", ["exec", "batched"])
+def test_profile_runs_only_its_units_and_records_their_cost(monkeypatch: pytest.MonkeyPatch, mode: str) -> None:
+    monkeypatch.setattr(collectors, "_COMMANDS", _CANNED_COMMANDS)
+    spans: list[tuple[str, dict[str, object]]] = []
+    monkeypatch.setattr(collectors, "record_span", lambda phase, _sec, **fields: spans.append((phase, fields)))
+    shell = _LocalShell()
+
+    facts = collect_host_facts(
+        shell, strict=True, log=lambda *_args: None, mode=mode, collectors=resolve_collectors("liveness")
+    )
+
+    assert facts.collectors == ("identity", "uptime")
+    assert (facts.hostname, facts.uptime_sec) == ("web-01", 12345)
+    assert facts.os_id is None and facts.filesystems == []
+    assert not any("MemTotal" in command or "Filesystem" in command for command in shell.commands)
+    assert [(fields["name"], fields["commands"], fields["ok"]) for _phase, fields in spans] == [
+        ("identity", 3, True),
+        ("uptime", 1, True),
+    ]
+    assert spans[1][1]["bytes"] == len("12345.67 100.00")
+
+
+def test_services_are_capped_at_the_lowest_ports(monkeypatch: pytest.MonkeyPatch) -> None:
+    sockets = "printf 'ss\\nLISTEN 0 1 0.0.0.0:8080 0.0.0.0:*\\nLISTEN 0 1 0.0.0.0:22 0.0.0.0:*\\n'"
+    monkeypatch.setattr(collectors, "_COMMANDS", {**_CANNED_COMMANDS, "sockets": sockets})
+    monkeypatch.setattr(collectors, "MAX_SERVICES", 1)
+    warnings: list[str] = []
+
+    facts = collect_host_facts(
+        _LocalShell(), strict=True, log=lambda _level, message: warnings.append(message), collectors=["services"]
+    )
+
+    assert facts.services == [("tcp", "0.0.0.0", 22, None)]
+    assert warnings == ["2 listening sockets; kept the 1 with the lowest ports"]
+
+
+def test_resolve_collectors() -> None:
+    assert resolve_collectors("full") is None
+    assert resolve_collectors(names=["uptime", "identity"]) == ("identity", "uptime")
+    with pytest.raises(ValidationConnectorError, match="unknown collection profile"):
+        resolve_collectors("everything")
+    with pytest.raises(ValidationConnectorError, match="unknown collectors df"):
+        resolve_collectors(names=["df"])
+
+
+class _SFTPShell(_LocalShell):
+    """_LocalShell that also serves file-backed sections over "SFTP", or refuses to."""
+
+    def __init__(self, available: bool) -> None:
+        super().__init__()
+        self.available = available
+        self.reads: list[str] = []
+
+    def read_files(self, files: list[tuple[str, int]], timeout_sec: int | None = None) -> list[FileRead]:
+        if not self.available:
+            raise SSHConnectorError("SFTP read failed: cause=SSHException: Channel closed.")
+        sections = {path: name for name, (path, _max_bytes) in collectors._FILE_SECTIONS.items()}
+        self.reads.extend(path for path, _max_bytes in files)
+        return [
+            FileRead(path, subprocess.run(_CANNED_COMMANDS[sections[path]], shell=True, capture_output=True).stdout)
+            for path, _max_bytes in files
+        ]
+
+
+@pytest.mark.parametrize("available", [True, False])
+def test_sftp_file_reader_matches_exec_and_falls_back(monkeypatch: pytest.MonkeyPatch, available: bool) -> None:
+    monkeypatch.setattr(collectors, "_COMMANDS", _CANNED_COMMANDS)
+    exec_facts = collect_host_facts(_LocalShell(), strict=False, log=lambda *_args: None)
+    shell = _SFTPShell(available)
+
+    facts = collect_host_facts(shell, strict=False, log=lambda *_args: None, file_reader="sftp")
+
+    assert facts == exec_facts
+    file_commands = [_CANNED_COMMANDS[name] for name in collectors._FILE_SECTIONS]
+    if available:
+        assert shell.reads == ["/etc/machine-id", "/etc/os-release", "/proc/meminfo", "/proc/uptime"]
+        assert not set(file_commands) & set(shell.commands)
+    else:
+        assert set(file_commands) <= set(shell.commands)
+
+
+@pytest.mark.parametrize("mode", ["exec", "batched"])
+def test_fact_cache_skips_static_sections_until_the_host_reboots(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path, mode: str
+) -> None:
+    boot = {"id": "boot-1"}
+
+    def collect(cache: FactCache) -> tuple[HostFacts, _LocalShell]:
+        fingerprint = f"printf '0123456789abcdef\\n{boot['id']}\\n1700000000\\n'"
+        monkeypatch.setattr(collectors, "_COMMANDS", {**_CANNED_COMMANDS, "boot_fingerprint": fingerprint})
+        shell = _LocalShell()
+        facts = collect_host_facts(
+            shell, strict=False, log=lambda *_args: None, mode=mode, fact_cache=cache, fact_cache_key="10.0.0.5:22"
+        )
+        return facts, shell
+
+    monkeypatch.setattr(collectors, "_COMMANDS", _CANNED_COMMANDS)
+    uncached_shell = _LocalShell()
+    uncached = collect_host_facts(uncached_shell, strict=False, log=lambda *_args: None, mode=mode)
+    cache = FactCache(tmp_path)
+    first, first_shell = collect(cache)
+    second, second_shell = collect(cache)
+    boot["id"] = "boot-2"
+    rebooted, rebooted_shell = collect(cache)
+
+    assert first == second == rebooted == uncached
+    # The fingerprint rides along with the other commands, so only a miss against an
+    # existing entry costs exec mode one more round trip, for the static sections.
+    round_trips = len(uncached_shell.calls)
+    assert [len(shell.calls) for shell in (first_shell, second_shell, rebooted_shell)] == (
+        [round_trips] * 3 if mode == "batched" else [round_trips, round_trips, round_trips + 1]
+    )
+    static = [_CANNED_COMMANDS[name] for name in ("kernel_release", "nproc")]
+    if mode == "batched":
+        # Every section is in the one script; the cached ones only run when the fingerprint differs.
+        def ran(shell: _LocalShell) -> set[str]:
+            return set(re.findall(r"BEGIN (\w+)", shell.output))
+
+        assert {"kernel_release", "nproc", "uptime"} <= ran(first_shell)
+        assert not {"kernel_release", "nproc", "os_release", "machine_id"} & ran(second_shell)
+        assert {"kernel_release", "nproc"} <= ran(rebooted_shell)
+    else:
+        assert set(static) <= set(first_shell.commands) and set(static) <= set(rebooted_shell.commands)
+        assert not set(static) & set(second_shell.commands)
+        assert _CANNED_COMMANDS["uptime"] in second_shell.commands
+        assert _CANNED_COMMANDS["machine_id"] not in first_shell.commands + second_shell.commands
+    assert FactCache(tmp_path, ttl_sec=0).prune() == 1
@@ -0,0 +1,141 @@
+import io
+import json
+import os
+import signal
+import socket
+import threading
+import time
+from functools import partial
+from pathlib import Path
+
+import pytest
+
+from ssh_linux import daemon
+from ssh_linux.errors import ExitCode
+from ssh_linux.pipeline import TaskResult, TaskSpec
+
+_DEFAULTS = {
+    "ingest_url": "http://ingest",
+    "ingest_token": "token",
+    "schema_version": "1.0",
+    "timeout_sec": 30,
+    "strict": False,
+    "collect_mode": "exec",
+}
+
+_ENVELOPE = {
+    "run_id": "11111111-1111-1111-1111-111111111111",
+    "task_id": "22222222-2222-2222-2222-222222222222",
+    "target": {
+        "type": "host",
+        "address": "10.0.0.5",
+        "user": "ubuntu",
+        "auth": {"method": "password", "password": "secret"},
+    },
+    "timeout_sec": 5,
+}
+
+
+def _fake_run_task(spec: TaskSpec, **_kwargs: object) -> TaskResult:
+    assert spec.ingest_url == "http://ingest"
+    assert spec.timeout_sec == 5
+    return TaskResult(exit_code=int(ExitCode.SUCCESS), batch_id=f"batch-{spec.task_id[:8]}")
+
+
+def test_serve_stdin_reports_each_envelope(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(daemon, "run_task", _fake_run_task)
+    lines = [json.dumps(_ENVELOPE), "{broken", json.dumps({**_ENVELOPE, "extra": 1})]
+    output = io.BytesIO()
+
+    with daemon.ThreadPoolExecutor(max_workers=2) as pool:
+        daemon._serve_stream(
+            iter(lines),
+            daemon._ResultWriter(output),
+            pool,
+            threading.BoundedSemaphore(2),
+            partial(daemon.handle_envelope, defaults=_DEFAULTS),
+            threading.Event(),
+        )
+
+    results = [json.loads(line) for line in output.getvalue().decode().splitlines()]
+    by_code = sorted((result["exit_code"], result["task_id"] or "") for result in results)
+    assert by_code == [
+        (ExitCode.SUCCESS, _ENVELOPE["task_id"]),
+        (ExitCode.VALIDATION_ERROR, ""),
+        (ExitCode.VALIDATION_ERROR, _ENVELOPE["task_id"]),
+    ]
+    assert any(result.get("batch_id") == "batch-22222222" for result in results)
+
+
+def test_repeated_shutdown_signal_still_drains_in_flight_tasks(monkeypatch: pytest.MonkeyPatch) -> None:
+    def slow_run_task(spec: TaskSpec, **kwargs: object) -> TaskResult:
+        time.sleep(0.5)
+        return _fake_run_task(spec, **kwargs)
+
+    def blocking_stdin():
+        yield json.dumps(_ENVELOPE)
+        time.sleep(5)
+
+    def signal_twice() -> None:
+        for _ in range(2):
+            time.sleep(0.15)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    monkeypatch.setattr(daemon, "run_task", slow_run_task)
+    output = io.BytesIO()
+    stop = threading.Event()
+    threading.Thread(target=signal_twice, daemon=True).start()
+
+    with daemon.ThreadPoolExecutor(max_workers=1) as pool:
+        with daemon._shutdown_signals(stop, interrupt_reads=True):
+            daemon._serve_stream(
+                blocking_stdin(),
+                daemon._ResultWriter(output),
+                pool,
+                threading.BoundedSemaphore(1),
+                partial(daemon.handle_envelope, defaults=_DEFAULTS),
+                stop,
+            )
+
+    assert stop.is_set()
+    assert json.loads(output.getvalue())["batch_id"] == "batch-22222222"
+
+
+def test_serve_socket_round_trip(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(daemon, "run_task", _fake_run_task)
+    bastions_closed = threading.Event()
+    monkeypatch.setattr(daemon.BASTIONS, "close", bastions_closed.set)
+    socket_path = str(tmp_path / "ssh_linux.sock")
+    stop = threading.Event()
+    server = threading.Thread(target=daemon.serve, args=(socket_path, 2, _DEFAULTS, stop), daemon=True)
+    server.start()
+    deadline = time.monotonic() + 5
+    while not os.path.exists(socket_path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall((json.dumps(_ENVELOPE) + "\n").encode())
+        client.shutdown(socket.SHUT_WR)
+        reply = client.makefile("rb").readline()
+
+    try:
+        assert json.loads(reply)["batch_id"] == "batch-22222222"
+        assert os.stat(socket_path).st_mode & 0o777 == 0o600
+    finally:
+        stop.set()
+        server.join(timeout=5)
+
+    assert not server.is_alive()
+    assert not os.path.exists(socket_path)
+    assert bastions_closed.is_set()
+
+
+def test_serve_socket_refuses_to_replace_regular_file(tmp_path: Path) -> None:
+    socket_path = tmp_path / "not-a-socket"
+    socket_path.write_text("keep me")
+
+    exit_code = daemon.serve(str(socket_path), 1, _DEFAULTS, threading.Event())
+
+    assert exit_code == ExitCode.VALIDATION_ERROR
+    assert socket_path.read_text() == "keep me"
@@ -0,0 +1,118 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from ssh_linux import fleet
+from ssh_linux.collectors import HostFacts
+from ssh_linux.ingest_client import IngestResult
+from ssh_linux.errors import ExitCode
+from ssh_linux.pipeline import TaskResult, TaskSpec
+
+
+def _target_line(address: str) -> str:
+    return json.dumps(
+        {
+            "type": "host",
+            "address": address,
+            "user": "ubuntu",
+            "auth": {"method": "password", "password": "secret"},
+        }
+    )
+
+
+def test_run_fleet_reports_every_target_without_waiting_for_slow_host(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    targets_file = tmp_path / "targets.jsonl"
+    targets_file.write_text(
+        "\n".join([_target_line("10.0.0.1"), "not json", _target_line("10.0.0.2"), _target_line("10.0.0.3")]) + "\n"
+    )
+    seen_task_ids: list[str] = []
+
+    def fake_run_task(spec: TaskSpec, **_kwargs: object) -> TaskResult:
+        seen_task_ids.append(spec.task_id)
+        if spec.target.address == "10.0.0.1":
+            time.sleep(0.5)
+            return TaskResult(exit_code=int(ExitCode.SSH_ERROR), message="timed out")
+        return TaskResult(exit_code=int(ExitCode.SUCCESS), batch_id=f"batch-{spec.target.address}")
+
+    monkeypatch.setattr(fleet, "run_task", fake_run_task)
+
+    started = time.monotonic()
+    exit_code = fleet.run_fleet(
+        str(targets_file),
+        run_id="11111111-1111-1111-1111-111111111111",
+        task_id="22222222-2222-2222-2222-222222222222",
+        workers=2,
+        ingest_url="http://ingest",
+        ingest_token="token",
+    )
+
+    assert time.monotonic() - started < 5
+    results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    by_line = {result["line"]: result for result in results}
+    assert by_line[2]["exit_code"] == ExitCode.VALIDATION_ERROR
+    assert by_line[3]["batch_id"] == "batch-10.0.0.2"
+    assert by_line[4]["batch_id"] == "batch-10.0.0.3"
+    assert by_line[1]["exit_code"] == ExitCode.SSH_ERROR
+    assert results[-1]["line"] == 1
+    assert exit_code == ExitCode.VALIDATION_ERROR
+    assert len(set(seen_task_ids)) == 3
+
+
+def test_run_fleet_aggregates_hosts_into_chunked_batches(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    targets_file = tmp_path / "targets.jsonl"
+    addresses = [f"10.0.0.{index}" for index in range(1, 6)] + ["10.0.0.2"]
+    targets_file.write_text("\n".join(_target_line(address) for address in addresses) + "\n")
+    posted: list[tuple[str, int]] = []
+
+    def fake_collect_task(spec: TaskSpec, fact_cache: object = None) -> HostFacts | TaskResult:
+        if spec.target.address == "10.0.0.5":
+            return TaskResult(exit_code=int(ExitCode.SSH_ERROR), message="refused")
+        return HostFacts(hostname=f"host-{spec.target.address}")
+
+    class FakeIngestClient:
+        def post(self, batch_payload: dict, idempotency_key: str, timeout_sec: float, deadline=None) -> IngestResult:
+            posted.append((idempotency_key, len(batch_payload["entities"])))
+            return IngestResult(
+                batch_id=f"batch-{len(posted)}",
+                bytes_sent=1,
+                payload_bytes=1,
+                latency_sec=0.0,
+                compressed=False,
+            )
+
+    class FakeIngestClients:
+        def get(self, ingest_url: str, ingest_token: str) -> FakeIngestClient:
+            return FakeIngestClient()
+
+    monkeypatch.setattr(fleet, "collect_task", fake_collect_task)
+
+    exit_code = fleet.run_fleet(
+        str(targets_file),
+        run_id="11111111-1111-1111-1111-111111111111",
+        task_id="22222222-2222-2222-2222-222222222222",
+        workers=4,
+        aggregate=True,
+        batch_max_entities=3,
+        ingest_clients=FakeIngestClients(),
+        ingest_url="http://ingest",
+        ingest_token="token",
+    )
+
+    results = {result["line"]: result for result in map(json.loads, capsys.readouterr().out.splitlines())}
+    assert [count for _key, count in posted] == [3, 1]
+    assert {results[line]["batch_id"] for line in range(1, 4)} == {"batch-1"}
+    assert results[4]["batch_id"] == "batch-2"
+    assert results[5]["exit_code"] == ExitCode.SSH_ERROR
+    assert results[6]["exit_code"] == ExitCode.VALIDATION_ERROR
+    assert results[6]["error"] == "target repeats line 2 (same address, port and user)"
+    assert exit_code == ExitCode.VALIDATION_ERROR
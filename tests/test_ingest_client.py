@@ -0,0 +1,161 @@
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import pytest
+
+from ssh_linux import ingest_client
+from ssh_linux.deadline import Deadline
+from ssh_linux.errors import IngestConnectorError
+from ssh_linux.ingest_client import CircuitBreaker, IngestClient, RetryPolicy, post_batch
+
+
+class _IngestStub:
+    def __init__(self) -> None:
+        self.requests: list[dict] = []
+        self.accept_gzip = True
+        self.statuses: list[int] = []
+        self.retry_after: str | None = None
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:  # noqa: N802
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                encoding = self.headers.get("Content-Encoding")
+                stub.requests.append(
+                    {
+                        "encoding": encoding,
+                        "idempotency_key": self.headers.get("Idempotency-Key"),
+                        "port": self.client_address[1],
+                        "size": len(body),
+                    }
+                )
+                if encoding == "gzip" and not stub.accept_gzip:
+                    self._reply(415, b"unsupported encoding")
+                    return
+                if encoding == "gzip":
+                    body = gzip.decompress(body)
+                json.loads(body)
+                reply = json.dumps({"batch_id": f"b{len(stub.requests)}"}).encode()
+                self._reply(stub.statuses.pop(0) if stub.statuses else 201, reply)
+
+            def _reply(self, status: int, body: bytes) -> None:
+                self.send_response(status)
+                if stub.retry_after is not None:
+                    self.send_header("Retry-After", stub.retry_after)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *_args: object) -> None:
+                return None
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+
+@pytest.fixture
+def stub() -> Iterator[_IngestStub]:
+    ingest = _IngestStub()
+    thread = threading.Thread(target=ingest.server.serve_forever, daemon=True)
+    thread.start()
+    yield ingest
+    ingest.server.shutdown()
+    ingest.server.server_close()
+
+
+_BIG_PAYLOAD = {"entities": [{"mountpoint": f"/var/lib/containers/{index}"} for index in range(500)]}
+
+
+def test_client_reuses_connection_and_gzips_large_bodies(stub: _IngestStub) -> None:
+    with IngestClient(stub.url, "token", gzip_min_bytes=1024) as client:
+        small = client.post({"entities": []}, "key-1", timeout_sec=5)
+        large = client.post(_BIG_PAYLOAD, "key-2", timeout_sec=5)
+
+    assert [request["encoding"] for request in stub.requests] == [None, "gzip"]
+    assert stub.requests[0]["port"] == stub.requests[1]["port"]
+    assert not small.compressed
+    assert large.compressed
+    assert large.bytes_sent < large.payload_bytes
+    assert large.latency_sec > 0
+    assert large.batch_id == "b2"
+
+
+def test_client_falls_back_to_identity_when_gzip_is_rejected(stub: _IngestStub) -> None:
+    stub.accept_gzip = False
+    with IngestClient(stub.url, "token", gzip_min_bytes=1024) as client:
+        first = client.post(_BIG_PAYLOAD, "key-1", timeout_sec=5)
+        second = client.post(_BIG_PAYLOAD, "key-2", timeout_sec=5)
+
+    assert [request["encoding"] for request in stub.requests] == ["gzip", None, None]
+    assert [request["idempotency_key"] for request in stub.requests] == ["key-1", "key-1", "key-2"]
+    assert not first.compressed and not second.compressed
+    assert first.bytes_sent == first.payload_bytes
+
+
+@pytest.fixture
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    recorded: list[float] = []
+    monkeypatch.setattr(ingest_client, "_sleep", recorded.append)
+    return recorded
+
+
+def test_post_batch_retries_then_maps_error_status(stub: _IngestStub, sleeps: list[float]) -> None:
+    stub.statuses = [500] * 4
+
+    with pytest.raises(IngestConnectorError, match="ingest failed status=500"):
+        post_batch(stub.url, "token", "task", {"entities": []}, timeout_sec=5)
+
+    assert len(stub.requests) == 4
+    assert {request["idempotency_key"] for request in stub.requests} == {"task"}
+    assert len(sleeps) == 3
+
+
+def test_retry_after_is_honoured_and_client_errors_are_not_retried(stub: _IngestStub, sleeps: list[float]) -> None:
+    stub.statuses = [429, 503]
+    stub.retry_after = "7"
+    with IngestClient(stub.url, "token", breaker=CircuitBreaker()) as client:
+        result = client.post({"entities": []}, "key-1", timeout_sec=5)
+
+        stub.statuses = [401]
+        with pytest.raises(IngestConnectorError, match="status=401"):
+            client.post({"entities": []}, "key-2", timeout_sec=5)
+
+    assert result.attempts == 3
+    assert sleeps == [7.0, 7.0]
+    assert len(stub.requests) == 4
+
+
+def test_retries_stop_when_the_task_deadline_cannot_cover_the_wait(stub: _IngestStub, sleeps: list[float]) -> None:
+    stub.statuses = [503]
+    stub.retry_after = "7"
+    with IngestClient(stub.url, "token", breaker=CircuitBreaker()) as client:
+        with pytest.raises(IngestConnectorError, match="status=503"):
+            client.post({"entities": []}, "key-1", timeout_sec=5, deadline=Deadline(2))
+        with pytest.raises(IngestConnectorError, match="task deadline exceeded before ingest attempt 1"):
+            client.post({"entities": []}, "key-2", timeout_sec=5, deadline=Deadline(0))
+
+    assert sleeps == []
+    assert len(stub.requests) == 1
+
+
+def test_circuit_breaker_fails_fast_then_probes(stub: _IngestStub, sleeps: list[float]) -> None:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout_sec=0.2)
+    stub.statuses = [503, 503]
+    with IngestClient(stub.url, "token", retry=RetryPolicy(max_attempts=5), breaker=breaker) as client:
+        with pytest.raises(IngestConnectorError, match="circuit breaker open"):
+            client.post({"entities": []}, "key-1", timeout_sec=5)
+        assert len(stub.requests) == 2
+
+        with pytest.raises(IngestConnectorError, match="circuit breaker open"):
+            client.post({"entities": []}, "key-2", timeout_sec=5)
+        assert len(stub.requests) == 2
+
+        time.sleep(0.25)
+        assert client.post({"entities": []}, "key-3", timeout_sec=5).batch_id == "b3"
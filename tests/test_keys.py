@@ -0,0 +1,57 @@
+import os
+from pathlib import Path
+
+import paramiko
+import pytest
+
+from ssh_linux.keys import PrivateKeyCache
+
+
+def _write_key(path: Path, passphrase: str | None = None) -> paramiko.RSAKey:
+    key = paramiko.RSAKey.generate(1024)
+    key.write_private_key_file(str(path), password=passphrase)
+    return key
+
+
+def test_key_is_parsed_once_and_reloaded_when_the_file_changes(tmp_path: Path) -> None:
+    path = tmp_path / "id_rsa"
+    original = _write_key(path)
+    cache = PrivateKeyCache()
+
+    first = cache.load(str(path))
+    assert cache.load(str(path)) is first
+    assert first.get_fingerprint() == original.get_fingerprint()
+
+    rotated = _write_key(tmp_path / "id_rsa.new")
+    os.replace(tmp_path / "id_rsa.new", path)
+
+    reloaded = cache.load(str(path))
+    assert reloaded is not first
+    assert reloaded.get_fingerprint() == rotated.get_fingerprint()
+    assert len(cache) == 1
+
+
+def test_encrypted_key_needs_the_right_passphrase(tmp_path: Path) -> None:
+    path = tmp_path / "id_rsa"
+    _write_key(path, passphrase="correct horse")
+    cache = PrivateKeyCache()
+
+    with pytest.raises(paramiko.SSHException):
+        cache.load(str(path), "wrong")
+    with pytest.raises(paramiko.SSHException):
+        cache.load(str(path))
+    key = cache.load(str(path), "correct horse")
+    assert cache.load(str(path), "correct horse") is key
+
+
+def test_missing_key_file_evicts_the_entry(tmp_path: Path) -> None:
+    path = tmp_path / "id_rsa"
+    _write_key(path)
+    cache = PrivateKeyCache()
+    cache.load(str(path))
+
+    path.unlink()
+
+    with pytest.raises(FileNotFoundError):
+        cache.load(str(path))
+    assert len(cache) == 0
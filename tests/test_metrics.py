@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import pytest
+
+from ssh_linux import metrics
+from ssh_linux.metrics import MetricsRegistry
+
+
+def test_render_cumulative_buckets_and_counters(tmp_path: Path) -> None:
+    registry = MetricsRegistry()
+    registry.observe("latency_seconds", 0.02, buckets=(0.01, 0.1), phase="command", name='cat "x"')
+    registry.observe("latency_seconds", 0.5, buckets=(0.01, 0.1), phase="command", name='cat "x"')
+    registry.inc("bytes_total", 42, phase="command", name="uname -r")
+
+    text = registry.render()
+
+    labels = 'name="cat \\"x\\"",phase="command"'
+    assert f'latency_seconds_bucket{{{labels},le="0.01"}} 0' in text
+    assert f'latency_seconds_bucket{{{labels},le="0.1"}} 1' in text
+    assert f'latency_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f"latency_seconds_count{{{labels}}} 2" in text
+    assert "# TYPE bytes_total counter" in text
+    assert 'bytes_total{name="uname -r",phase="command"} 42' in text
+
+    registry.write_textfile(tmp_path / "connector.prom")
+    assert (tmp_path / "connector.prom").read_text() == text
+    assert [path.name for path in tmp_path.iterdir()] == ["connector.prom"]
+
+
+def test_span_records_failure_and_logs_task_context(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+
+    with metrics.span_context(task_id="t-1"):
+        with pytest.raises(RuntimeError):
+            with metrics.span("ingest") as current:
+                current.bytes = 10
+                raise RuntimeError("boom")
+
+    assert 'ssh_linux_span_errors_total{name="",phase="ingest"} 1' in registry.render()
+    assert 'ssh_linux_span_bytes_total{name="",phase="ingest"} 10' in registry.render()
+    event = capsys.readouterr().err
+    assert '"event":"span","phase":"ingest"' in event
+    assert '"ok":false' in event and '"task_id":"t-1"' in event
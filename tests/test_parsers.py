@@ -1,4 +1,13 @@
-from ssh_linux.parsers import parse_df_p, parse_meminfo, parse_os_release
+import json
+
+from ssh_linux.parsers import (
+    parse_df_p,
+    parse_ipv4_from_ip_addr,
+    parse_listening_sockets,
+    parse_meminfo,
+    parse_os_release,
+    parse_packages,
+)
 
 
 def test_parse_os_release() -> None:
@@ -59,3 +68,77 @@ tmpfs              404080     1460    402620       1% /run
             "mountpoint": "/",
         },
     ]
+
+
+def test_parse_df_p_consumes_lines_incrementally() -> None:
+    def lines():
+        yield "Filesystem     1024-blocks     Used Available Capacity Mounted on"
+        for index in range(3):
+            yield f"overlay  100  40  60  40% /var/lib/docker/overlay2/{index}/merged"
+
+    parsed = parse_df_p(lines())
+
+    assert [row["mountpoint"] for row in parsed] == [f"/var/lib/docker/overlay2/{index}/merged" for index in range(3)]
+
+
+def test_parse_df_p_keeps_spaces_inside_the_mountpoint() -> None:
+    raw = "Filesystem 1024-blocks Used Available Capacity Mounted on\n//nas/share 100 40 60 40% /mnt/my share\n"
+
+    assert parse_df_p(raw)[0]["mountpoint"] == "/mnt/my share"
+
+
+def test_parse_meminfo_requires_memtotal_at_line_start() -> None:
+    assert parse_meminfo("XMemTotal: 1 kB\nMemTotal:   2048 kB\n") == 2048
+    assert parse_meminfo("MemFree: 1 kB\n") is None
+
+
+def test_parse_ipv4_dedupes_in_first_seen_order() -> None:
+    raw = json.dumps(
+        [
+            {"ifname": "lo", "addr_info": [{"family": "inet", "local": "127.0.0.1"}]},
+            {"ifname": "kube-ipvs0", "addr_info": [{"family": "inet", "local": ip} for ip in ("10.0.0.2", "10.0.0.1")]},
+            {"ifname": "eth0", "addr_info": [{"family": "inet", "local": ip} for ip in ("10.0.0.1", "10.0.0.3")]},
+        ]
+    )
+
+    assert parse_ipv4_from_ip_addr(raw) == ["10.0.0.2", "10.0.0.1", "10.0.0.3"]
+
+
+def test_parse_packages_keeps_installed_rows_with_an_order_independent_digest() -> None:
+    dpkg = ["dpkg", "ii \tzlib1g\t1:1.2.13\tamd64", "rc \told-kernel\t5.10\tamd64", "ii \tbash\t5.2-2\tamd64"]
+    rpm = ["rpm", "ii \tbash\t5.2-2\tamd64", "ii \tzlib1g\t1:1.2.13\tamd64"]
+
+    parsed = parse_packages(iter(dpkg))
+
+    assert parsed["manager"] == "dpkg"
+    assert parsed["count"] == 2
+    assert parsed["items"] == [("bash", "5.2-2", "amd64"), ("zlib1g", "1:1.2.13", "amd64")]
+    assert parse_packages("\n".join(rpm))["digest"] == parsed["digest"]
+    assert parse_packages(dpkg[:-1])["digest"] != parsed["digest"]
+    assert parse_packages("none\n") is None
+
+
+def test_parse_listening_sockets_from_ss_and_proc_dedupes_and_sorts_by_port() -> None:
+    ss = [
+        "ss",
+        "State  Recv-Q Send-Q Local Address:Port  Peer Address:Port Process",
+        'LISTEN 0 511 0.0.0.0:80 0.0.0.0:* users:(("nginx",pid=12,fd=6),("nginx",pid=11,fd=6))',
+        'LISTEN 0 511 0.0.0.0:80 0.0.0.0:* users:(("nginx",pid=13,fd=7))',
+        "LISTEN 0 4096 127.0.0.53%lo:53 0.0.0.0:*",
+        'LISTEN 0 128 [::]:22 [::]:* users:(("sshd",pid=1,fd=4))',
+    ]
+    proc = [
+        "proc",
+        "  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode",
+        "   0: 3500007F:0035 00000000:0000 0A 00000000:00000000 00:00000000 00000000   101 0 1",
+        "   1: 0100007F:1F90 0100007F:C350 01 00000000:00000000 00:00000000 00000000     0 0 2",
+        "   0: 00000000000000000000000001000000:0016 00000000000000000000000000000000:0000 0A 00000000:00000000",
+    ]
+
+    assert parse_listening_sockets(iter(ss)) == [
+        ("tcp6", "::", 22, "sshd"),
+        ("tcp", "127.0.0.53", 53, None),
+        ("tcp", "0.0.0.0", 80, "nginx"),
+    ]
+    assert parse_listening_sockets("\n".join(proc)) == [("tcp6", "::1", 22, None), ("tcp", "127.0.0.53", 53, None)]
+    assert parse_listening_sockets("") == []
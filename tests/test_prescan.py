@@ -0,0 +1,119 @@
+import json
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from ssh_linux import fleet
+from ssh_linux.errors import ExitCode
+from ssh_linux.models import Target
+from ssh_linux.pipeline import TaskResult, TaskSpec
+from ssh_linux.prescan import Prescanner
+
+
+def _listener(greeting: bytes | None) -> socket.socket:
+    """Local server that sends ``greeting`` to every client, or nothing at all when it is None."""
+    server = socket.create_server(("127.0.0.1", 0))
+
+    def serve() -> None:
+        clients = []
+        while True:
+            try:
+                client, _ = server.accept()
+            except OSError:
+                return
+            clients.append(client)
+            if greeting is not None:
+                client.sendall(greeting)
+
+    threading.Thread(target=serve, daemon=True).start()
+    return server
+
+
+def _closed_port() -> int:
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        return server.getsockname()[1]
+
+
+def _target(port: int, jump: bool = False) -> dict[str, object]:
+    target: dict[str, object] = {
+        "type": "host",
+        "address": "127.0.0.1",
+        "port": port,
+        "user": "ubuntu",
+        "auth": {"method": "password", "password": "x"},
+    }
+    if jump:
+        target["user"] = "deploy"
+        target["jump"] = {"address": "bastion", "user": "jump", "auth": {"method": "password", "password": "x"}}
+    return target
+
+
+@pytest.fixture
+def ports() -> Iterator[dict[str, int]]:
+    ssh = _listener(b"Welcome\r\nSSH-2.0-OpenSSH_9.6\r\n")
+    silent = _listener(None)
+    try:
+        yield {"ssh": ssh.getsockname()[1], "silent": silent.getsockname()[1], "closed": _closed_port()}
+    finally:
+        ssh.close()
+        silent.close()
+
+
+def test_fleet_reports_unreachable_targets_without_running_them(
+    ports: dict[str, int], tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    targets = [
+        _target(ports["ssh"]),
+        _target(ports["closed"]),
+        _target(ports["silent"]),
+        _target(ports["closed"], jump=True),
+    ]
+    targets_file = tmp_path / "targets.jsonl"
+    targets_file.write_text("\n".join(json.dumps(target) for target in targets) + "\n")
+    ran: list[int] = []
+
+    def fake_run_task(spec: TaskSpec, **_kwargs: object) -> TaskResult:
+        ran.append(spec.target.port)
+        return TaskResult(exit_code=int(ExitCode.SUCCESS), batch_id="batch-1")
+
+    monkeypatch.setattr(fleet, "run_task", fake_run_task)
+
+    started = time.monotonic()
+    exit_code = fleet.run_fleet(
+        str(targets_file),
+        run_id="11111111-1111-1111-1111-111111111111",
+        task_id="22222222-2222-2222-2222-222222222222",
+        workers=2,
+        prescanner=Prescanner(timeout_sec=0.5),
+        ingest_url="http://ingest",
+        ingest_token="token",
+    )
+
+    assert time.monotonic() - started < 3
+    results = {result["line"]: result for result in map(json.loads, capsys.readouterr().out.splitlines())}
+    assert [results[line]["exit_code"] for line in (1, 2, 3, 4)] == [0, 2, 2, 0]
+    assert "cause=TCP connect failed" in results[2]["error"]
+    assert "cause=no SSH banner within 0.5s" in results[3]["error"]
+    assert sorted(ran) == sorted([ports["ssh"], ports["closed"]])
+    assert exit_code == ExitCode.SSH_ERROR
+
+
+def test_repeatedly_unreachable_targets_are_backed_off_across_runs(ports: dict[str, int], tmp_path: Path) -> None:
+    state_path = tmp_path / "unreachable.json"
+    dead = Target.model_validate(_target(ports["closed"]))
+    live = Target.model_validate(_target(ports["ssh"]))
+    scanner = Prescanner(timeout_sec=0.5, state_path=state_path)
+
+    first = scanner.scan([dead, live])
+    second = scanner.scan([dead])
+
+    assert first[1] is None
+    assert "TCP connect failed" in first[0] and "failed probes" not in first[0]
+    assert "failed probes" not in second[0]
+    backed_off = Prescanner(timeout_sec=0.5, state_path=state_path).scan([dead, dead])
+    assert backed_off[0] == backed_off[1]
+    assert "(2 failed probes; next probe in 60s)" in backed_off[0]
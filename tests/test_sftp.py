@@ -0,0 +1,103 @@
+import socket
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterator
+
+import paramiko
+import pytest
+
+from ssh_linux.errors import SSHConnectorError
+from ssh_linux.models import Target
+from ssh_linux.sftp import READ_SIZE
+from ssh_linux.ssh_client import SSHClient
+
+
+class _Server(paramiko.ServerInterface):
+    def check_auth_none(self, username: str) -> int:
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username: str) -> str:
+        return "none"
+
+    def check_channel_request(self, kind: str, chanid: int) -> int:
+        return paramiko.OPEN_SUCCEEDED
+
+
+class _LocalFiles(paramiko.SFTPServerInterface):
+    """Serves the local filesystem read-only."""
+
+    def open(self, path: str, flags: int, attr: paramiko.SFTPAttributes) -> paramiko.SFTPHandle | int:
+        try:
+            readfile = open(path, "rb")  # noqa: SIM115 - closed by SFTPHandle
+        except OSError as exc:
+            return paramiko.SFTPServer.convert_errno(exc.errno)
+        handle = paramiko.SFTPHandle(flags)
+        handle.filename = path
+        handle.readfile = readfile
+        return handle
+
+
+def _loopback(sftp: bool) -> Iterator[SSHClient]:
+    client_sock, server_sock = socket.socketpair()
+    server_transport = paramiko.Transport(server_sock)
+    server_transport.add_server_key(paramiko.RSAKey.generate(1024))
+    if sftp:
+        server_transport.set_subsystem_handler("sftp", paramiko.SFTPServer, _LocalFiles)
+    server_transport.start_server(threading.Event(), server=_Server())
+    client_transport = paramiko.Transport(client_sock)
+    client_transport.connect()
+    client_transport.auth_none("ubuntu")
+
+    client = SSHClient(
+        target=Target.model_validate(
+            {"type": "host", "address": "127.0.0.1", "user": "ubuntu", "auth": {"method": "password", "password": "x"}}
+        ),
+        timeout_sec=5,
+    )
+    client._client = SimpleNamespace(get_transport=lambda: client_transport)
+    try:
+        yield client
+    finally:
+        client_transport.close()
+        server_transport.close()
+
+
+@pytest.fixture
+def sftp_client() -> Iterator[SSHClient]:
+    yield from _loopback(sftp=True)
+
+
+@pytest.fixture
+def exec_only_client() -> Iterator[SSHClient]:
+    yield from _loopback(sftp=False)
+
+
+def test_read_files_reads_to_eof_caps_and_reports_missing_files(sftp_client: SSHClient, tmp_path: Path) -> None:
+    small = tmp_path / "machine-id"
+    small.write_bytes(b"0123456789abcdef\n")
+    large = tmp_path / "meminfo"
+    large.write_bytes(b"".join(b"Line%06d: %d kB\n" % (index, index) for index in range(10_000)))
+    capped = tmp_path / "os-release"
+    capped.write_bytes(b"ID=ubuntu\nVERSION_ID=22.04\nPRETTY_NAME=Ubuntu\n")
+
+    reads = sftp_client.read_files(
+        [
+            (str(small), 4096),
+            (str(large), 1024 * 1024),
+            (str(capped), 20),
+            (str(tmp_path / "missing"), 4096),
+        ]
+    )
+
+    assert [read.path for read in reads] == [str(small), str(large), str(capped), str(tmp_path / "missing")]
+    assert (reads[0].data, reads[0].truncated) == (b"0123456789abcdef\n", False)
+    assert len(large.read_bytes()) > 3 * READ_SIZE
+    assert (reads[1].data, reads[1].truncated) == (large.read_bytes(), False)
+    assert (reads[2].data, reads[2].truncated) == (b"ID=ubuntu\n", True)
+    assert reads[3].error is not None and "No such file" in reads[3].error
+
+
+def test_read_files_raises_when_the_host_has_no_sftp(exec_only_client: SSHClient) -> None:
+    with pytest.raises(SSHConnectorError, match="SFTP read failed"):
+        exec_only_client.read_files([("/etc/hostname", 4096)])
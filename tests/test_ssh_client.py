@@ -1,9 +1,19 @@
+import socket
+import subprocess
+import threading
+import time
+from types import SimpleNamespace
+from typing import Iterator
+
 import paramiko
 import pytest
 
+from ssh_linux import collectors
+from ssh_linux.deadline import Deadline
 from ssh_linux.errors import SSHConnectorError
+from ssh_linux.keys import KEY_CACHE
 from ssh_linux.models import Target
-from ssh_linux.ssh_client import SSHClient
+from ssh_linux.ssh_client import CommandResult, SSHClient
 
 
 class _FailingClient:
@@ -49,6 +59,7 @@ def test_connect_error_includes_target_context_and_cause_password_auth(
 def test_connect_error_includes_key_path_for_key_auth(monkeypatch: pytest.MonkeyPatch) -> None:
     error = ConnectionRefusedError("Connection refused")
     monkeypatch.setattr(paramiko, "SSHClient", lambda: _FailingClient(error))
+    monkeypatch.setattr(KEY_CACHE, "load", lambda _path, _passphrase=None: object())
 
     target = Target.model_validate(
         {
@@ -68,3 +79,184 @@ def test_connect_error_includes_key_path_for_key_auth(monkeypatch: pytest.Monkey
     assert "auth_method=key" in message
     assert "key_path=/home/user/.ssh/id_rsa" in message
     assert "cause=ConnectionRefusedError: Connection refused" in message
+
+
+class _ExecServer(paramiko.ServerInterface):
+    """Minimal SSH server that runs each exec request with the local /bin/sh."""
+
+    def __init__(self, max_sessions: int = 10) -> None:
+        self._max_sessions = max_sessions
+        self._open = 0
+        self._lock = threading.Lock()
+
+    def check_auth_none(self, username: str) -> int:
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username: str) -> str:
+        return "none"
+
+    def check_channel_request(self, kind: str, chanid: int) -> int:
+        with self._lock:
+            if self._open >= self._max_sessions:
+                return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+            self._open += 1
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel: paramiko.Channel, command: bytes) -> bool:
+        threading.Thread(target=self._execute, args=(channel, command.decode()), daemon=True).start()
+        return True
+
+    def _execute(self, channel: paramiko.Channel, command: str) -> None:
+        # Give the transport time to acknowledge the exec request; closing the
+        # channel before that makes the client's exec_command fail.
+        time.sleep(0.05)
+        proc = subprocess.run(command, shell=True, capture_output=True, check=False)
+        with self._lock:
+            self._open -= 1
+        channel.sendall(proc.stdout)
+        channel.sendall_stderr(proc.stderr)
+        channel.send_exit_status(proc.returncode)
+        channel.close()
+
+
+@pytest.fixture
+def loopback_client() -> Iterator[tuple[SSHClient, _ExecServer]]:
+    client_sock, server_sock = socket.socketpair()
+    server = _ExecServer(max_sessions=3)
+    server_transport = paramiko.Transport(server_sock)
+    server_transport.add_server_key(paramiko.RSAKey.generate(1024))
+    server_transport.start_server(threading.Event(), server=server)
+    client_transport = paramiko.Transport(client_sock)
+    client_transport.connect()
+    client_transport.auth_none("ubuntu")
+
+    client = SSHClient(
+        target=Target.model_validate(
+            {"type": "host", "address": "127.0.0.1", "user": "ubuntu", "auth": {"method": "password", "password": "x"}}
+        ),
+        timeout_sec=5,
+    )
+    client._client = SimpleNamespace(get_transport=lambda: client_transport)
+    try:
+        yield client, server
+    finally:
+        client_transport.close()
+        server_transport.close()
+
+
+def test_run_many_overlaps_commands_and_keeps_order(loopback_client: tuple[SSHClient, _ExecServer]) -> None:
+    client, _server = loopback_client
+    commands = ["sleep 0.4; echo one", "sleep 0.4; echo two >&2; exit 3", "sleep 0.4; echo three"]
+
+    started = time.monotonic()
+    results = client.run_many(commands, max_channels=8)
+    elapsed = time.monotonic() - started
+
+    assert results == [
+        CommandResult(exit_code=0, stdout="one", stderr=""),
+        CommandResult(exit_code=3, stdout="", stderr="two"),
+        CommandResult(exit_code=0, stdout="three", stderr=""),
+    ]
+    assert elapsed < 1.0
+
+
+def test_run_many_backs_off_to_the_server_session_limit(loopback_client: tuple[SSHClient, _ExecServer]) -> None:
+    client, _server = loopback_client
+
+    results = client.run_many([f"echo {index}" for index in range(7)], max_channels=8)
+
+    assert [result.stdout for result in results] == [str(index) for index in range(7)]
+
+
+def test_run_caps_output_and_survives_a_stderr_flood(loopback_client: tuple[SSHClient, _ExecServer]) -> None:
+    client, _server = loopback_client
+    capped = SSHClient(client._target, timeout_sec=5, max_stdout_bytes=64, max_stderr_bytes=32)
+    capped._client = client._client
+
+    # 4 MiB of stderr before any stdout would stall a read-stdout-first client.
+    result = capped.run("head -c 4194304 /dev/zero >&2; for i in $(seq 1 50); do echo line-$i; done")
+
+    assert result.exit_code == 0
+    assert result.stdout_truncated and result.stderr_truncated
+    assert result.stdout.splitlines() == [f"line-{index}" for index in range(1, 10)]
+    assert len(result.stderr) <= 32
+
+
+def test_stream_lines_yields_lines_then_exit_code(loopback_client: tuple[SSHClient, _ExecServer]) -> None:
+    client, _server = loopback_client
+
+    with client.stream_lines("printf 'a\\nb\\nc'; echo oops >&2; exit 2") as stream:
+        lines = list(stream)
+
+    assert lines == ["a", "b", "c"]
+    assert stream.result == CommandResult(exit_code=2, stdout="", stderr="oops")
+
+
+@pytest.mark.parametrize(
+    ("df", "warning", "stdout_bytes"),
+    [
+        (
+            f"echo 'Filesystem 1024-blocks Used Available Capacity Mounted on'; echo '/dev/sda1 1 1 0 100% /{'a' * 200}'",
+            "output exceeded the stdout cap and was truncated",
+            281,
+        ),
+        ("echo 'df: /mnt: Permission denied' >&2; exit 1", "returned exit=1 stderr=df: /mnt: Permission denied", 0),
+    ],
+)
+def test_streamed_section_keeps_truncation_and_stderr_after_parsing(
+    loopback_client: tuple[SSHClient, _ExecServer], monkeypatch: pytest.MonkeyPatch, df: str, warning: str, stdout_bytes: int
+) -> None:
+    client, _server = loopback_client
+    capped = SSHClient(client._target, timeout_sec=5, max_stdout_bytes=128)
+    capped._client = client._client
+    monkeypatch.setattr(collectors, "_COMMANDS", {**collectors._COMMANDS, "df": df})
+    spans: list[dict[str, object]] = []
+    monkeypatch.setattr(collectors, "record_span", lambda _phase, _sec, **fields: spans.append(fields))
+    warnings: list[str] = []
+
+    collectors.collect_host_facts(
+        capped, strict=False, log=lambda _level, message: warnings.append(message), collectors=["filesystems"]
+    )
+
+    assert warnings == [f"{df} {warning}"]
+    assert spans[0]["bytes"] == stdout_bytes
+
+
+def test_batched_mode_applies_the_command_timeout_to_a_hung_section(
+    loopback_client: tuple[SSHClient, _ExecServer], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client, _server = loopback_client
+    monkeypatch.setattr(collectors, "_COMMANDS", {**collectors._COMMANDS, "uptime": "sleep 3"})
+    warnings: list[str] = []
+
+    started = time.monotonic()
+    facts = collectors.collect_host_facts(
+        client,
+        strict=False,
+        log=lambda _level, message: warnings.append(message),
+        mode="batched",
+        command_timeout_sec=1,
+        collectors=["uptime"],
+    )
+
+    assert time.monotonic() - started < 2
+    assert facts.uptime_sec is None
+    assert warnings[0].startswith("batched collection failed") and "command timed out" in warnings[0]
+
+
+def test_task_deadline_bounds_commands_beyond_their_own_timeout(
+    loopback_client: tuple[SSHClient, _ExecServer],
+) -> None:
+    client, _server = loopback_client
+    bounded = SSHClient(client._target, timeout_sec=5, deadline=Deadline(0.5))
+    bounded._client = client._client
+
+    started = time.monotonic()
+    results = bounded.run_many(["sleep 3", "echo quick"])
+    elapsed = time.monotonic() - started
+
+    assert isinstance(results[0], SSHConnectorError)
+    assert "task deadline exceeded" in str(results[0])
+    assert results[1] == CommandResult(exit_code=0, stdout="quick", stderr="")
+    assert elapsed < 1.5
+    assert "before the command started" in str(bounded.run_many(["echo late"])[0])
@@ -0,0 +1,109 @@
+import threading
+
+import paramiko
+import pytest
+
+from ssh_linux.errors import SSHConnectorError
+from ssh_linux.models import Target
+from ssh_linux.ssh_pool import SSHConnectionPool
+
+
+class _FakeTransport:
+    def __init__(self) -> None:
+        self.active = True
+
+    def is_active(self) -> bool:
+        return self.active
+
+    def send_ignore(self) -> None:
+        return None
+
+
+class _FakeClient:
+    instances: list["_FakeClient"] = []
+
+    def __init__(self) -> None:
+        self.transport = _FakeTransport()
+        self.closed = False
+        _FakeClient.instances.append(self)
+
+    def set_missing_host_key_policy(self, _policy: object) -> None:
+        return None
+
+    def connect(self, **_kwargs: object) -> None:
+        return None
+
+    def get_transport(self) -> _FakeTransport:
+        return self.transport
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def _fake_paramiko(monkeypatch: pytest.MonkeyPatch) -> None:
+    _FakeClient.instances = []
+    monkeypatch.setattr(paramiko, "SSHClient", _FakeClient)
+
+
+def _target(address: str = "10.0.0.5") -> Target:
+    return Target.model_validate(
+        {
+            "type": "host",
+            "address": address,
+            "user": "ubuntu",
+            "auth": {"method": "password", "password": "secret"},
+        }
+    )
+
+
+def test_sessions_reuse_a_healthy_transport_and_replace_a_dead_one() -> None:
+    pool = SSHConnectionPool()
+
+    with pool.session(_target(), timeout_sec=5):
+        pass
+    with pool.session(_target(), timeout_sec=5):
+        pass
+    assert len(_FakeClient.instances) == 1
+
+    _FakeClient.instances[0].transport.active = False
+    with pool.session(_target(), timeout_sec=5):
+        pass
+    assert len(_FakeClient.instances) == 2
+    assert _FakeClient.instances[0].closed
+
+    pool.close()
+    assert _FakeClient.instances[1].closed
+
+
+def test_per_host_limit_blocks_until_release_and_times_out() -> None:
+    pool = SSHConnectionPool(max_per_host=1)
+    first = pool.session(_target(), timeout_sec=5)
+    first.connect()
+
+    with pytest.raises(SSHConnectorError, match="pool exhausted"):
+        pool.session(_target(), timeout_sec=0).connect()
+
+    with pool.session(_target("10.0.0.6"), timeout_sec=0):
+        pass
+
+    threading.Timer(0.05, first.close).start()
+    with pool.session(_target(), timeout_sec=5):
+        pass
+    assert len(_FakeClient.instances) == 2
+
+
+def test_idle_and_aged_connections_are_evicted() -> None:
+    pool = SSHConnectionPool(max_idle_sec=0.0)
+    with pool.session(_target(), timeout_sec=5):
+        pass
+
+    assert pool.evict_idle() == 1
+    assert _FakeClient.instances[0].closed
+
+    aged = SSHConnectionPool(max_age_sec=0.0)
+    with aged.session(_target(), timeout_sec=5):
+        pass
+    with aged.session(_target(), timeout_sec=5):
+        pass
+    assert len(_FakeClient.instances) == 3
@@ -0,0 +1,48 @@
+import socket
+import threading
+
+import paramiko
+import pytest
+
+from ssh_linux.errors import ValidationConnectorError
+from ssh_linux.models import Target
+from ssh_linux.ssh_profiles import SSH_PROFILES, handshake_sec, negotiated, resolve_profile, transport_factory
+
+
+def _target(meta: dict) -> Target:
+    return Target.model_validate(
+        {
+            "type": "host",
+            "address": "127.0.0.1",
+            "user": "ubuntu",
+            "auth": {"method": "password", "password": "x"},
+            "meta": meta,
+        }
+    )
+
+
+def test_target_meta_overrides_the_run_profile() -> None:
+    assert resolve_profile(_target({}), "fast").name == "fast"
+    assert resolve_profile(_target({"ssh_profile": "compressed"}), "fast").name == "compressed"
+    with pytest.raises(ValidationConnectorError, match="unknown SSH profile 'turbo'"):
+        resolve_profile(_target({"ssh_profile": "turbo"}))
+
+
+def test_fast_profile_negotiates_preferred_algorithms_and_times_the_handshake() -> None:
+    client_sock, server_sock = socket.socketpair()
+    server = paramiko.Transport(server_sock)
+    server.add_server_key(paramiko.RSAKey.generate(1024))
+    server.start_server(threading.Event(), server=paramiko.ServerInterface())
+    client = transport_factory(SSH_PROFILES["compressed"])(client_sock)
+    try:
+        client.start_client(timeout=10)
+
+        algorithms = negotiated(client)
+        assert algorithms["kex"] == "curve25519-sha256@libssh.org"
+        assert algorithms["cipher"] == "aes128-gcm@openssh.com"
+        assert algorithms["host_key_type"] == "rsa-sha2-256"
+        assert algorithms["compression"] in {"zlib", "zlib@openssh.com", "none"}
+        assert handshake_sec(client) is not None and handshake_sec(client) > 0
+    finally:
+        client.close()
+        server.close()
@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import pytest
+
+from ssh_linux import pipeline
+from ssh_linux.collectors import HostFacts
+from ssh_linux.errors import ExitCode
+from ssh_linux.ingest_client import IngestResult
+from ssh_linux.models import Target
+from ssh_linux.pipeline import TaskSpec, run_task
+from ssh_linux.state import FactStateStore, entity_content_hash, plan_delta
+
+
+def _entity(uptime_sec: int, kernel: str = "6.1.0") -> dict:
+    return {
+        "entity_type": "host",
+        "external_id": "web-1",
+        "keys": {"hostname": "web-1", "machine_id": "abc123"},
+        "attributes": {"kernel_release": kernel, "uptime_sec": uptime_sec, "filesystems": []},
+    }
+
+
+def test_content_hash_ignores_volatile_attributes() -> None:
+    assert entity_content_hash(_entity(10)) == entity_content_hash(_entity(99))
+    assert entity_content_hash(_entity(10)) != entity_content_hash(_entity(10, kernel="6.2.0"))
+
+
+def test_content_hash_counts_packages_by_digest() -> None:
+    def with_packages(digest: str, items: list[list[str]]) -> dict:
+        entity = _entity(10)
+        entity["attributes"]["packages"] = {"manager": "dpkg", "count": 1, "digest": digest, "items": items}
+        return entity
+
+    same = entity_content_hash(with_packages("aa", [["bash", "5.2", "amd64"]]))
+    assert entity_content_hash(with_packages("aa", [])) == same
+    assert entity_content_hash(with_packages("bb", [["bash", "5.2", "amd64"]])) != same
+
+
+def test_content_hash_covers_related_services() -> None:
+    service = {"entity_type": "service", "external_id": "web-1/tcp/0.0.0.0:22", "keys": {}, "attributes": {}}
+
+    assert entity_content_hash(_entity(10), []) == entity_content_hash(_entity(10))
+    assert entity_content_hash(_entity(10), [service]) != entity_content_hash(_entity(10))
+
+
+def test_plan_delta_skips_or_marks_unchanged_host(tmp_path: Path) -> None:
+    store = FactStateStore(tmp_path)
+    first = plan_delta(store, "skip", _entity(10))
+    assert first.previous is None and not first.unchanged
+
+    store.record(_entity(10), first.content_hash, "batch-1")
+
+    skipped = plan_delta(store, "skip", _entity(20))
+    assert skipped.skip and skipped.previous.batch_id == "batch-1"
+
+    marked = plan_delta(store, "marker", _entity(20))
+    assert not marked.skip
+    assert marked.entity["attributes"] == {"uptime_sec": 20}
+
+    changed = plan_delta(store, "marker", _entity(20, kernel="6.2.0"))
+    assert not changed.unchanged and changed.entity == _entity(20, kernel="6.2.0")
+
+
+def test_run_task_records_state_and_skips_second_upload(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    posted: list[dict] = []
+
+    class FakeIngestClient:
+        def post(self, batch_payload: dict, idempotency_key: str, timeout_sec: float, deadline=None) -> IngestResult:
+            posted.append(batch_payload)
+            return IngestResult(
+                batch_id=f"batch-{len(posted)}",
+                bytes_sent=1,
+                payload_bytes=1,
+                latency_sec=0.0,
+                compressed=False,
+            )
+
+    class FakeIngestClients:
+        def get(self, ingest_url: str, ingest_token: str) -> FakeIngestClient:
+            return FakeIngestClient()
+
+    monkeypatch.setattr(
+        pipeline,
+        "collect_task",
+        lambda spec, ssh_pool=None, deadline=None, fact_cache=None: HostFacts(hostname="web-1"),
+    )
+    spec = TaskSpec(
+        run_id="11111111-1111-1111-1111-111111111111",
+        task_id="22222222-2222-2222-2222-222222222222",
+        target=Target.model_validate(
+            {"type": "host", "address": "10.0.0.1", "user": "ubuntu", "auth": {"method": "password", "password": "x"}}
+        ),
+        ingest_url="http://ingest",
+        ingest_token="token",
+        delta_mode="skip",
+    )
+    store = FactStateStore(tmp_path)
+
+    first = run_task(spec, ingest_clients=FakeIngestClients(), fact_state=store)
+    second = run_task(spec, ingest_clients=FakeIngestClients(), fact_state=store)
+
+    assert first.exit_code == second.exit_code == ExitCode.SUCCESS
+    assert first.batch_id == second.batch_id == "batch-1"
+    assert len(posted) == 1